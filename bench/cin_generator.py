@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+import sys
+import random
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+# =========================================================
+# Synthetic CIN corpus
+# =========================================================
+#
+# Produces GS1 GDSN 3.x style catalogueItemNotification documents with the
+# same element layout the extractors read: module roots are namespaced,
+# everything inside them is unqualified. Deterministic for a given seed.
+# qualified=True also prefixes the repeating module elements (allergen,
+# nutrientDetail, referencedFileHeader), the variant cin_extract.py matches.
+
+NS = {
+    "catalogue_item_notification": "urn:gs1:gdsn:catalogue_item_notification:xsd:3",
+    "allergen_information": "urn:gs1:gdsn:allergen_information:xsd:3",
+    "food_and_beverage_ingredient": "urn:gs1:gdsn:food_and_beverage_ingredient:xsd:3",
+    "nutritional_information": "urn:gs1:gdsn:nutritional_information:xsd:3",
+    "diet_information": "urn:gs1:gdsn:diet_information:xsd:3",
+    "marketing_information": "urn:gs1:gdsn:marketing_information:xsd:3",
+    "trade_item_description": "urn:gs1:gdsn:trade_item_description:xsd:3",
+    "trade_item_measurements": "urn:gs1:gdsn:trade_item_measurements:xsd:3",
+    "referenced_file_detail_information": "urn:gs1:gdsn:referenced_file_detail_information:xsd:3",
+    "duty_fee_tax_information": "urn:gs1:gdsn:duty_fee_tax_information:xsd:3",
+    "sales_information": "urn:gs1:gdsn:sales_information:xsd:3",
+}
+
+LANGS = ["sv", "en", "fi", "no", "da", "de", "fr", "nl"]
+ALLERGENS = ["AM", "AW", "AC", "AE", "AF", "AN", "AP", "AS", "AU", "AY", "BC", "GB"]
+CONTAINMENT = ["CONTAINS", "MAY_CONTAIN", "FREE_FROM"]
+NUTRIENTS = ["ENER-", "FAT", "FASAT", "CHOAVL", "SUGAR-", "PRO-", "SALTEQ", "FIBTG"]
+DIETS = ["VEGAN", "VEGETARIAN", "HALAL", "KOSHER", "ORGANIC"]
+WORDS = (
+    "mjölk yoghurt mango banan apelsin socker majsstärkelse citronjuice arom "
+    "kultur drickfärdig färsk mellanmål frukt bär vanilj jordgubb havre "
+    "naturlig protein laktosfri ekologisk svensk krämig fyllig"
+).split()
+
+# tier -> generator parameters
+TIERS: Dict[str, Dict[str, int]] = {
+    "small": {"languages": 1, "nutrients": 4, "allergens": 2, "media": 2, "depth": 1},
+    "medium": {"languages": 3, "nutrients": 10, "allergens": 6, "media": 6, "depth": 2},
+    "large": {"languages": 6, "nutrients": 30, "allergens": 12, "media": 20, "depth": 3},
+    "xlarge": {"languages": 8, "nutrients": 80, "allergens": 12, "media": 60, "depth": 4},
+}
+
+
+def _gtin(rng: random.Random) -> str:
+    return "0" + "".join(str(rng.randrange(10)) for _ in range(13))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _multi(tag: str, langs: List[str], text) -> str:
+    return "".join(
+        f'<{tag} languageCode="{lang}">{escape(text(lang))}</{tag}>' for lang in langs
+    )
+
+
+def _trade_item(rng: random.Random, p: Dict[str, int], level: int) -> str:
+    langs = LANGS[: p["languages"]]
+
+    def q(module: str, tag: str) -> str:
+        return f"{module}:{tag}" if p["qualified"] else tag
+
+    allergen = q("allergen_information", "allergen")
+    nutrient = q("nutritional_information", "nutrientDetail")
+    ref_file = q("referenced_file_detail_information", "referencedFileHeader")
+    gtin = _gtin(rng)
+    is_base = level == p["depth"]
+    parts = [
+        "<tradeItem>",
+        f"<isTradeItemABaseUnit>{str(is_base).lower()}</isTradeItemABaseUnit>",
+        f"<isTradeItemAConsumerUnit>{str(is_base).lower()}</isTradeItemAConsumerUnit>",
+        "<isTradeItemAVariableUnit>false</isTradeItemAVariableUnit>",
+        "<isTradeItemAnOrderableUnit>true</isTradeItemAnOrderableUnit>",
+        "<isTradeItemAnInvoiceUnit>true</isTradeItemAnInvoiceUnit>",
+        f"<gtin>{gtin}</gtin>",
+        "<tradeItemTradeChannelCode>GROCERY</tradeItemTradeChannelCode>",
+        "<informationProviderOfTradeItem><gln>7300000000001</gln>"
+        "<partyName>Synthetic Foods AB</partyName></informationProviderOfTradeItem>",
+        "<manufacturerOfTradeItem><gln>7300000000002</gln>"
+        "<partyName>Synthetic Dairy</partyName></manufacturerOfTradeItem>",
+        "<gdsnTradeItemClassification>"
+        f"<gpcCategoryCode>{10000000 + rng.randrange(1000)}</gpcCategoryCode>"
+        "<gpcCategoryName>Mjölkbaserade drycker</gpcCategoryName>"
+        "</gdsnTradeItemClassification>",
+        "<targetMarket><targetMarketCountryCode>752</targetMarketCountryCode></targetMarket>",
+    ]
+
+    if not is_base:
+        qty = rng.choice([6, 8, 12, 24])
+        parts.append(
+            "<nextLowerLevelTradeItemInformation>"
+            "<quantityOfChildren>1</quantityOfChildren>"
+            f"<totalQuantityOfNextLowerLevelTradeItem>{qty}</totalQuantityOfNextLowerLevelTradeItem>"
+            f"<childTradeItem><gtin>{_gtin(rng)}</gtin>"
+            f"<quantityOfNextLowerLevelTradeItem>{qty}</quantityOfNextLowerLevelTradeItem>"
+            "</childTradeItem></nextLowerLevelTradeItemInformation>"
+        )
+
+    allergens = rng.sample(ALLERGENS, min(p["allergens"], len(ALLERGENS)))
+    modules = [
+        '<allergen_information:allergenInformationModule xmlns:allergen_information="'
+        + NS["allergen_information"]
+        + '"><allergenRelatedInformation>'
+        "<allergenSpecificationAgency>EU</allergenSpecificationAgency>"
+        "<allergenSpecificationName>1169/2011</allergenSpecificationName>"
+        + "".join(
+            f"<{allergen}><allergenTypeCode>{code}</allergenTypeCode>"
+            f"<levelOfContainmentCode>{rng.choice(CONTAINMENT)}</levelOfContainmentCode></{allergen}>"
+            for code in allergens
+        )
+        + "</allergenRelatedInformation></allergen_information:allergenInformationModule>",
+        '<diet_information:dietInformationModule xmlns:diet_information="'
+        + NS["diet_information"]
+        + '"><dietInformation>'
+        + _multi("dietTypeDescription", langs, lambda _: _sentence(rng, 3))
+        + "".join(
+            f"<dietTypeInformation><dietTypeCode>{d}</dietTypeCode>"
+            "<isDietTypeMarkedOnPackage>true</isDietTypeMarkedOnPackage></dietTypeInformation>"
+            for d in rng.sample(DIETS, 2)
+        )
+        + "</dietInformation></diet_information:dietInformationModule>",
+        '<food_and_beverage_ingredient:foodAndBeverageIngredientModule xmlns:food_and_beverage_ingredient="'
+        + NS["food_and_beverage_ingredient"]
+        + '">'
+        + _multi("ingredientStatement", langs, lambda _: _sentence(rng, 25))
+        + "</food_and_beverage_ingredient:foodAndBeverageIngredientModule>",
+        '<nutritional_information:nutritionalInformationModule xmlns:nutritional_information="'
+        + NS["nutritional_information"]
+        + '"><nutrientHeader>'
+        '<nutrientBasisQuantity measurementUnitCode="MLT">100</nutrientBasisQuantity>'
+        + "".join(
+            f"<{nutrient}><nutrientTypeCode>{NUTRIENTS[i % len(NUTRIENTS)]}</nutrientTypeCode>"
+            f'<quantityContained measurementUnitCode="GRM">{rng.uniform(0, 50):.1f}</quantityContained>'
+            f"</{nutrient}>"
+            for i in range(p["nutrients"])
+        )
+        + "</nutrientHeader></nutritional_information:nutritionalInformationModule>",
+        '<marketing_information:marketingInformationModule xmlns:marketing_information="'
+        + NS["marketing_information"]
+        + '"><marketingInformation>'
+        + _multi("tradeItemMarketingMessage", langs, lambda _: _sentence(rng, 40))
+        + _multi("shortTradeItemMarketingMessage", langs, lambda _: _sentence(rng, 8))
+        + _multi("tradeItemKeyWords", langs, lambda _: ", ".join(rng.sample(WORDS, 6)))
+        + "</marketingInformation></marketing_information:marketingInformationModule>",
+        '<trade_item_description:tradeItemDescriptionModule xmlns:trade_item_description="'
+        + NS["trade_item_description"]
+        + '"><tradeItemDescriptionInformation>'
+        "<brandNameInformation><brandName>Synthetic®</brandName></brandNameInformation>"
+        + _multi("descriptionShort", langs, lambda _: _sentence(rng, 4))
+        + _multi("functionalName", langs, lambda _: _sentence(rng, 1))
+        + _multi("regulatedProductName", langs, lambda _: _sentence(rng, 3))
+        + _multi("descriptiveSizeDimension", langs, lambda _: "350 ml")
+        + "</tradeItemDescriptionInformation></trade_item_description:tradeItemDescriptionModule>",
+        '<trade_item_measurements:tradeItemMeasurementsModule xmlns:trade_item_measurements="'
+        + NS["trade_item_measurements"]
+        + '"><tradeItemMeasurements>'
+        f'<depth measurementUnitCode="MMT">{rng.randrange(20, 400)}</depth>'
+        f'<height measurementUnitCode="MMT">{rng.randrange(20, 400)}</height>'
+        f'<width measurementUnitCode="MMT">{rng.randrange(20, 400)}</width>'
+        '<netContent measurementUnitCode="MLT">350</netContent>'
+        "<tradeItemWeight>"
+        f'<grossWeight measurementUnitCode="GRM">{rng.randrange(50, 20000)}</grossWeight>'
+        f'<netWeight measurementUnitCode="GRM">{rng.randrange(50, 20000)}</netWeight>'
+        "</tradeItemWeight>"
+        "</tradeItemMeasurements></trade_item_measurements:tradeItemMeasurementsModule>",
+        '<duty_fee_tax_information:dutyFeeTaxInformationModule xmlns:duty_fee_tax_information="'
+        + NS["duty_fee_tax_information"]
+        + '"><dutyFeeTaxInformation><dutyFeeTaxTypeCode>VAT</dutyFeeTaxTypeCode>'
+        "<dutyFeeTax><dutyFeeTaxRate>12</dutyFeeTaxRate></dutyFeeTax>"
+        "</dutyFeeTaxInformation></duty_fee_tax_information:dutyFeeTaxInformationModule>",
+        '<sales_information:salesInformationModule xmlns:sales_information="'
+        + NS["sales_information"]
+        + '"><salesInformation>'
+        '<priceComparisonMeasurement measurementUnitCode="LTR">0.35</priceComparisonMeasurement>'
+        "<priceComparisonContentTypeCode>PER_LITRE</priceComparisonContentTypeCode>"
+        + (
+            "<consumerSalesConditionCode>AGE_RESTRICTED_18</consumerSalesConditionCode>"
+            if rng.random() < 0.1
+            else ""
+        )
+        + "</salesInformation></sales_information:salesInformationModule>",
+        '<referenced_file_detail_information:referencedFileDetailInformationModule xmlns:referenced_file_detail_information="'
+        + NS["referenced_file_detail_information"]
+        + '">'
+        + "".join(
+            f"<{ref_file}>"
+            f"<referencedFileTypeCode>{'PRODUCT_IMAGE' if i % 4 else 'PLANOGRAM'}</referencedFileTypeCode>"
+            "<fileFormatName>PNG</fileFormatName>"
+            f"<fileName>{gtin}_{i}.png</fileName>"
+            f"<uniformResourceIdentifier>https://images.example.com/{gtin}/{i}.png</uniformResourceIdentifier>"
+            f"<isPrimaryFile>{'TRUE' if i == 0 else 'FALSE'}</isPrimaryFile>"
+            "<filePixelWidth>2400</filePixelWidth><filePixelHeight>2400</filePixelHeight>"
+            f"<fileSize>{rng.randrange(10_000, 5_000_000)}</fileSize>"
+            f"</{ref_file}>"
+            for i in range(p["media"])
+        )
+        + "</referenced_file_detail_information:referencedFileDetailInformationModule>",
+    ]
+
+    parts.append(
+        "<tradeItemInformation><extension>"
+        + "".join(modules)
+        + "</extension></tradeItemInformation>"
+    )
+    parts.append(
+        "<tradeItemSynchronisationDates>"
+        "<lastChangeDateTime>2026-01-01T10:00:00</lastChangeDateTime>"
+        "<effectiveDateTime>2026-01-01T00:00:00</effectiveDateTime>"
+        "<publicationDateTime>2026-01-01T00:00:00</publicationDateTime>"
+        "</tradeItemSynchronisationDates>"
+    )
+    parts.append("</tradeItem>")
+    return "".join(parts)
+
+
+def _catalogue_item(rng: random.Random, p: Dict[str, int], level: int) -> str:
+    child = ""
+    if level < p["depth"]:
+        child = (
+            "<catalogueItemChildItemLink><quantity>1</quantity>"
+            + _catalogue_item(rng, p, level + 1)
+            + "</catalogueItemChildItemLink>"
+        )
+    return "<catalogueItem>" + _trade_item(rng, p, level) + child + "</catalogueItem>"
+
+
+def generate_cin(
+    languages: int = 2,
+    nutrients: int = 8,
+    allergens: int = 4,
+    media: int = 4,
+    depth: int = 1,
+    seed: int = 0,
+    qualified: bool = False,
+) -> str:
+    """
+    One CIN document. `depth` is the number of hierarchy levels (pallet ->
+    case -> consumer unit), each level a full tradeItem.
+    """
+    rng = random.Random(seed)
+    p = {
+        "languages": max(1, min(languages, len(LANGS))),
+        "nutrients": nutrients,
+        "allergens": allergens,
+        "media": media,
+        "depth": max(1, depth),
+        "qualified": qualified,
+    }
+    root = "catalogue_item_notification"
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<{root}:catalogueItemNotificationMessage xmlns:{root}="{NS[root]}">'
+        "<transaction><documentCommand>"
+        f"<{root}:catalogueItemNotification>"
+        + _catalogue_item(rng, p, 1)
+        + f"</{root}:catalogueItemNotification>"
+        "</documentCommand></transaction>"
+        f"</{root}:catalogueItemNotificationMessage>"
+    )
+
+
+def generate_tier(tier: str, seed: int = 0, qualified: bool = False) -> str:
+    return generate_cin(seed=seed, qualified=qualified, **TIERS[tier])
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in TIERS:
+        print(f"Usage: python3 cin_generator.py <{'|'.join(TIERS)}> <out.xml>")
+        sys.exit(1)
+
+    cin_xml = generate_tier(sys.argv[1])
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        f.write(cin_xml)
+
+    print(f"✅ {sys.argv[2]} written ({len(cin_xml.encode('utf-8'))} bytes)")
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+import gc
+import io
+import sys
+import csv
+import json
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path[:0] = [str(BENCH_DIR), str(ROOT_DIR), str(ROOT_DIR / "v3")]
+
+from cin_generator import TIERS, generate_tier  # noqa: E402
+from cin_extract import extract_cin_signals  # noqa: E402
+from cin_snapshot import snapshot_cin  # noqa: E402
+from cin_raw_extractor import extract_cin_raw, stream_cin_raw  # noqa: E402
+from cin_compact import compact_snapshot  # noqa: E402
+from cin_compact_to_csv import (  # noqa: E402
+    LONG_FIELDS,
+    compact_to_long_rows,
+    compact_to_row,
+)
+
+# =========================================================
+# Config
+# =========================================================
+
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# documents per tier; larger tiers get fewer so every tier takes similar time
+CORPUS_SIZE = {"small": 200, "medium": 80, "large": 30, "xlarge": 10}
+
+REPEAT = 3
+TOLERANCE = 0.25
+
+# throughput is gated relative to this stage, timed in the same run
+CALIBRATION = "calibration"
+
+# =========================================================
+# Stages
+# =========================================================
+#
+# Every stage takes one prepared document (see prepare) and returns its
+# output. Stages that consume an earlier stage's output get it precomputed,
+# so each timing covers that stage only.
+
+
+def _csv_export(compact: Dict[str, Any]) -> str:
+    row = compact_to_row(compact)
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(row.keys()))
+    writer.writeheader()
+    writer.writerow(row)
+    writer = csv.DictWriter(buf, fieldnames=LONG_FIELDS)
+    writer.writeheader()
+    writer.writerows(compact_to_long_rows(compact))
+    return buf.getvalue()
+
+
+def _stream_raw(doc: Dict[str, Any]) -> bytes:
+    out = io.BytesIO()
+    stream_cin_raw(io.BytesIO(doc["bytes"]), out)
+    return out.getvalue()
+
+
+STAGES: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "signals": lambda doc: extract_cin_signals(doc["xml"]),
+    "snapshot": lambda doc: snapshot_cin(doc["xml"]),
+    "raw": lambda doc: extract_cin_raw(doc["xml"]),
+    "raw_stream": _stream_raw,
+    "compact": lambda doc: compact_snapshot(doc["snapshot"]),
+    "csv_export": lambda doc: _csv_export(doc["compact"]),
+}
+
+
+def _calibration(doc: Dict[str, Any]) -> str:
+    """
+    Stdlib-only work shaped like the stages (C parse, tree walk, JSON).
+    Nothing in the repository affects it, so stage speed divided by its
+    speed tracks the code rather than the machine.
+    """
+    root = ET.fromstring(doc["xml"])
+    return json.dumps([(el.tag, el.attrib, el.text) for el in root.iter()])
+
+
+def prepare(tier: str) -> List[Dict[str, Any]]:
+    # qualified layout so cin_extract's namespaced lookups find their elements
+    docs = []
+    for seed in range(CORPUS_SIZE[tier]):
+        xml = generate_tier(tier, seed=seed, qualified=True)
+        snapshot = snapshot_cin(xml)
+        docs.append(
+            {
+                "xml": xml,
+                "bytes": xml.encode("utf-8"),
+                "snapshot": snapshot,
+                "compact": compact_snapshot(snapshot),
+            }
+        )
+    return docs
+
+
+# =========================================================
+# Measurement
+# =========================================================
+
+
+def time_stage(fn, docs: List[Dict[str, Any]], repeat: int) -> float:
+    """
+    Best CPU time over `repeat` passes across the corpus, GC paused as in
+    timeit. CPU rather than wall time, so other load on the machine (CI
+    neighbours) does not count against a stage.
+    """
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.process_time()
+            for doc in docs:
+                fn(doc)
+            best = min(best, time.process_time() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def peak_stage(fn, docs: List[Dict[str, Any]]) -> int:
+    """Largest per-document tracemalloc peak (bytes) for the stage."""
+    worst = 0
+    tracemalloc.start()
+    try:
+        for doc in docs:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn(doc)
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def run(
+    tiers: List[str], repeat: int = REPEAT
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for tier in tiers:
+        docs = prepare(tier)
+        mb = sum(len(d["bytes"]) for d in docs) / 1e6
+        results[tier] = {}
+        calibrations = []
+        for stage, fn in STAGES.items():
+            # calibrated right before each stage, so load drift cancels out
+            calibration = time_stage(_calibration, docs, repeat)
+            calibrations.append(calibration)
+            seconds = time_stage(fn, docs, repeat)
+            results[tier][stage] = {
+                "docs_per_s": round(len(docs) / seconds, 1),
+                "mb_per_s": round(mb / seconds, 2),
+                "peak_kb": round(peak_stage(fn, docs) / 1024, 1),
+                # speed as a multiple of the calibration stage's
+                "relative": round(calibration / seconds, 4),
+            }
+        calibration = min(calibrations)
+        results[tier][CALIBRATION] = {
+            "docs_per_s": round(len(docs) / calibration, 1),
+            "mb_per_s": round(mb / calibration, 2),
+        }
+        print(f"  {tier}: {len(docs)} docs, {mb * 1e3 / len(docs):.1f} KB/doc")
+    return results
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """
+    Regressions against the baseline: relative throughput (see
+    _calibration) below (1 - tolerance) x baseline, or peak memory above
+    (1 + tolerance) x baseline. Absolute docs/s differ between machines
+    and are not gated.
+    """
+    regressions = []
+    for tier, stages in results.items():
+        for stage, m in stages.items():
+            b = baseline.get(tier, {}).get(stage)
+            if not b or stage == CALIBRATION:
+                continue
+            if "relative" in b and m["relative"] < b["relative"] * (1 - tolerance):
+                regressions.append(
+                    f"{tier}/{stage}: {m['relative']}x calibration "
+                    f"(baseline {b['relative']}x)"
+                )
+            if m["peak_kb"] > b["peak_kb"] * (1 + tolerance):
+                regressions.append(
+                    f"{tier}/{stage}: peak {m['peak_kb']} KB "
+                    f"(baseline {b['peak_kb']})"
+                )
+    return regressions
+
+
+def print_table(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    print(
+        f"{'tier':<8} {'stage':<11} {'docs/s':>10} {'MB/s':>8} "
+        f"{'peak KB':>10} {'vs base':>8}"
+    )
+    for tier, stages in results.items():
+        for stage, m in stages.items():
+            b = baseline.get(tier, {}).get(stage)
+            ratio = "-"
+            if b and "relative" in b and "relative" in m:
+                ratio = f"{m['relative'] / b['relative']:.2f}x"
+            print(
+                f"{tier:<8} {stage:<11} {m['docs_per_s']:>10} {m['mb_per_s']:>8} "
+                f"{m.get('peak_kb', '-'):>10} {ratio:>8}"
+            )
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = f"""Usage:
+  python3 bench/run_bench.py [--tiers={",".join(TIERS)}] [--repeat={REPEAT}]
+                             [--tolerance={TOLERANCE}] [--json=<out.json>]
+                             [--save-baseline]
+
+Throughput is compared as a multiple of a stdlib-only calibration stage
+timed in the same run ("vs base" column), so baseline.json carries over
+between machines; peak memory is compared as is."""
+
+
+if __name__ == "__main__":
+    opts: Dict[str, str] = {}
+    for arg in sys.argv[1:]:
+        if not arg.startswith("--"):
+            print(USAGE)
+            sys.exit(1)
+        key, _, value = arg[2:].partition("=")
+        opts[key] = value
+
+    tiers = opts.get("tiers", ",".join(TIERS)).split(",")
+    unknown = [t for t in tiers if t not in TIERS]
+    if unknown:
+        print(f"❌ Unknown tier(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    print("⏱️  Running benchmarks")
+    results = run(tiers, int(opts.get("repeat", REPEAT)))
+
+    baseline = (
+        json.loads(BASELINE_FILE.read_text(encoding="utf-8"))
+        if BASELINE_FILE.exists()
+        else {}
+    )
+    print_table(results, baseline)
+
+    if opts.get("json"):
+        Path(opts["json"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"📁 {opts['json']} written")
+
+    if "save-baseline" in opts:
+        baseline.update(results)
+        BASELINE_FILE.write_text(
+            json.dumps(baseline, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"✅ Baseline saved to {BASELINE_FILE}")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, float(opts.get("tolerance", TOLERANCE)))
+    if regressions:
+        print("❌ Regressions:")
+        for r in regressions:
+            print(f"  {r}")
+        sys.exit(1)
+    print("✅ No regressions" if baseline else "⚠️  No baseline to compare against")
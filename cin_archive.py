@@ -0,0 +1,181 @@
+import sys
+import json
+import lzma
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# =========================================================
+# Config
+# =========================================================
+
+ARCHIVE_DIR = Path("cin_archive")
+
+# suffix -> (compress, decompress)
+CODECS = {
+    ".xz": (lambda b: lzma.compress(b, preset=6), lzma.decompress),
+    ".zz": (lambda b: zlib.compress(b, 9), zlib.decompress),
+}
+DEFAULT_CODEC = ".xz"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS version (
+    gtin TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (gtin, item_id, sha256)
+);
+CREATE TABLE IF NOT EXISTS extract (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (sha256, kind)
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# =========================================================
+# Archive
+# =========================================================
+
+
+class CinArchive:
+    """
+    Content-addressed store of decoded CIN documents.
+
+    - objects/<sha[:2]>/<sha><codec>: compressed CIN XML, written once per hash
+    - index.sqlite: (gtin, item_id) -> sha256 history, plus extraction
+      results per (sha256, kind) so republished identical CINs are never
+      parsed twice
+    """
+
+    def __init__(self, root: Path = ARCHIVE_DIR, codec: str = DEFAULT_CODEC):
+        self.root = root
+        self.codec = codec
+        (root / "objects").mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(root / "index.sqlite")
+        self.conn.executescript(SCHEMA)
+
+    def _object_path(self, sha: str, codec: str) -> Path:
+        return self.root / "objects" / sha[:2] / f"{sha}{codec}"
+
+    # -----------------------------------------------------
+    # CIN payloads
+    # -----------------------------------------------------
+
+    def put(self, cin_xml: str, gtin: str, item_id: int) -> str:
+        """Store a CIN (if new) and record it for gtin/item_id. Returns sha256."""
+        data = cin_xml.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+
+        if self.find(sha) is None:
+            path = self._object_path(sha, self.codec)
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(CODECS[self.codec][0](data))
+            tmp.replace(path)
+
+        now = _now()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO version (gtin, item_id, sha256, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (gtin, item_id, sha256) DO UPDATE SET last_seen = ?",
+                (gtin, item_id, sha, now, now, now),
+            )
+        return sha
+
+    def find(self, sha: str) -> Optional[Path]:
+        for codec in CODECS:
+            path = self._object_path(sha, codec)
+            if path.exists():
+                return path
+        return None
+
+    def get(self, sha: str) -> Optional[str]:
+        path = self.find(sha)
+        if path is None:
+            return None
+        return CODECS[path.suffix][1](path.read_bytes()).decode("utf-8")
+
+    def history(self, gtin: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT item_id, sha256, first_seen, last_seen FROM version "
+            "WHERE gtin = ? ORDER BY first_seen",
+            (gtin,),
+        ).fetchall()
+        return [
+            {"item_id": r[0], "sha256": r[1], "first_seen": r[2], "last_seen": r[3]}
+            for r in rows
+        ]
+
+    # -----------------------------------------------------
+    # Extraction cache
+    # -----------------------------------------------------
+
+    def get_extract(self, sha: str, kind: str) -> Optional[Any]:
+        row = self.conn.execute(
+            "SELECT payload FROM extract WHERE sha256 = ? AND kind = ?", (sha, kind)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_extract(self, sha: str, kind: str, data: Any) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO extract (sha256, kind, payload) VALUES (?, ?, ?)",
+                (sha, kind, json.dumps(data, ensure_ascii=False)),
+            )
+
+    def extract(self, sha: str, kind: str, fn, cin_xml: str) -> Any:
+        """fn(cin_xml) unless a result for this hash and kind is archived."""
+        data = self.get_extract(sha, kind)
+        if data is None:
+            data = fn(cin_xml)
+            self.put_extract(sha, kind, data)
+        return data
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = """Usage:
+  python3 cin_archive.py history <GTIN>
+  python3 cin_archive.py cat <sha256>"""
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(USAGE)
+        sys.exit(1)
+
+    command, arg = sys.argv[1], sys.argv[2]
+    archive = CinArchive()
+
+    if command == "history":
+        for v in archive.history(arg):
+            print(f"{v['first_seen']}  {v['last_seen']}  {v['item_id']}  {v['sha256']}")
+
+    elif command == "cat":
+        cin_xml = archive.get(arg)
+        if cin_xml is None:
+            print("❌ Not in archive")
+            sys.exit(1)
+        print(cin_xml)
+
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+import time
+from typing import Optional
+
+import requests
+
+from cin_metrics import metrics
+
+# =========================================================
+# CONFIG
+# =========================================================
+
+# 429/503 are retried this many times before the response is returned as is
+MAX_RETRIES = int(os.getenv("VALI_MAX_RETRIES", "3"))
+# upper bound on a single wait, whatever Retry-After asks for
+MAX_WAIT = float(os.getenv("VALI_MAX_WAIT", "30"))
+RETRY_STATUSES = (429, 503)
+
+
+# =========================================================
+# REQUESTS
+# =========================================================
+
+
+class AuthError(RuntimeError):
+    """401 from the API: the token expired or was revoked."""
+
+
+def retry_wait(resp: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if given, else backoff."""
+    try:
+        wait = float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):  # missing, or an HTTP date
+        wait = 0.5 * 2**attempt
+    return min(max(wait, 0.0), MAX_WAIT)
+
+
+def request(
+    method: str, url: str, session: Optional[requests.Session] = None, **kwargs
+) -> requests.Response:
+    """requests.request, retrying throttled (429) and unavailable (503) answers."""
+    for attempt in range(MAX_RETRIES + 1):
+        resp = (session or requests).request(method, url, **kwargs)
+        if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return resp
+        metrics.count("throttled" if resp.status_code == 429 else "unavailable")
+        time.sleep(retry_wait(resp, attempt))
+    return resp
+
+
+def check(resp: requests.Response, what: str = "") -> None:
+    if resp.status_code == 401:
+        raise AuthError(f"{what}{resp.text}")
+    if resp.status_code != 200:
+        raise RuntimeError(f"{what}{resp.text}")
+
+
+# =========================================================
+# SEARCH RESULTS
+# =========================================================
+
+
+def select_item_id(results: list[dict], gtin: str) -> Optional[int]:
+    """itemId for the GTIN, preferring the consumer unit; None if not found."""
+    matches = [r for r in results if r.get("gtin") == gtin]
+    if not matches:
+        return None
+    consumer_units = [r for r in matches if r.get("isTradeItemAConsumerUnit") is True]
+    return consumer_units[0]["itemId"] if consumer_units else matches[0]["itemId"]
@@ -0,0 +1,187 @@
+import sys
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from cin_metrics import metrics
+from cin_ndjson import read_documents
+
+# =========================================================
+# Config
+# =========================================================
+
+OUT_PATH = Path("cin_derived.csv")
+
+# input columns, all float64 with NaN for missing values
+MEASUREMENT_COLUMNS = [
+    "width_mm",
+    "height_mm",
+    "depth_mm",
+    "gross_weight_g",
+    "net_weight_g",
+    "net_content_ml",
+    "net_content_g",
+    "abv_percent",
+]
+
+DERIVED_COLUMNS = [
+    "volume_ml",
+    "density_g_per_ml",
+    "packaging_weight_g",
+    "net_to_gross",
+    "fill_ratio",
+    "comparison_quantity",
+    "comparison_unit",
+    "pure_alcohol_ml",
+]
+
+
+# =========================================================
+# Columns
+# =========================================================
+
+
+def _record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A signals or compact record, bare or wrapped as in the NDJSON modes."""
+    return doc.get("signals") or doc
+
+
+def measurement_columns(docs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Column arrays for a batch of records: "gtin" (list) plus one float64
+    array per MEASUREMENT_COLUMNS entry. Net content is split by dimension
+    so volumes and weights never mix.
+    """
+    gtins: List[Optional[str]] = []
+    values: Dict[str, List[float]] = {name: [] for name in MEASUREMENT_COLUMNS}
+    nan = float("nan")
+
+    for doc in docs:
+        record = _record(doc)
+        m = record.get("measurements") or {}
+        content = m.get("net_content") or {}
+        abv = (record.get("alcohol") or {}).get("abv_percent")
+
+        gtins.append((record.get("identity") or {}).get("gtin") or doc.get("gtin"))
+        for name in MEASUREMENT_COLUMNS[:5]:
+            v = m.get(name)
+            values[name].append(nan if v is None else v)
+        values["net_content_ml"].append(
+            content["value"] if content.get("unit") == "ml" else nan
+        )
+        values["net_content_g"].append(
+            content["value"] if content.get("unit") == "g" else nan
+        )
+        values["abv_percent"].append(nan if abv is None else abv)
+
+    columns: Dict[str, Any] = {"gtin": gtins}
+    for name in MEASUREMENT_COLUMNS:
+        columns[name] = np.asarray(values[name], dtype=np.float64)
+    return columns
+
+
+# =========================================================
+# Derived metrics
+# =========================================================
+
+
+def derive(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Derived metrics for a whole batch at once, NaN where an input is
+    missing or a divisor is zero:
+
+    - volume_ml: outer box volume from width x height x depth
+    - density_g_per_ml: gross weight over box volume
+    - packaging_weight_g / net_to_gross: gross minus net, net over gross
+    - fill_ratio: liquid net content over box volume
+    - comparison_quantity / comparison_unit: net content in l or kg, the
+      basis of Swedish comparison prices (kr/l, kr/kg)
+    - pure_alcohol_ml: liquid net content times ABV
+    """
+    with metrics.stage("derive"):
+        w, h, d = columns["width_mm"], columns["height_mm"], columns["depth_mm"]
+        gross, net = columns["gross_weight_g"], columns["net_weight_g"]
+        content_ml, content_g = columns["net_content_ml"], columns["net_content_g"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volume_ml = w * h * d / 1000.0
+            density = gross / volume_ml
+            net_to_gross = net / gross
+            fill_ratio = content_ml / volume_ml
+        # x / 0 is inf, not a metric
+        for arr in (density, net_to_gross, fill_ratio):
+            arr[~np.isfinite(arr)] = np.nan
+
+        is_liquid = ~np.isnan(content_ml)
+        comparison = np.where(is_liquid, content_ml, content_g) / 1000.0
+        comparison_unit = np.where(
+            is_liquid, "l", np.where(np.isnan(content_g), "", "kg")
+        )
+
+        return {
+            "gtin": columns["gtin"],
+            "volume_ml": volume_ml,
+            "density_g_per_ml": density,
+            "packaging_weight_g": gross - net,
+            "net_to_gross": net_to_gross,
+            "fill_ratio": fill_ratio,
+            "comparison_quantity": comparison,
+            "comparison_unit": comparison_unit,
+            "pure_alcohol_ml": content_ml * columns["abv_percent"] / 100.0,
+        }
+
+
+def rows(derived: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """CSV rows: floats rounded to 4 decimals, NaN as empty."""
+    rounded = {
+        name: np.round(derived[name], 4).tolist()
+        for name in DERIVED_COLUMNS
+        if derived[name].dtype.kind == "f"
+    }
+    for i, gtin in enumerate(derived["gtin"]):
+        row: Dict[str, Any] = {"gtin": gtin}
+        for name in DERIVED_COLUMNS:
+            if name in rounded:
+                v = rounded[name][i]
+                row[name] = "" if v != v else v
+            else:
+                row[name] = derived[name][i]
+        yield row
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = """Usage:
+  python3 cin_derived.py [--out=cin_derived.csv] <records>...
+
+records: cin_signals.json / cin_compact.json files, or the NDJSON output
+of the --ndjson modes (.ndjson, .ndjson.gz)"""
+
+
+def main():
+    out = next((a.split("=", 1)[1] for a in sys.argv if a.startswith("--out=")), None)
+    paths = [Path(a) for a in sys.argv[1:] if not a.startswith("--")]
+    if not paths:
+        print(USAGE)
+        sys.exit(1)
+
+    metrics.configure()
+    columns = measurement_columns(doc for p in paths for doc in read_documents(p))
+    derived = derive(columns)
+
+    out_path = Path(out) if out else OUT_PATH
+    with metrics.stage("write"), out_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["gtin", *DERIVED_COLUMNS])
+        writer.writeheader()
+        writer.writerows(rows(derived))
+
+    print(f"✅ {len(columns['gtin'])} products")
+    print(f"📁 {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import sys
+import json
 import xml.etree.ElementTree as ET
-from typing import Optional, List, Dict, Any
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Collection
+
+from cin_metrics import metrics
+from cin_units import LENGTH_MM, MASS_G, normalize, quantity
 
 # =========================================================
 # Namespaces
@@ -41,13 +47,58 @@ def _texts(root: ET.Element, path: str) -> List[str]:
     ]
 
 
+def _measure(root: ET.Element, path: str, table: Dict[str, float]) -> Optional[float]:
+    el = root.find(path, NS)
+    if el is None:
+        return None
+    return normalize(el.text, el.attrib.get("measurementUnitCode"), table)
+
+
+def _quantity(root: ET.Element, path: str) -> Optional[Dict[str, Any]]:
+    el = root.find(path, NS)
+    if el is None:
+        return None
+    return quantity(el.text, el.attrib.get("measurementUnitCode"))
+
+
+def _multilingual(
+    root: ET.Element, path: str, languages: Optional[Collection[str]]
+) -> List[Dict[str, Any]]:
+    """
+    [{"lang", "text"}] in document order, restricted to `languages` (all
+    when None). Language codes are interned; a document repeats them for
+    every translated field.
+    """
+    out = []
+    for el in root.findall(path):
+        lang = el.attrib.get("languageCode")
+        if not el.text or (languages is not None and lang not in languages):
+            continue
+        out.append({"lang": sys.intern(lang) if lang else lang, "text": el.text})
+    return out
+
+
 # =========================================================
 # Extraction
 # =========================================================
 
 
-def extract_cin_signals(cin_xml: str) -> Dict[str, Any]:
-    root = ET.fromstring(cin_xml)
+def extract_cin_signals(
+    cin_xml: str, languages: Optional[Collection[str]] = None
+) -> Dict[str, Any]:
+    with metrics.stage("parse", len(cin_xml)):
+        root = ET.fromstring(cin_xml)
+    with metrics.stage("extract"):
+        return signals_from_root(root, languages)
+
+
+def signals_from_root(
+    root: ET.Element, languages: Optional[Collection[str]] = None
+) -> Dict[str, Any]:
+    """
+    Signals below an already parsed element (a whole CIN or one tradeItem).
+    `languages` limits the multilingual naming fields to those codes.
+    """
     sales_condition = _text(root, ".//consumerSalesConditionCode")
 
     signals: Dict[str, Any] = {
@@ -92,30 +143,11 @@ def extract_cin_signals(cin_xml: str) -> Dict[str, Any]:
         # Naming & descriptions (multilingual safe)
         # -------------------------------------------------
         "naming": {
-            "description_short": [
-                {
-                    "lang": d.attrib.get("languageCode"),
-                    "text": d.text,
-                }
-                for d in root.findall(".//descriptionShort")
-                if d.text
-            ],
-            "functional_name": [
-                {
-                    "lang": f.attrib.get("languageCode"),
-                    "text": f.text,
-                }
-                for f in root.findall(".//functionalName")
-                if f.text
-            ],
-            "regulated_product_name": [
-                {
-                    "lang": r.attrib.get("languageCode"),
-                    "text": r.text,
-                }
-                for r in root.findall(".//regulatedProductName")
-                if r.text
-            ],
+            "description_short": _multilingual(root, ".//descriptionShort", languages),
+            "functional_name": _multilingual(root, ".//functionalName", languages),
+            "regulated_product_name": _multilingual(
+                root, ".//regulatedProductName", languages
+            ),
         },
         # -------------------------------------------------
         # VAT / tax
@@ -141,12 +173,14 @@ def extract_cin_signals(cin_xml: str) -> Dict[str, Any]:
             "descriptive": _text(root, ".//descriptiveSizeDimension"),
             "net_content": _text(root, ".//netContent"),
         },
+        # floats normalized from measurementUnitCode
         "measurements": {
-            "width_mm": _text(root, ".//width"),
-            "height_mm": _text(root, ".//height"),
-            "depth_mm": _text(root, ".//depth"),
-            "gross_weight_g": _text(root, ".//grossWeight"),
-            "net_weight_g": _text(root, ".//netWeight"),
+            "width_mm": _measure(root, ".//width", LENGTH_MM),
+            "height_mm": _measure(root, ".//height", LENGTH_MM),
+            "depth_mm": _measure(root, ".//depth", LENGTH_MM),
+            "gross_weight_g": _measure(root, ".//grossWeight", MASS_G),
+            "net_weight_g": _measure(root, ".//netWeight", MASS_G),
+            "net_content": _quantity(root, ".//netContent"),
             "nesting": {
                 "direction": _text(root, ".//nestingDirectionCode"),
                 "increment": _text(root, ".//nestingIncrement"),
@@ -277,6 +311,9 @@ def extract_cin_signals(cin_xml: str) -> Dict[str, Any]:
         "sales": {
             "price_comparison_value": _text(root, ".//priceComparisonMeasurement"),
             "price_comparison_unit": _text(root, ".//priceComparisonContentTypeCode"),
+            "price_comparison_quantity": _quantity(
+                root, ".//priceComparisonMeasurement"
+            ),
         },
         # -------------------------------------------------
         # Dates
@@ -297,3 +334,78 @@ def extract_cin_signals(cin_xml: str) -> Dict[str, Any]:
     }
 
     return signals
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = """Usage:
+  python3 cin_extract.py [--profile-memory] [--media-index] [--languages=sv,en] <cin.xml>...
+  python3 cin_extract.py --ndjson [--media-index] [--out=<signals.ndjson[.gz]>] [<cin.xml>...]
+      (paths from stdin when none are given; one {"path", "signals"} per line)"""
+
+
+def _languages_from_argv(argv: List[str]) -> Optional[List[str]]:
+    """Strip --languages=sv,en from argv (in place); None keeps every language."""
+    value = next((a for a in argv if a.startswith("--languages=")), None)
+    if value is None:
+        return None
+    argv.remove(value)
+    codes = [sys.intern(c.strip()) for c in value.split("=", 1)[1].split(",")]
+    return [c for c in codes if c] or None
+
+
+def _read_cin(path: Path) -> str:
+    with metrics.stage("decode") as st:
+        data = path.read_bytes()
+        st.add_bytes(len(data))
+        return data.decode("utf-8")
+
+
+if __name__ == "__main__":
+    # CLI-only: importing the extractor stays cheap (fetch_cin, cin_hierarchy,
+    # worker pools)
+    from contextlib import nullcontext
+
+    from cin_media_index import index_from_argv
+    from cin_memprofile import profiler_from_argv
+    from cin_ndjson import run_ndjson
+
+    profiler = profiler_from_argv(sys.argv)
+    languages = _languages_from_argv(sys.argv)
+    media_index = index_from_argv(sys.argv)
+    metrics.configure()
+
+    if "--ndjson" in sys.argv:
+
+        def handle(path: str) -> Dict[str, Any]:
+            with profiler.document(path) if profiler else nullcontext() as doc:
+                signals = extract_cin_signals(_read_cin(Path(path)), languages)
+                if doc is not None:
+                    doc["gtin"] = signals["identity"]["gtin"] or path
+                if media_index is not None:
+                    media_index.update_signals(signals)
+                return {"path": path, "signals": signals}
+
+        sys.exit(1 if run_ndjson(sys.argv, handle, key="path") else 0)
+
+    paths = [Path(a) for a in sys.argv[1:]]
+    if not paths:
+        print(USAGE)
+        sys.exit(1)
+
+    for path in paths:
+        with profiler.document(str(path)) if profiler else nullcontext() as doc:
+            signals = extract_cin_signals(_read_cin(path), languages)
+            if doc is not None:
+                doc["gtin"] = signals["identity"]["gtin"] or str(path)
+            if media_index is not None:
+                media_index.update_signals(signals)
+
+            with metrics.stage("serialize"):
+                out = json.dumps(signals, indent=2, ensure_ascii=False)
+
+            out_path = path.with_name(f"{path.stem}_signals.json")
+            out_path.write_text(out, encoding="utf-8")
+            print(f"📁 {out_path}")
@@ -0,0 +1,305 @@
+import sys
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+import gpc
+
+# =========================================================
+# Config
+# =========================================================
+
+INDEX_PATH = Path("cin_filter_index.npz")
+
+# Containment levels that count as "contains" when an allergen key is
+# given without a level, e.g. "allergen:AM" -> CONTAINS | MAY_CONTAIN.
+PRESENT_LEVELS = ("CONTAINS", "MAY_CONTAIN")
+
+_ONE = np.uint64(1)
+
+# gpc key prefix per level of gpc.enrich_levels (the brick is "gpc:")
+GPC_LEVEL_KEYS = {1: "gpc_segment", 2: "gpc_family", 3: "gpc_class"}
+
+# =========================================================
+# Keys
+# =========================================================
+
+
+def gpc_levels(codes: List[Optional[str]]) -> List[Dict[str, Any]]:
+    """
+    {"level_1_code", ...} per brick code, in one gpc.enrich_levels batch;
+    empty dicts when no gpc_codes.json is available.
+    """
+    if not gpc.GPC_FILE.exists():
+        return [{} for _ in codes]
+    columns = gpc.enrich_levels(codes)
+    return [
+        {
+            f"level_{level}_code": columns[f"level_{level}_code"][i]
+            for level in GPC_LEVEL_KEYS
+        }
+        for i in range(len(codes))
+    ]
+
+
+def _gpc_code(signals: Dict[str, Any]) -> Optional[str]:
+    return signals.get("classification", {}).get("gpc_code")
+
+
+def signal_keys(
+    signals: Dict[str, Any], levels: Optional[Dict[str, Any]] = None
+) -> Set[str]:
+    """
+    Bitset keys for one cin_signals.json document:
+    - allergen:<code>:<containment>
+    - diet:<code>
+    - restriction:<condition code>, plus "restricted"
+    - gpc:<brick code>, gpc_class:, gpc_family:, gpc_segment:<code>
+
+    `levels` is the document's gpc_levels() entry; looked up when not given.
+    """
+    keys: Set[str] = set()
+
+    for a in signals.get("allergens", {}).get("items", []):
+        if a.get("code"):
+            keys.add(f"allergen:{a['code']}:{a.get('containment')}")
+
+    for d in signals.get("diet", {}).get("types", []):
+        if d.get("code"):
+            keys.add(f"diet:{d['code']}")
+
+    restrictions = signals.get("sales_restrictions", {})
+    if restrictions.get("consumer_sale_restricted"):
+        keys.add("restricted")
+    if restrictions.get("condition_code"):
+        keys.add(f"restriction:{restrictions['condition_code']}")
+
+    gpc_code = _gpc_code(signals)
+    if gpc_code:
+        keys.add(f"gpc:{gpc_code}")
+        if levels is None:
+            levels = gpc_levels([gpc_code])[0]
+        for level, prefix in GPC_LEVEL_KEYS.items():
+            code = levels.get(f"level_{level}_code")
+            if code is not None:
+                keys.add(f"{prefix}:{code}")
+
+    return keys
+
+
+# =========================================================
+# Index
+# =========================================================
+
+
+class BitsetIndex:
+    """
+    One bitset (uint64 words) per key, one bit per product row.
+    Filters are combined with vectorized AND/OR/NOT over the word arrays.
+    """
+
+    def __init__(self, words: int = 16):
+        self.words = words
+        self.gtins: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.row_keys: List[Set[str]] = []
+        self.live = np.zeros(words, dtype=np.uint64)
+        self.bitsets: Dict[str, np.ndarray] = {}
+
+    # -----------------------------------------------------
+    # Maintenance
+    # -----------------------------------------------------
+
+    def _grow(self, row: int) -> None:
+        needed = (row >> 6) + 1
+        if needed <= self.words:
+            return
+        words = max(needed, self.words * 2)
+        pad = np.zeros(words - self.words, dtype=np.uint64)
+        self.live = np.concatenate([self.live, pad])
+        for key, bits in self.bitsets.items():
+            self.bitsets[key] = np.concatenate([bits, pad])
+        self.words = words
+
+    def _set(self, bits: np.ndarray, row: int) -> None:
+        bits[row >> 6] |= _ONE << np.uint64(row & 63)
+
+    def _clear(self, bits: np.ndarray, row: int) -> None:
+        bits[row >> 6] &= ~(_ONE << np.uint64(row & 63))
+
+    def update(
+        self,
+        gtin: str,
+        signals: Dict[str, Any],
+        levels: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Add or replace one product; only its changed keys are touched."""
+        row = self.rows.get(gtin)
+        if row is None:
+            row = len(self.gtins)
+            self._grow(row)
+            self.gtins.append(gtin)
+            self.rows[gtin] = row
+            self.row_keys.append(set())
+
+        old, new = self.row_keys[row], signal_keys(signals, levels)
+        for key in old - new:
+            self._clear(self.bitsets[key], row)
+        for key in new - old:
+            if key not in self.bitsets:
+                self.bitsets[key] = np.zeros(self.words, dtype=np.uint64)
+            self._set(self.bitsets[key], row)
+
+        self.row_keys[row] = new
+        self._set(self.live, row)
+
+    def remove(self, gtin: str) -> None:
+        row = self.rows.get(gtin)
+        if row is None:
+            return
+        for key in self.row_keys[row]:
+            self._clear(self.bitsets[key], row)
+        self.row_keys[row] = set()
+        self._clear(self.live, row)
+
+    # -----------------------------------------------------
+    # Queries
+    # -----------------------------------------------------
+
+    def mask(self, key: str) -> np.ndarray:
+        """
+        Bitset for a key. "allergen:<code>" without a level is the union of
+        PRESENT_LEVELS for that allergen.
+        """
+        bits = self.bitsets.get(key)
+        if bits is not None:
+            return bits
+        out = np.zeros(self.words, dtype=np.uint64)
+        if key.startswith("allergen:") and key.count(":") == 1:
+            for level in PRESENT_LEVELS:
+                level_bits = self.bitsets.get(f"{key}:{level}")
+                if level_bits is not None:
+                    out |= level_bits
+        return out
+
+    def select(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+    ) -> np.ndarray:
+        result = self.live.copy()
+        for key in all_of:
+            result &= self.mask(key)
+        any_of = list(any_of)
+        if any_of:
+            union = np.zeros(self.words, dtype=np.uint64)
+            for key in any_of:
+                union |= self.mask(key)
+            result &= union
+        for key in none_of:
+            result &= ~self.mask(key)
+        return result
+
+    def gtins_for(self, bits: np.ndarray) -> List[str]:
+        flags = np.unpackbits(bits.view(np.uint8), bitorder="little")
+        return [self.gtins[row] for row in np.flatnonzero(flags[: len(self.gtins)])]
+
+    def count(self, bits: np.ndarray) -> int:
+        return int(np.unpackbits(bits.view(np.uint8)).sum())
+
+    # -----------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        meta = {
+            "gtins": self.gtins,
+            "row_keys": [sorted(k) for k in self.row_keys],
+            "keys": list(self.bitsets),
+        }
+        arrays = {f"k{i}": bits for i, bits in enumerate(self.bitsets.values())}
+        with open(path, "wb") as f:
+            np.savez(f, live=self.live, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH) -> "BitsetIndex":
+        index = cls()
+        if not path.exists():
+            return index
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            index.live = data["live"].copy()
+            index.words = len(index.live)
+            index.bitsets = {
+                key: data[f"k{i}"].copy() for i, key in enumerate(meta["keys"])
+            }
+        index.gtins = meta["gtins"]
+        index.rows = {gtin: row for row, gtin in enumerate(index.gtins)}
+        index.row_keys = [set(k) for k in meta["row_keys"]]
+        return index
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = """Usage:
+  python3 cin_filter_index.py add <cin_signals.json>...
+  python3 cin_filter_index.py remove <GTIN>...
+  python3 cin_filter_index.py query [+all_of] [-none_of] [any_of]...
+
+Example: query +diet:VEGAN -allergen:AM -allergen:AW -restricted
+         query +gpc_family:50200000 -allergen:AM
+
+Keys: allergen:<code>[:<level>], diet:<code>, restriction:<code>, restricted,
+gpc:<brick>, gpc_class:<code>, gpc_family:<code>, gpc_segment:<code>"""
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(USAGE)
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    index = BitsetIndex.load()
+
+    if command == "add":
+        docs = []
+        for path in args:
+            with open(path, encoding="utf-8") as f:
+                docs.append(json.load(f))
+        # one GPC batch for every product
+        for signals, levels in zip(docs, gpc_levels([_gpc_code(d) for d in docs])):
+            index.update(signals["identity"]["gtin"], signals, levels)
+        index.save()
+        print(f"✅ Indexed {len(args)} products ({len(index.bitsets)} bitsets)")
+
+    elif command == "remove":
+        for gtin in args:
+            index.remove(gtin)
+        index.save()
+        print(f"✅ Removed {len(args)} products")
+
+    elif command == "query":
+        args = [a for a in args if a.strip("+-")]
+        if not args:
+            print(USAGE)
+            sys.exit(1)
+        bits = index.select(
+            all_of=[a[1:] for a in args if a.startswith("+")],
+            none_of=[a[1:] for a in args if a.startswith("-")],
+            any_of=[a for a in args if a[0] not in "+-"],
+        )
+        for gtin in index.gtins_for(bits):
+            print(gtin)
+
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import sys
+import json
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+import requests
+
+# loads .env and checks credentials on import
+import fetch_cin
+from cin_extract import signals_from_root
+from cin_metrics import metrics
+
+# =========================================================
+# Config
+# =========================================================
+
+WORKERS = 8
+# pallet -> case -> inner -> each is 4; leave headroom for displays
+MAX_DEPTH = 8
+
+OUT_PATH = "cin_hierarchy.json"
+
+
+# =========================================================
+# Levels
+# =========================================================
+
+
+def _text(el: ET.Element, path: str) -> Optional[str]:
+    found = el.find(path)
+    if found is not None and found.text:
+        return found.text.strip()
+    return None
+
+
+def level_from_trade_item(item: ET.Element) -> Dict[str, Any]:
+    """
+    One hierarchy level from a tradeItem element. Signals are taken from
+    this element only, so a parent's values never leak from nested
+    children (they live in the sibling catalogueItemChildItemLink).
+    """
+    signals = signals_from_root(item)
+    return {
+        "gtin": _text(item, "gtin"),
+        "descriptor": _text(item, "tradeItemUnitDescriptorCode"),
+        "trade_unit": signals["trade_unit"],
+        "size": signals["size"],
+        "measurements": signals["measurements"],
+        "children": [
+            {
+                "gtin": _text(child, "gtin"),
+                "quantity": int(_text(child, "quantityOfNextLowerLevelTradeItem") or 0),
+            }
+            for child in item.findall(
+                "nextLowerLevelTradeItemInformation/childTradeItem"
+            )
+        ],
+    }
+
+
+def parse_levels(cin_xml: str) -> List[Dict[str, Any]]:
+    """Every level in a CIN; a notification may embed its whole hierarchy."""
+    with metrics.stage("parse", len(cin_xml)):
+        root = ET.fromstring(cin_xml)
+    with metrics.stage("extract"):
+        return [level_from_trade_item(item) for item in root.iter("tradeItem")]
+
+
+# =========================================================
+# Resolver
+# =========================================================
+
+
+class HierarchyResolver:
+    """
+    Resolves GTINs to their trade-item hierarchy (each, case, pallet, ...).
+
+    Every round issues a single search for all family GTINs not searched
+    yet and fetches the new items concurrently over one pooled session. Levels are
+    cached by GTIN for the resolver's lifetime, so cases and pallets shared
+    by several consumer units are fetched and parsed once.
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        workers: int = WORKERS,
+    ):
+        self.session = session or requests.Session()
+        self.token = token or fetch_cin.get_access_token(self.session)
+        self.token_lock = threading.Lock()
+        self.workers = workers
+        self.levels: Dict[str, Dict[str, Any]] = {}
+        self.searched: Set[str] = set()
+        self.not_found: Set[str] = set()
+
+    def _call(self, fn, arg):
+        token = self.token
+        try:
+            return fn(token, arg, self.session)
+        except fetch_cin.AuthError:
+            # long walks outlive the token: renew once (not once per
+            # thread that saw it expire) and retry
+            with self.token_lock:
+                if self.token == token:
+                    self.token = fetch_cin.get_access_token(self.session)
+            return fn(self.token, arg, self.session)
+
+    def _get_item(self, item_id: int) -> dict:
+        return self._call(fetch_cin.get_item_by_id, item_id)
+
+    def fetch(self, gtins: Set[str]) -> None:
+        results = self._call(fetch_cin.search_by_gtins, sorted(gtins))
+        self.searched |= gtins
+
+        # the search can return other levels of the family too; take them all
+        item_ids = {}
+        for gtin in dict.fromkeys(r.get("gtin") for r in results):
+            if gtin and gtin not in self.levels:
+                item_ids[gtin] = fetch_cin.select_item_id(results, gtin)
+        self.not_found |= gtins - item_ids.keys() - self.levels.keys()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                gtin: pool.submit(self._get_item, item_id)
+                for gtin, item_id in item_ids.items()
+            }
+
+        # one failing item must not lose the rest of the family
+        failed: Dict[str, str] = {}
+        for gtin, future in futures.items():
+            item_id = item_ids[gtin]
+            try:
+                cin_xml = fetch_cin.decode_cin(future.result().get("cin"))
+                if not cin_xml:
+                    failed[gtin] = "No CIN returned"
+                    continue
+                levels = parse_levels(cin_xml)
+            except Exception as e:
+                metrics.count("item_error")
+                failed[gtin] = str(e)[:500]
+                continue
+            for level in levels:
+                if level["gtin"] == gtin:
+                    self.levels[gtin] = {"item_id": item_id, **level}
+                elif level["gtin"]:
+                    # embedded level: used unless its own document arrives
+                    self.levels.setdefault(level["gtin"], {"item_id": None, **level})
+
+        for gtin, error in failed.items():
+            # an embedded copy from another document beats an error entry
+            self.levels.setdefault(
+                gtin,
+                {
+                    "gtin": gtin,
+                    "item_id": item_ids[gtin],
+                    "children": [],
+                    "error": error,
+                },
+            )
+
+    def family(self, gtin: str) -> Set[str]:
+        """Known GTINs linked to `gtin` through parent/child references."""
+        neighbours: Dict[str, Set[str]] = {}
+        for level in self.levels.values():
+            for child in level["children"]:
+                neighbours.setdefault(level["gtin"], set()).add(child["gtin"])
+                neighbours.setdefault(child["gtin"], set()).add(level["gtin"])
+
+        seen, stack = {gtin}, [gtin]
+        while stack:
+            for other in neighbours.get(stack.pop(), ()):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def resolve(self, gtin: str) -> Optional[Dict[str, Any]]:
+        # searching a level also returns its parents, so every member of the
+        # family is searched once: that finds both missing children and the
+        # levels above
+        pending = {gtin} - self.searched
+        for _ in range(MAX_DEPTH):
+            if not pending:
+                break
+            self.fetch(pending)
+            pending = self.family(gtin) - self.searched
+
+        if gtin not in self.levels:
+            return None
+        return self.tree(gtin)
+
+    # -----------------------------------------------------
+    # Tree
+    # -----------------------------------------------------
+
+    def _node(self, gtin: str, quantity: Optional[int], path: Set[str]) -> dict:
+        level = self.levels.get(gtin)
+        if level is None:
+            return {"gtin": gtin, "quantity": quantity, "error": "Not found"}
+
+        node = {k: v for k, v in level.items() if k != "children"}
+        if quantity is not None:
+            node["quantity"] = quantity
+        # a child listed under itself would recurse forever
+        path = path | {gtin}
+        node["children"] = [
+            self._node(c["gtin"], c["quantity"], path)
+            for c in level["children"]
+            if c["gtin"] not in path
+        ]
+        return node
+
+    def tree(self, gtin: str) -> Dict[str, Any]:
+        """
+        {"gtin", "levels", "roots", "not_found"}: roots are the top levels
+        of the family (usually one pallet or case), each node carrying its
+        measurements, its quantity within the parent and its children;
+        not_found lists family GTINs the search did not return.
+        """
+        family = self.family(gtin)
+        children = {
+            c["gtin"]
+            for g in family
+            if g in self.levels
+            for c in self.levels[g]["children"]
+        }
+        roots = sorted(g for g in family if g not in children) or [gtin]
+        return {
+            "gtin": gtin,
+            "levels": len(family & self.levels.keys()),
+            "roots": [self._node(g, None, set()) for g in roots],
+            "not_found": sorted(family & self.not_found - self.levels.keys()),
+        }
+
+
+# =========================================================
+# MAIN
+# =========================================================
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 cin_hierarchy.py <GTIN>...")
+        sys.exit(1)
+
+    metrics.configure()
+    resolver = HierarchyResolver()
+
+    trees = {}
+    for gtin in sys.argv[1:]:
+        tree = resolver.resolve(gtin)
+        if tree is None:
+            print(f"❌ {gtin} not found")
+            continue
+        trees[gtin] = tree
+        print(f"📦 {gtin}: {tree['levels']} level(s)")
+        if tree["not_found"]:
+            print(f"⚠️ not found: {', '.join(tree['not_found'])}")
+
+    with open(OUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(trees, f, indent=2, ensure_ascii=False)
+
+    print(f"📁 {OUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import sys
+import json
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from cin_metrics import metrics
+from cin_ndjson import read_documents
+
+# =========================================================
+# Config
+# =========================================================
+
+INDEX_PATH = Path("cin_media.sqlite")
+
+# metadata that makes a file "changed" for the mirror
+META_FIELDS = ["type", "format", "file_name", "width_px", "height_px", "size"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    uri_hash TEXT PRIMARY KEY,
+    uri TEXT NOT NULL,
+    type TEXT,
+    format TEXT,
+    file_name TEXT,
+    width_px INTEGER,
+    height_px INTEGER,
+    file_size INTEGER,
+    meta_hash TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    gone_at TEXT,
+    mirrored_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS ref (
+    gtin TEXT NOT NULL,
+    uri_hash TEXT NOT NULL,
+    is_primary INTEGER NOT NULL,
+    PRIMARY KEY (gtin, uri_hash)
+);
+CREATE INDEX IF NOT EXISTS ref_uri ON ref (uri_hash);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+# =========================================================
+# Keys
+# =========================================================
+
+
+def normalize_uri(uri: str) -> str:
+    """Trimmed, with scheme and host lower-cased; path and query kept as is."""
+    parts = urlsplit(uri.strip())
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, parts.query, "")
+    )
+
+
+def uri_hash(uri: str) -> str:
+    return hashlib.sha256(normalize_uri(uri).encode("utf-8")).hexdigest()
+
+
+def meta_hash(entry: Dict[str, Any]) -> str:
+    payload = json.dumps([entry.get(k) for k in META_FIELDS], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =========================================================
+# Index
+# =========================================================
+
+
+class MediaIndex:
+    """
+    Catalogue-wide index of referenced files, one row per distinct URI.
+
+    - media: uri_hash -> file metadata, first_seen/changed_at, gone_at once
+      no product references the URI any more, and the metadata hash the
+      mirror last fetched
+    - ref: (gtin, uri_hash, is_primary), replaced per product on update
+
+    pending() is what the mirroring job has to fetch (new, or metadata
+    changed since it was mirrored); gone() is what it may delete.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    # -----------------------------------------------------
+    # Updates
+    # -----------------------------------------------------
+
+    def update(self, gtin: str, media: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Replace the files referenced by `gtin` with `media` (the signals
+        "media" list). Returns counts of new, changed and released URIs;
+        released ones are marked gone when nothing else references them.
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        for m in media:
+            if m.get("uri"):
+                # the same file listed twice keeps its first metadata
+                entries.setdefault(uri_hash(m["uri"]), m)
+
+        stats = {"new": 0, "changed": 0, "released": 0}
+        now = _now()
+        with metrics.stage("media_index"), self.conn:
+            old = {
+                r[0]
+                for r in self.conn.execute(
+                    "SELECT uri_hash FROM ref WHERE gtin = ?", (gtin,)
+                )
+            }
+
+            for h, m in entries.items():
+                digest = meta_hash(m)
+                row = self.conn.execute(
+                    "SELECT meta_hash, gone_at FROM media WHERE uri_hash = ?", (h,)
+                ).fetchone()
+                values = (
+                    normalize_uri(m["uri"]),
+                    m.get("type"),
+                    m.get("format"),
+                    m.get("file_name"),
+                    _int(m.get("width_px")),
+                    _int(m.get("height_px")),
+                    _int(m.get("size")),
+                    digest,
+                )
+                if row is None:
+                    stats["new"] += 1
+                    self.conn.execute(
+                        "INSERT INTO media (uri, type, format, file_name, width_px, "
+                        "height_px, file_size, meta_hash, uri_hash, first_seen, "
+                        "changed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (*values, h, now, now),
+                    )
+                elif row[0] != digest or row[1] is not None:
+                    stats["changed"] += 1
+                    # a revived file may already be deleted from the mirror
+                    # (gone() before purge()): have it fetched again
+                    self.conn.execute(
+                        "UPDATE media SET uri = ?, type = ?, format = ?, "
+                        "file_name = ?, width_px = ?, height_px = ?, file_size = ?, "
+                        "meta_hash = ?, changed_at = ?, gone_at = NULL, "
+                        "mirrored_hash = CASE WHEN gone_at IS NULL "
+                        "THEN mirrored_hash END "
+                        "WHERE uri_hash = ?",
+                        (*values, now, h),
+                    )
+
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO ref (gtin, uri_hash, is_primary) "
+                    "VALUES (?, ?, ?)",
+                    (gtin, h, int(str(m.get("is_primary")).upper() == "TRUE")),
+                )
+
+            released = old - entries.keys()
+            stats["released"] = len(released)
+            for h in released:
+                self.conn.execute(
+                    "DELETE FROM ref WHERE gtin = ? AND uri_hash = ?", (gtin, h)
+                )
+            self._mark_gone(released, now)
+        return stats
+
+    def update_signals(self, signals: Dict[str, Any]) -> Dict[str, int]:
+        gtin = signals["identity"]["gtin"]
+        if not gtin:
+            return {"new": 0, "changed": 0, "released": 0}
+        return self.update(gtin, signals.get("media") or [])
+
+    def remove(self, gtin: str) -> None:
+        """Drop a product; its files are marked gone when no longer shared."""
+        with self.conn:
+            hashes = {
+                r[0]
+                for r in self.conn.execute(
+                    "SELECT uri_hash FROM ref WHERE gtin = ?", (gtin,)
+                )
+            }
+            self.conn.execute("DELETE FROM ref WHERE gtin = ?", (gtin,))
+            self._mark_gone(hashes, _now())
+
+    def _mark_gone(self, hashes, now: str) -> None:
+        for h in hashes:
+            self.conn.execute(
+                "UPDATE media SET gone_at = ? WHERE uri_hash = ? AND gone_at IS NULL "
+                "AND NOT EXISTS (SELECT 1 FROM ref WHERE ref.uri_hash = ?)",
+                (now, h, h),
+            )
+
+    # -----------------------------------------------------
+    # Mirroring
+    # -----------------------------------------------------
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Live files never mirrored, or whose metadata changed since."""
+        rows = self.conn.execute(
+            "SELECT uri_hash, uri, type, format, file_size, meta_hash FROM media "
+            "WHERE gone_at IS NULL AND (mirrored_hash IS NULL "
+            "OR mirrored_hash != meta_hash) ORDER BY first_seen, uri_hash"
+        ).fetchall()
+        return [
+            {
+                "uri_hash": r[0],
+                "uri": r[1],
+                "type": r[2],
+                "format": r[3],
+                "size": r[4],
+                "meta_hash": r[5],
+            }
+            for r in rows
+        ]
+
+    def mark_mirrored(self, hashes: Dict[str, str]) -> None:
+        """{uri_hash: meta_hash as fetched} once the mirror has the files."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE media SET mirrored_hash = ? WHERE uri_hash = ?",
+                [(digest, h) for h, digest in hashes.items()],
+            )
+
+    def gone(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT uri_hash, uri, gone_at FROM media WHERE gone_at IS NOT NULL "
+            "ORDER BY gone_at"
+        ).fetchall()
+        return [{"uri_hash": r[0], "uri": r[1], "gone_at": r[2]} for r in rows]
+
+    def purge(self, hashes: List[str]) -> None:
+        """Forget gone files once the mirror has deleted them."""
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM media WHERE uri_hash = ? AND gone_at IS NOT NULL",
+                [(h,) for h in hashes],
+            )
+
+    # -----------------------------------------------------
+    # Lookups
+    # -----------------------------------------------------
+
+    def gtins_for(self, uri: str) -> List[str]:
+        rows = self.conn.execute(
+            "SELECT gtin FROM ref WHERE uri_hash = ? ORDER BY gtin", (uri_hash(uri),)
+        )
+        return [r[0] for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        def one(sql: str) -> int:
+            return self.conn.execute(sql).fetchone()[0]
+
+        return {
+            "files": one("SELECT COUNT(*) FROM media WHERE gone_at IS NULL"),
+            "shared": one(
+                "SELECT COUNT(*) FROM (SELECT uri_hash FROM ref "
+                "GROUP BY uri_hash HAVING COUNT(*) > 1)"
+            ),
+            "pending": len(self.pending()),
+            "gone": one("SELECT COUNT(*) FROM media WHERE gone_at IS NOT NULL"),
+            "products": one("SELECT COUNT(DISTINCT gtin) FROM ref"),
+        }
+
+
+def index_from_argv(argv: List[str]) -> Optional[MediaIndex]:
+    """Strip --media-index from argv (in place) and open the index if given."""
+    if "--media-index" not in argv:
+        return None
+    while "--media-index" in argv:
+        argv.remove("--media-index")
+    return MediaIndex()
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = """Usage:
+  python3 cin_media_index.py add <signals>...
+      (cin_signals.json files or --ndjson output, .ndjson / .ndjson.gz)
+  python3 cin_media_index.py remove <GTIN>...
+  python3 cin_media_index.py pending | gone | stats
+  python3 cin_media_index.py gtins <uri>"""
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    index = MediaIndex()
+
+    if command == "add" and args:
+        totals = {"products": 0, "new": 0, "changed": 0, "released": 0}
+        for path in args:
+            for doc in read_documents(Path(path)):
+                signals = doc.get("signals") or doc
+                for key, n in index.update_signals(signals).items():
+                    totals[key] += n
+                totals["products"] += 1
+        print(
+            f"✅ {totals['products']} products: {totals['new']} new, "
+            f"{totals['changed']} changed, {totals['released']} released"
+        )
+
+    elif command == "remove" and args:
+        for gtin in args:
+            index.remove(gtin)
+        print(f"✅ Removed {len(args)} products")
+
+    elif command in ("pending", "gone"):
+        for entry in getattr(index, command)():
+            print(f"{entry['uri_hash'][:12]}  {entry['uri']}")
+
+    elif command == "stats":
+        print(json.dumps(index.stats(), indent=2))
+
+    elif command == "gtins" and len(args) == 1:
+        for gtin in index.gtins_for(args[0]):
+            print(gtin)
+
+    else:
+        print(USAGE)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
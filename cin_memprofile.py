@@ -0,0 +1,218 @@
+import sys
+import json
+import atexit
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cin_metrics import metrics
+
+# =========================================================
+# Config
+# =========================================================
+
+REPORT_FILE = Path("memory_profile.json")
+TOP_SITES = 10
+WORST_DOCUMENTS = 20
+
+
+# =========================================================
+# Profiler
+# =========================================================
+
+
+class MemoryProfiler:
+    """
+    tracemalloc-based peak memory per document and per stage.
+
+    Attaches to cin_metrics, so every metrics.stage() (decode, parse,
+    extract, write/serialize, ...) is measured without further changes.
+    Stage peaks are bytes above what was allocated when the stage started;
+    document peaks are bytes above the start of the document. Nested stages
+    fold their peak into the enclosing ones before tracemalloc's peak is
+    reset.
+
+    For each stage the allocation sites still live at the end of its worst
+    run are kept (e.g. the element tree after "parse").
+    """
+
+    def __init__(self, report_path: Path = REPORT_FILE, top: int = TOP_SITES):
+        self.report_path = report_path
+        self.top = top
+        self.documents: List[Dict[str, Any]] = []
+        self.stage_peaks: Dict[str, List[int]] = {}
+        self.stage_worst: Dict[str, Dict[str, Any]] = {}
+        # open frames: [name, base bytes, max absolute bytes]; index 0 is the document
+        self._frames: List[list] = []
+        self._doc: Optional[Dict[str, Any]] = None
+        self._started = False
+
+    def start(self) -> None:
+        """Begin tracing; the report is written and summarised at exit."""
+        if self._started:
+            return
+        self._started = True
+        tracemalloc.start()
+        metrics.attach(self)
+        atexit.register(self.finish)
+
+    def finish(self) -> None:
+        if not self._started:
+            return
+        if self._doc is not None:
+            self.end_document()
+        metrics.detach()
+        tracemalloc.stop()
+        self._started = False
+        self.write_report()
+        self.print_summary()
+
+    # -----------------------------------------------------
+    # Frames
+    # -----------------------------------------------------
+
+    def _fold(self) -> int:
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._frames:
+            frame[2] = max(frame[2], peak)
+        return peak
+
+    def _push(self, name: str) -> None:
+        self._fold()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        self._frames.append([name, current, current])
+
+    def _pop(self) -> int:
+        self._fold()
+        _, base, top = self._frames.pop()
+        return top - base
+
+    def begin_document(self, label: str) -> Dict[str, Any]:
+        if self._doc is not None:
+            self.end_document()
+        self._doc = {"gtin": label, "peak_bytes": 0, "stages": {}}
+        self._frames = []
+        self._push("document")
+        return self._doc
+
+    def end_document(self) -> None:
+        doc = self._doc
+        # the base may still hold the previous document's objects, freed mid-way
+        doc["peak_bytes"] = max(self._pop(), *doc["stages"].values(), 0)
+        self.documents.append(doc)
+        self._doc = None
+        self._frames = []
+
+    @contextmanager
+    def document(self, label: str):
+        """with profiler.document(path) as doc: ...; doc["gtin"] = gtin"""
+        doc = self.begin_document(label)
+        try:
+            yield doc
+        finally:
+            if self._doc is doc:
+                self.end_document()
+
+    # -----------------------------------------------------
+    # cin_metrics hook
+    # -----------------------------------------------------
+
+    def enter(self, name: str) -> None:
+        self._push(name)
+
+    def exit(self, name: str) -> None:
+        peak = self._pop()
+        self.stage_peaks.setdefault(name, []).append(peak)
+
+        doc = self._doc
+        if doc is not None:
+            doc["stages"][name] = max(doc["stages"].get(name, 0), peak)
+
+        worst = self.stage_worst.get(name)
+        if worst is None or peak > worst["peak_bytes"]:
+            self.stage_worst[name] = {
+                "peak_bytes": peak,
+                "document": doc,
+                "top_sites": self._sites(),
+            }
+
+    def _sites(self) -> List[Dict[str, Any]]:
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        return [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: self.top]
+        ]
+
+    # -----------------------------------------------------
+    # Report
+    # -----------------------------------------------------
+
+    def report(self, worst: int = WORST_DOCUMENTS) -> Dict[str, Any]:
+        ranked = sorted(self.documents, key=lambda d: d["peak_bytes"], reverse=True)
+        return {
+            "documents": len(self.documents),
+            "worst_documents": ranked[:worst],
+            "stages": {
+                name: {
+                    "runs": len(peaks),
+                    "max_peak_bytes": max(peaks),
+                    "mean_peak_bytes": sum(peaks) // len(peaks),
+                    # entry points may replace the label with the GTIN later
+                    "worst_gtin": (self.stage_worst[name]["document"] or {}).get(
+                        "gtin"
+                    ),
+                    "top_sites": self.stage_worst[name]["top_sites"],
+                }
+                for name, peaks in self.stage_peaks.items()
+            },
+        }
+
+    def write_report(self) -> None:
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+    def print_summary(self, worst: int = 5) -> None:
+        report = self.report(worst)
+        # stderr: in --ndjson mode stdout is the data stream
+        print(f"🧠 Memory profile: {report['documents']} document(s)", file=sys.stderr)
+        for doc in report["worst_documents"]:
+            stages = ", ".join(
+                f"{k} {_mb(v)}"
+                for k, v in sorted(doc["stages"].items(), key=lambda kv: -kv[1])
+            )
+            print(
+                f"   {doc['gtin']}  peak {_mb(doc['peak_bytes'])}  ({stages})",
+                file=sys.stderr,
+            )
+        print(f"📁 {self.report_path}", file=sys.stderr)
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1e6:.2f} MB"
+
+
+# =========================================================
+# CLI flag
+# =========================================================
+
+
+def profiler_from_argv(argv: List[str]) -> Optional[MemoryProfiler]:
+    """Strip --profile-memory from argv (in place) and start a profiler if given."""
+    if "--profile-memory" not in argv:
+        return None
+    while "--profile-memory" in argv:
+        argv.remove("--profile-memory")
+    profiler = MemoryProfiler()
+    profiler.start()
+    return profiler
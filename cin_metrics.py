@@ -0,0 +1,295 @@
+import os
+import json
+import atexit
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# =========================================================
+# Config
+# =========================================================
+#
+# Disabled unless an export path is configured:
+#   CIN_METRICS_JSON=run_metrics.json   JSON summary at exit
+#   CIN_METRICS_PROM=/var/lib/node_exporter/textfile/cin.prom
+#                                       Prometheus text format at exit
+#
+# Scripts call metrics.configure() after load_dotenv(); library code only
+# calls metrics.stage() / count() / observe(), which are no-ops until then.
+# A hook attached with metrics.attach() (see cin_memprofile.py) also enables
+# recording and is told when each stage starts and ends.
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7)
+
+PREFIX = "cin"
+
+
+# =========================================================
+# Primitives
+# =========================================================
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] is observations <= buckets[i], last is +Inf."""
+
+    __slots__ = ("buckets", "counts", "total", "n", "min", "max")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.n += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> List[int]:
+        out, running = [], 0
+        for c in self.counts:
+            running += c
+            out.append(running)
+        return out
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.n,
+            "sum": round(self.total, 6),
+            "min": round(self.min, 6) if self.n else None,
+            "max": round(self.max, 6),
+            "mean": round(self.total / self.n, 6) if self.n else None,
+            "buckets": dict(zip([*map(_fmt, self.buckets), "+Inf"], self.cumulative())),
+        }
+
+
+class Stage:
+    """Timer context for one stage run; records time, bytes and errors on exit."""
+
+    __slots__ = ("metrics", "name", "nbytes", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, nbytes: int):
+        self.metrics = metrics
+        self.name = name
+        self.nbytes = nbytes
+
+    def add_bytes(self, n: int) -> None:
+        self.nbytes += n
+
+    def __enter__(self) -> "Stage":
+        if self.metrics.hook is not None:
+            self.metrics.hook.enter(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.metrics._record(
+            self.name, time.perf_counter() - self.start, self.nbytes, exc_type
+        )
+        if self.metrics.hook is not None:
+            self.metrics.hook.exit(self.name)
+        return False
+
+
+class _NullStage:
+    """Shared stand-in for Stage while metrics are disabled."""
+
+    __slots__ = ()
+
+    def add_bytes(self, n: int) -> None:
+        pass
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# =========================================================
+# Registry
+# =========================================================
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.exporting = False
+        self.hook = None
+        self.json_path: Optional[Path] = None
+        self.prom_path: Optional[Path] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.stages: Dict[str, Histogram] = {}
+        self.stage_bytes: Dict[str, int] = {}
+        self.stage_errors: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def configure(
+        self, json_path: Optional[str] = None, prom_path: Optional[str] = None
+    ) -> bool:
+        """Enable from arguments or CIN_METRICS_JSON / CIN_METRICS_PROM; export at exit."""
+        json_path = json_path or os.getenv("CIN_METRICS_JSON")
+        prom_path = prom_path or os.getenv("CIN_METRICS_PROM")
+        if not (json_path or prom_path):
+            return False
+        self.json_path = Path(json_path) if json_path else None
+        self.prom_path = Path(prom_path) if prom_path else None
+        self.enabled = True
+        if not self.exporting:
+            self.exporting = True
+            atexit.register(self.export)
+        return True
+
+    def attach(self, hook) -> None:
+        """Call hook.enter(name) / hook.exit(name) around every stage."""
+        self.hook = hook
+        self.enabled = True
+
+    def detach(self) -> None:
+        self.hook = None
+        self.enabled = self.exporting
+
+    # -----------------------------------------------------
+    # Recording
+    # -----------------------------------------------------
+
+    def stage(self, name: str, nbytes: int = 0):
+        """with metrics.stage("parse", len(xml)) as st: ... ; st.add_bytes(n)"""
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, nbytes)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = SECONDS_BUCKETS
+    ) -> None:
+        if self.enabled:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram(buckets)
+            hist.observe(value)
+
+    def _record(self, name: str, seconds: float, nbytes: int, exc_type) -> None:
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = self.stages[name] = Histogram(SECONDS_BUCKETS)
+            self.stage_bytes[name] = 0
+            self.stage_errors[name] = 0
+        hist.observe(seconds)
+        self.stage_bytes[name] += nbytes
+        if exc_type is not None:
+            self.stage_errors[name] += 1
+
+    # -----------------------------------------------------
+    # Export
+    # -----------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "started": self.started_at,
+            "wall_seconds": round(time.monotonic() - self.started, 6),
+            "stages": {
+                name: {
+                    **hist.summary(),
+                    "bytes": self.stage_bytes[name],
+                    "errors": self.stage_errors[name],
+                }
+                for name, hist in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "histograms": {n: h.summary() for n, h in self.histograms.items()},
+        }
+
+    def prometheus(self) -> str:
+        lines: List[str] = []
+
+        def histogram(metric: str, label: str, items: Dict[str, Histogram]) -> None:
+            for value, hist in items.items():
+                labels = f'{label}="{value}",' if label else ""
+                bounds = [*map(_fmt, hist.buckets), "+Inf"]
+                for le, c in zip(bounds, hist.cumulative()):
+                    lines.append(f'{metric}_bucket{{{labels}le="{le}"}} {c}')
+                labels = f"{{{labels[:-1]}}}" if labels else ""
+                lines.append(f"{metric}_sum{labels} {hist.total}")
+                lines.append(f"{metric}_count{labels} {hist.n}")
+
+        if self.stages:
+            metric = f"{PREFIX}_stage_seconds"
+            lines += [
+                f"# HELP {metric} Wall time per pipeline stage.",
+                f"# TYPE {metric} histogram",
+            ]
+            histogram(metric, "stage", self.stages)
+            for metric, values, help_text in (
+                (
+                    f"{PREFIX}_stage_bytes_total",
+                    self.stage_bytes,
+                    "Bytes handled per stage.",
+                ),
+                (
+                    f"{PREFIX}_stage_errors_total",
+                    self.stage_errors,
+                    "Stage runs that raised.",
+                ),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{stage="{k}"}} {v}' for k, v in values.items()]
+
+        if self.counters:
+            metric = f"{PREFIX}_events_total"
+            lines += [
+                f"# HELP {metric} Items and outcomes.",
+                f"# TYPE {metric} counter",
+            ]
+            lines += [f'{metric}{{event="{k}"}} {v}' for k, v in self.counters.items()]
+
+        for name, hist in self.histograms.items():
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            histogram(metric, "", {name: hist})
+
+        metric = f"{PREFIX}_run_seconds"
+        lines += [
+            f"# TYPE {metric} gauge",
+            f"{metric} {time.monotonic() - self.started}",
+            f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge",
+            f"{PREFIX}_last_run_timestamp_seconds {time.time()}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self) -> None:
+        # written via rename so the node exporter never reads a partial file
+        for path, render in (
+            (self.json_path, lambda: json.dumps(self.summary(), indent=2)),
+            (self.prom_path, self.prometheus),
+        ):
+            if path is None:
+                continue
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(render(), encoding="utf-8")
+            tmp.replace(path)
+
+
+metrics = Metrics()
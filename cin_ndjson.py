@@ -0,0 +1,147 @@
+import os
+import sys
+import gzip
+import json
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from cin_metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json otherwise
+    orjson = None
+
+# =========================================================
+# Config
+# =========================================================
+
+# lines buffered before one write + flush
+BATCH_SIZE = int(os.getenv("CIN_NDJSON_BATCH", "256"))
+
+
+# =========================================================
+# Encoding
+# =========================================================
+
+
+def dumps_line(obj: Any) -> bytes:
+    """One compact JSON document plus newline, UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (
+        json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        + b"\n"
+    )
+
+
+def read_lines(stream: IO[str]) -> Iterator[str]:
+    """Non-empty lines without surrounding whitespace; '#' starts a comment line."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def read_documents(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    One JSON document, or every line of NDJSON written by the --ndjson
+    modes (.ndjson / .ndjson.gz); error lines are skipped.
+    """
+    name = path.name
+    if not (name.endswith(".ndjson") or name.endswith(".ndjson.gz")):
+        with open(path, encoding="utf-8") as f:
+            yield json.load(f)
+        return
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                doc = json.loads(line)
+                if "error" not in doc:
+                    yield doc
+
+
+class NDJSONWriter:
+    """
+    Buffered NDJSON sink: stdout when path is None, gzip when it ends in
+    .gz, a plain file otherwise. Lines are written and flushed BATCH_SIZE at
+    a time, so a consumer downstream sees output in steady chunks.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: int = BATCH_SIZE):
+        if path is None:
+            self.f, self.owned = sys.stdout.buffer, False
+        elif path.endswith(".gz"):
+            self.f, self.owned = gzip.open(path, "wb", compresslevel=6), True
+        else:
+            self.f, self.owned = open(path, "wb"), True
+        self.batch_size = batch_size
+        self.buffer: List[bytes] = []
+        self.lines = 0
+
+    def write(self, obj: Any) -> None:
+        self.buffer.append(dumps_line(obj))
+        self.lines += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            with metrics.stage("write") as st:
+                data = b"".join(self.buffer)
+                self.f.write(data)
+                self.f.flush()
+                st.add_bytes(len(data))
+            self.buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self.owned:
+            self.f.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+# =========================================================
+# CLI mode
+# =========================================================
+
+
+def run_ndjson(
+    argv: List[str],
+    handle: Callable[[str], Dict[str, Any]],
+    key: str = "input",
+    inputs: Optional[Iterable[str]] = None,
+) -> int:
+    """
+    Streaming mode shared by the CLIs: `--ndjson [--out=<file[.gz]>] [inputs...]`.
+
+    Inputs are the positional arguments, or stdin lines when there are none.
+    handle(input) returns one JSON object per input; an exception becomes
+    {key: input, "error": ...} so one bad item never stops the stream.
+    Progress goes to stderr, data to stdout or --out. Returns the error count.
+    """
+    out = next((a.split("=", 1)[1] for a in argv if a.startswith("--out=")), None)
+    if inputs is None:
+        inputs = [a for a in argv[1:] if not a.startswith("--")] or read_lines(
+            sys.stdin
+        )
+
+    errors = 0
+    with NDJSONWriter(out) as writer:
+        for item in inputs:
+            try:
+                writer.write(handle(item))
+                metrics.count("items")
+            except Exception as e:
+                errors += 1
+                metrics.count("errors")
+                writer.write({key: item, "error": str(e)[:500]})
+
+    print(f"✅ {writer.lines} line(s), {errors} error(s)", file=sys.stderr)
+    return errors
@@ -0,0 +1,361 @@
+import os
+import sys
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import requests
+
+# loads .env and checks credentials on import
+import fetch_cin
+import gpc
+from cin_extract import extract_cin_signals
+from cin_metrics import metrics
+
+# the compact extractor lives in v3/
+V3_DIR = Path(__file__).resolve().parent / "v3"
+if str(V3_DIR) not in sys.path:
+    sys.path.append(str(V3_DIR))
+
+from cin_compact import compact_snapshot  # noqa: E402
+from cin_snapshot import snapshot_cin  # noqa: E402
+
+# =========================================================
+# Config
+# =========================================================
+
+HOST = os.getenv("CIN_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.getenv("CIN_SERVICE_PORT", "8780"))
+CACHE_SIZE = int(os.getenv("CIN_CACHE_SIZE", "10000"))
+# seconds a cached response or CIN is served before Validoo is asked again
+# (republished items); 0 keeps entries until evicted
+CACHE_TTL = float(os.getenv("CIN_CACHE_TTL", "3600"))
+WORKERS = int(os.getenv("CIN_SERVICE_WORKERS", "8"))
+# the token endpoint does not tell us the lifetime; renew well before an hour
+TOKEN_TTL = float(os.getenv("CIN_TOKEN_TTL", "3000"))
+
+# (status, JSON body) as sent to clients
+Response = Tuple[int, bytes]
+
+
+def _json(status: int, data: Any) -> Response:
+    return status, json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+# =========================================================
+# Caches
+# =========================================================
+
+
+class LRU:
+    """
+    Bounded OrderedDict; most recently used entries last. Entries older
+    than `ttl` seconds (when > 0) count as misses and are dropped on access.
+    """
+
+    def __init__(self, size: int, ttl: float = CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        # key -> (expiry on the monotonic clock, value)
+        self.data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self.data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del self.data[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else float("inf")
+        self.data[key] = (expires, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.size:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key: Any) -> bool:
+        return self.data.pop(key, None) is not None
+
+
+class Coalescer:
+    """Concurrent calls for the same key share one in-flight future."""
+
+    def __init__(self):
+        self.inflight: Dict[Any, asyncio.Future] = {}
+
+    async def run(self, key: Any, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.inflight.get(key)
+        if future is not None:
+            metrics.count("coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # the leader was cancelled, not this waiter: fail normally
+                    raise RuntimeError("Coalesced request was cancelled") from None
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # waiters get the exception; keep the loop from logging it as lost
+            future.exception()
+            raise
+        finally:
+            # cancelled leader (client gone, shutdown): release the waiters
+            if not future.done():
+                future.cancel()
+            del self.inflight[key]
+
+
+# =========================================================
+# Service
+# =========================================================
+
+
+class CinService:
+    """
+    Warm state shared by all requests: a pooled requests.Session, the
+    access token, the GPC index and an LRU of encoded responses per
+    (kind, gtin). Blocking Validoo calls and parsing run on a thread pool.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE, workers: int = WORKERS):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=workers, pool_maxsize=workers
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cache = LRU(cache_size)
+        self.cins = LRU(max(1, cache_size // 10))
+        self.coalescer = Coalescer()
+        self.token: Optional[str] = None
+        self.token_expires = 0.0
+        self.token_lock = asyncio.Lock()
+        self.gpc_loaded = False
+
+    async def _blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, fn, *args
+        )
+
+    async def warm(self) -> None:
+        if gpc.GPC_FILE.exists():
+            await self._blocking(gpc.index)
+            self.gpc_loaded = True
+        await self.get_token()
+
+    async def get_token(self, refresh: bool = False) -> str:
+        async with self.token_lock:
+            if refresh or self.token is None or time.monotonic() >= self.token_expires:
+                self.token = await self._blocking(
+                    fetch_cin.get_access_token, self.session
+                )
+                self.token_expires = time.monotonic() + TOKEN_TTL
+            return self.token
+
+    # -----------------------------------------------------
+    # Fetch
+    # -----------------------------------------------------
+
+    def _fetch_cin(self, token: str, gtin: str) -> Optional[str]:
+        results = fetch_cin.search_by_gtin(token, gtin, self.session)
+        item_id = fetch_cin.select_item_id(results, gtin)
+        if item_id is None:
+            return None
+        item = fetch_cin.get_item_by_id(token, item_id, self.session)
+        return fetch_cin.decode_cin(item.get("cin")) or ""
+
+    async def cin(self, gtin: str) -> Optional[str]:
+        """Decoded CIN ("" when the item has none, None when the GTIN is unknown)."""
+        cached = self.cins.get(gtin)
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            token = await self.get_token()
+            try:
+                return await self._blocking(self._fetch_cin, token, gtin)
+            except fetch_cin.AuthError:
+                # expired or revoked token: renew once and retry
+                token = await self.get_token(refresh=True)
+                return await self._blocking(self._fetch_cin, token, gtin)
+
+        cin_xml = await self.coalescer.run(("cin", gtin), fetch)
+        if cin_xml:
+            self.cins.put(gtin, cin_xml)
+        return cin_xml
+
+    # -----------------------------------------------------
+    # Views
+    # -----------------------------------------------------
+
+    def _signals(self, cin_xml: str) -> Dict[str, Any]:
+        signals = extract_cin_signals(cin_xml)
+        code = signals["classification"]["gpc_code"]
+        if self.gpc_loaded and code:
+            signals["classification"]["gpc_levels"] = gpc.get_level_names(code)
+        return signals
+
+    def _compact(self, cin_xml: str) -> Dict[str, Any]:
+        return compact_snapshot(snapshot_cin(cin_xml, with_hashes=False))
+
+    VIEWS = {"signals": _signals, "compact": _compact}
+
+    async def lookup(self, kind: str, gtin: str) -> Response:
+        key = (kind, gtin)
+        cached = self.cache.get(key)
+        if cached is not None:
+            metrics.count("cache_hit")
+            return cached
+
+        async def build() -> Response:
+            cin_xml = await self.cin(gtin)
+            if cin_xml is None:
+                return _json(404, {"error": "GTIN not found", "gtin": gtin})
+            if not cin_xml:
+                return _json(404, {"error": "No CIN returned", "gtin": gtin})
+            data = await self._blocking(self.VIEWS[kind], self, cin_xml)
+            return _json(200, data)
+
+        response = await self.coalescer.run(key, build)
+        if response[0] == 200:
+            self.cache.put(key, response)
+        return response
+
+    def invalidate(self, gtin: str) -> int:
+        """Drop the cached CIN and every view of `gtin`; returns entries dropped."""
+        keys = [(kind, gtin) for kind in self.VIEWS]
+        dropped = sum(self.cache.invalidate(key) for key in keys)
+        return dropped + self.cins.invalidate(gtin)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_entries": len(self.cache.data),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_expired": self.cache.expired,
+            "inflight": len(self.coalescer.inflight),
+            "gpc_loaded": self.gpc_loaded,
+        }
+
+    # -----------------------------------------------------
+    # HTTP
+    # -----------------------------------------------------
+
+    async def route(self, method: str, path: str) -> Response:
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "cache":
+            # e.g. after a republication notice, ahead of CIN_CACHE_TTL
+            return _json(200, {"gtin": parts[1], "dropped": self.invalidate(parts[1])})
+        if method != "GET":
+            return _json(405, {"error": "Method not allowed"})
+        if parts == ["health"]:
+            return _json(200, self.stats())
+        if len(parts) == 2 and parts[0] in self.VIEWS and parts[1].isdigit():
+            try:
+                return await self.lookup(parts[0], parts[1])
+            except Exception as e:
+                metrics.count("lookup_error")
+                return _json(502, {"error": str(e)[:500]})
+        return _json(404, {"error": "Not found"})
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Minimal HTTP/1.1 with keep-alive; requests have no body."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                keep_alive = True
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "connection":
+                        keep_alive = value.strip().lower() != "close"
+
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                    status, body = await self.route(method, path)
+                except ValueError:
+                    status, body = _json(400, {"error": "Bad request"})
+                    keep_alive = False
+
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    "\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    502: "Bad Gateway",
+}
+
+
+# =========================================================
+# MAIN
+# =========================================================
+
+
+async def serve(host: str = HOST, port: int = PORT) -> None:
+    service = CinService()
+    await service.warm()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(
+        f"🛰️  Serving on http://{host}:{port}  "
+        "(/signals/<gtin>, /compact/<gtin>, DELETE /cache/<gtin>)"
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    metrics.configure()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n✅ Stopped")
+
+
+if __name__ == "__main__":
+    main()
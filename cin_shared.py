@@ -0,0 +1,181 @@
+import os
+import json
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+# =========================================================
+# Format
+# =========================================================
+#
+# One file of read-only tables, built once by a parent process and mapped
+# by every worker. Pages live in the OS page cache, so N workers share one
+# copy and attaching is an mmap plus a small JSON header, whatever the size.
+#
+#   MAGIC | u64 header length | JSON header | padding | table data ...
+#
+# Tables are typed arrays (array.array typecodes b/h/i/q/d, exposed as
+# memoryview casts) or string lists (UTF-8 blob plus int64 offsets).
+
+MAGIC = b"CINTBL1\n"
+ALIGN = 8
+
+Table = Union[array, List[Optional[str]]]
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+class StringTable(Sequence):
+    """List-like view of strings in a mapped blob, decoded on access."""
+
+    def __init__(
+        self,
+        blob: memoryview,
+        offsets: memoryview,
+        nulls: Optional[memoryview] = None,
+    ):
+        self.blob = blob
+        self.offsets = offsets
+        self.nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return str(self.blob[self.offsets[i] : self.offsets[i + 1]], "utf-8")
+
+
+# =========================================================
+# Writing
+# =========================================================
+
+
+def _encode_strings(values: List[Optional[str]]):
+    offsets = array("q", [0])
+    nulls = array("b")
+    parts = []
+    pos = 0
+    for v in values:
+        data = b"" if v is None else v.encode("utf-8")
+        parts.append(data)
+        pos += len(data)
+        offsets.append(pos)
+        nulls.append(v is None)
+    return b"".join(parts), offsets, nulls if any(nulls) else None
+
+
+def write_tables(
+    path: Path, tables: Dict[str, Table], meta: Optional[Dict[str, Any]] = None
+) -> Path:
+    """Write `tables` (name -> array.array or list of str) atomically."""
+    chunks: List[bytes] = []
+    entries: Dict[str, Dict[str, Any]] = {}
+    pos = 0
+
+    def add(data: bytes) -> int:
+        nonlocal pos
+        start = pos
+        chunks.append(data)
+        chunks.append(b"\0" * _pad(len(data)))
+        pos += len(data) + _pad(len(data))
+        return start
+
+    for name, table in tables.items():
+        if isinstance(table, array):
+            entries[name] = {
+                "kind": "array",
+                "typecode": table.typecode,
+                "offset": add(table.tobytes()),
+                "length": len(table),
+            }
+        else:
+            blob, offsets, nulls = _encode_strings(table)
+            entries[name] = {
+                "kind": "strings",
+                "blob": [add(blob), len(blob)],
+                "offsets": add(offsets.tobytes()),
+                "length": len(table),
+                "nulls": add(nulls.tobytes()) if nulls is not None else None,
+            }
+
+    header = json.dumps({"meta": meta or {}, "tables": entries}).encode("utf-8")
+    start = len(MAGIC) + 8 + len(header)
+    start += _pad(start)
+
+    tmp = path.with_suffix(f"{path.suffix}.tmp")
+    with tmp.open("wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(b"\0" * (start - f.tell()))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, path)
+    return path
+
+
+# =========================================================
+# Attaching
+# =========================================================
+
+
+def _read_header(f) -> Dict[str, Any]:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not a shared table file")
+    (size,) = struct.unpack("<Q", f.read(8))
+    return json.loads(f.read(size))
+
+
+def read_meta(path: Path) -> Dict[str, Any]:
+    """The meta dict of a table file, without mapping it."""
+    with path.open("rb") as f:
+        return _read_header(f)["meta"]
+
+
+class SharedTables:
+    """
+    Read-only mapping of a write_tables() file. Tables are zero-copy views
+    into the map: arrays as typed memoryviews (np.frombuffer works on them
+    directly), string lists as StringTable.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            header = _read_header(f)
+            base = f.tell()
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.base = base + _pad(base)
+        self.meta: Dict[str, Any] = header["meta"]
+        self.entries: Dict[str, Dict[str, Any]] = header["tables"]
+        self.view = memoryview(self.map)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def __getitem__(self, name: str) -> Union[memoryview, StringTable]:
+        e = self.entries[name]
+        if e["kind"] == "array":
+            return self._array(e["offset"], e["typecode"], e["length"])
+
+        blob_at, blob_len = e["blob"]
+        blob = self.view[self.base + blob_at : self.base + blob_at + blob_len]
+        offsets = self._array(e["offsets"], "q", e["length"] + 1)
+        nulls = None
+        if e["nulls"] is not None:
+            nulls = self._array(e["nulls"], "b", e["length"])
+        return StringTable(blob, offsets, nulls)
+
+    def _array(self, offset: int, typecode: str, length: int) -> memoryview:
+        start = self.base + offset
+        size = array(typecode).itemsize * length
+        return self.view[start : start + size].cast(typecode)
@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional
+
+# =========================================================
+# Units
+# =========================================================
+#
+# UN/ECE Rec 20 codes as used in measurementUnitCode, with the factor to
+# the canonical unit of their dimension: mm, g or ml.
+
+LENGTH_MM = {
+    "MMT": 1.0,
+    "CMT": 10.0,
+    "DMT": 100.0,
+    "MTR": 1000.0,
+    "INH": 25.4,
+    "FOT": 304.8,
+}
+
+MASS_G = {
+    "MGM": 0.001,
+    "GRM": 1.0,
+    "KGM": 1000.0,
+    "ONZ": 28.349523125,
+    "LBR": 453.59237,
+}
+
+VOLUME_ML = {
+    "MLT": 1.0,
+    "CMQ": 1.0,
+    "CLT": 10.0,
+    "DLT": 100.0,
+    "LTR": 1000.0,
+    "MTQ": 1e6,
+    "OZA": 29.5735295625,
+}
+
+CANONICAL = {
+    **{code: ("mm", f) for code, f in LENGTH_MM.items()},
+    **{code: ("g", f) for code, f in MASS_G.items()},
+    **{code: ("ml", f) for code, f in VOLUME_ML.items()},
+}
+
+
+# =========================================================
+# Parsing
+# =========================================================
+
+
+def to_float(text: Optional[str]) -> Optional[float]:
+    """'6,5' and '6.5' -> 6.5; None for anything that is not a number."""
+    if text is None:
+        return None
+    try:
+        return float(text.strip().replace(",", "."))
+    except ValueError:
+        return None
+
+
+def normalize(
+    text: Optional[str], unit: Optional[str], table: Dict[str, float]
+) -> Optional[float]:
+    """
+    Value in the canonical unit of `table` (LENGTH_MM, MASS_G, VOLUME_ML).
+    A missing unit is taken as canonical already; a unit of another
+    dimension gives None rather than a wrong number.
+    """
+    value = to_float(text)
+    if value is None:
+        return None
+    if unit is None:
+        return value
+    factor = table.get(unit)
+    return value * factor if factor is not None else None
+
+
+def quantity(text: Optional[str], unit: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    {"value", "unit"} for a quantity of any dimension (net content, price
+    comparison): mm/g/ml when the unit is known, else the value as given
+    with its original code (e.g. H87 pieces).
+    """
+    value = to_float(text)
+    if value is None:
+        return None
+    canonical = CANONICAL.get(unit)
+    if canonical is None:
+        return {"value": value, "unit": unit}
+    return {"value": value * canonical[1], "unit": canonical[0]}
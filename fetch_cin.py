@@ -3,19 +3,27 @@ import sys
 import json
 import base64
 import requests
+from contextlib import nullcontext
 from dotenv import load_dotenv
 
+from cin_client import AuthError, check, request, select_item_id
+from cin_archive import CinArchive
 from cin_extract import extract_cin_signals
+from cin_memprofile import profiler_from_argv
+from cin_metrics import BYTES_BUCKETS, metrics
+from cin_ndjson import run_ndjson
+from cin_media_index import index_from_argv
 
 # =========================================================
 # CONFIG
 # =========================================================
 
-BASE_URL = "https://services.validoo.se/tradeitem.api"
-TOKEN_URL = "https://identity.validoo.se/connect/token"
-
 load_dotenv()
 
+# overridable to point at a mock or recording proxy (see validoo_mock.py)
+BASE_URL = os.getenv("VALI_BASE_URL", "https://services.validoo.se/tradeitem.api")
+TOKEN_URL = os.getenv("VALI_TOKEN_URL", "https://identity.validoo.se/connect/token")
+
 CLIENT_ID = os.getenv("VALI_CLIENT_ID")
 CLIENT_SECRET = os.getenv("VALI_CLIENT_SECRET")
 USERNAME = os.getenv("VALI_USERNAME")
@@ -25,13 +33,17 @@ if not all([CLIENT_ID, CLIENT_SECRET, USERNAME, PASSWORD]):
     print("❌ Missing Validoo credentials in .env")
     sys.exit(1)
 
+# archived extract kind; bumped when the signals shape changes so older
+# results are recomputed instead of served from the archive
+SIGNALS_KIND = "signals/2"
+
 
 # =========================================================
 # AUTH
 # =========================================================
 
 
-def get_access_token() -> str:
+def get_access_token(session: requests.Session | None = None) -> str:
     payload = {
         "grant_type": "password",
         "client_id": CLIENT_ID,
@@ -42,7 +54,8 @@ def get_access_token() -> str:
     }
 
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(TOKEN_URL, data=payload, headers=headers)
+    with metrics.stage("token"):
+        resp = request("POST", TOKEN_URL, session, data=payload, headers=headers)
 
     if resp.status_code != 200:
         raise RuntimeError(resp.text)
@@ -55,7 +68,16 @@ def get_access_token() -> str:
 # =========================================================
 
 
-def search_by_gtin(token: str, gtin: str) -> list[dict]:
+def search_by_gtin(
+    token: str, gtin: str, session: requests.Session | None = None
+) -> list[dict]:
+    return search_by_gtins(token, [gtin], session)
+
+
+def search_by_gtins(
+    token: str, gtins: list[str], session: requests.Session | None = None
+) -> list[dict]:
+    """One search request for several GTINs (e.g. all levels of a hierarchy)."""
     url = f"{BASE_URL}/TradeItemInformation/search"
     headers = {
         "Authorization": f"Bearer {token}",
@@ -63,24 +85,28 @@ def search_by_gtin(token: str, gtin: str) -> list[dict]:
         "Content-Type": "application/json",
     }
 
-    payload = {"gtins": [gtin], "itemStatus": ["published"]}
-    resp = requests.post(url, headers=headers, json=payload)
+    payload = {"gtins": gtins, "itemStatus": ["published"]}
+    with metrics.stage("search") as st:
+        resp = request("POST", url, session, headers=headers, json=payload)
+        st.add_bytes(len(resp.content))
 
-    if resp.status_code != 200:
-        raise RuntimeError(resp.text)
+    check(resp)
 
     return resp.json().get("results", [])
 
 
-def get_item_by_id(token: str, item_id: int) -> dict:
+def get_item_by_id(
+    token: str, item_id: int, session: requests.Session | None = None
+) -> dict:
     url = f"{BASE_URL}/TradeItemInformation/getItemById"
     headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
     params = {"id": item_id, "dataType": "Product", "allowInvalid": True}
 
-    resp = requests.get(url, headers=headers, params=params)
+    with metrics.stage("get_item_by_id") as st:
+        resp = request("GET", url, session, headers=headers, params=params)
+        st.add_bytes(len(resp.content))
 
-    if resp.status_code != 200:
-        raise RuntimeError(resp.text)
+    check(resp)
 
     return resp.json()[0]
 
@@ -88,55 +114,134 @@ def get_item_by_id(token: str, item_id: int) -> dict:
 def decode_cin(cin_b64: str | None) -> str | None:
     if not cin_b64:
         return None
-    return base64.b64decode(cin_b64).decode("utf-8")
+    with metrics.stage("decode", len(cin_b64)):
+        data = base64.b64decode(cin_b64)
+        metrics.observe("document_bytes", len(data), BYTES_BUCKETS)
+        return data.decode("utf-8")
+
+
+def fetch_signals(
+    gtin: str, token: str, session: requests.Session, archive: CinArchive
+) -> dict:
+    results = search_by_gtin(token, gtin, session)
+    item_id = select_item_id(results, gtin)
+    if item_id is None:
+        metrics.count("gtin_not_found")
+        return {"gtin": gtin, "error": "GTIN not found"}
+
+    cin_xml = decode_cin(get_item_by_id(token, item_id, session).get("cin"))
+    if not cin_xml:
+        metrics.count("no_cin")
+        return {"gtin": gtin, "item_id": item_id, "error": "No CIN returned"}
+
+    with metrics.stage("archive"):
+        sha = archive.put(cin_xml, gtin=gtin, item_id=item_id)
+    signals = archive.extract(sha, SIGNALS_KIND, extract_cin_signals, cin_xml)
+    return {"gtin": gtin, "item_id": item_id, "sha256": sha, "signals": signals}
 
 
 # =========================================================
 # MAIN
 # =========================================================
 
+USAGE = """Usage:
+  python3 fetch_cin.py [--profile-memory] [--media-index] <GTIN>
+  python3 fetch_cin.py --ndjson [--profile-memory] [--media-index] [--out=<signals.ndjson[.gz]>] [<GTIN>...]
+      (GTINs from stdin when none are given; one JSON object per line)"""
+
+
+def main_ndjson(media_index=None, profiler=None):
+    metrics.configure()
+    session = requests.Session()
+    archive = CinArchive()
+    token = [get_access_token(session)]
+
+    def fetch(gtin: str) -> dict:
+        try:
+            return fetch_signals(gtin, token[0], session, archive)
+        except AuthError:
+            # long streams outlive the token: renew once and retry
+            token[0] = get_access_token(session)
+            return fetch_signals(gtin, token[0], session, archive)
+
+    def handle(gtin: str) -> dict:
+        with profiler.document(gtin) if profiler else nullcontext():
+            record = fetch(gtin)
+            if media_index is not None and "signals" in record:
+                media_index.update_signals(record["signals"])
+            return record
+
+    sys.exit(1 if run_ndjson(sys.argv, handle, key="gtin") else 0)
+
 
 def main():
+    profiler = profiler_from_argv(sys.argv)
+    media_index = index_from_argv(sys.argv)
+    if "--ndjson" in sys.argv:
+        main_ndjson(media_index, profiler)
+
     if len(sys.argv) != 2:
-        print("Usage: python3 fetch_cin.py <GTIN>")
+        print(USAGE)
         sys.exit(1)
 
     gtin = sys.argv[1]
     print(f"🔎 Fetching {gtin}")
+    metrics.configure()
+    if profiler:
+        profiler.begin_document(gtin)
 
     token = get_access_token()
     results = search_by_gtin(token, gtin)
 
-    matches = [r for r in results if r.get("gtin") == gtin]
-    if not matches:
+    item_id = select_item_id(results, gtin)
+    if item_id is None:
+        metrics.count("gtin_not_found")
         print("❌ GTIN not found")
         sys.exit(1)
 
-    consumer_units = [r for r in matches if r.get("isTradeItemAConsumerUnit") is True]
-
-    item_id = consumer_units[0]["itemId"] if consumer_units else matches[0]["itemId"]
     item = get_item_by_id(token, item_id)
 
-    with open("trade_item_raw.json", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open(
+        "trade_item_raw.json", "w", encoding="utf-8"
+    ) as f:
         json.dump(item, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
 
     cin_xml = decode_cin(item.get("cin"))
     if not cin_xml:
+        metrics.count("no_cin")
         print("⚠️ No CIN returned")
         sys.exit(0)
 
-    with open("cin.xml", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open("cin.xml", "w", encoding="utf-8") as f:
         f.write(cin_xml)
+        st.add_bytes(f.tell())
 
-    signals = extract_cin_signals(cin_xml)
+    # Unchanged republications hit the archive and skip parsing
+    archive = CinArchive()
+    with metrics.stage("archive"):
+        sha = archive.put(cin_xml, gtin=gtin, item_id=item_id)
+    signals = archive.extract(sha, SIGNALS_KIND, extract_cin_signals, cin_xml)
 
-    with open("cin_signals.json", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open(
+        "cin_signals.json", "w", encoding="utf-8"
+    ) as f:
         json.dump(signals, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
+    metrics.count("items")
+
+    if media_index is not None:
+        media = media_index.update_signals(signals)
+        print(
+            f"🖼️ Media: {media['new']} new, {media['changed']} changed, "
+            f"{media['released']} released"
+        )
 
     print("✅ Done")
     print("📁 trade_item_raw.json")
     print("📁 cin.xml")
     print("📁 cin_signals.json")
+    print(f"🗄️ cin_archive/{sha[:12]}")
 
 
 if __name__ == "__main__":
@@ -4,18 +4,25 @@ import json
 import base64
 import requests
 import xml.etree.ElementTree as ET
+from contextlib import nullcontext
 from dotenv import load_dotenv
 from typing import Optional
 
+from cin_client import AuthError, check, request, select_item_id
+from cin_memprofile import profiler_from_argv
+from cin_metrics import BYTES_BUCKETS, metrics
+from cin_ndjson import run_ndjson
+
 # =========================================================
 # CONFIG
 # =========================================================
 
-BASE_URL = "https://services.validoo.se/tradeitem.api"
-TOKEN_URL = "https://identity.validoo.se/connect/token"
-
 load_dotenv()
 
+# overridable to point at a mock or recording proxy (see validoo_mock.py)
+BASE_URL = os.getenv("VALI_BASE_URL", "https://services.validoo.se/tradeitem.api")
+TOKEN_URL = os.getenv("VALI_TOKEN_URL", "https://identity.validoo.se/connect/token")
+
 CLIENT_ID = os.getenv("VALI_CLIENT_ID")
 CLIENT_SECRET = os.getenv("VALI_CLIENT_SECRET")
 USERNAME = os.getenv("VALI_USERNAME")
@@ -30,7 +37,7 @@ if not all([CLIENT_ID, CLIENT_SECRET, USERNAME, PASSWORD]):
 # =========================================================
 
 
-def get_access_token() -> str:
+def get_access_token(session: Optional[requests.Session] = None) -> str:
     payload = {
         "grant_type": "password",
         "client_id": CLIENT_ID,
@@ -41,7 +48,8 @@ def get_access_token() -> str:
     }
 
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(TOKEN_URL, data=payload, headers=headers)
+    with metrics.stage("token"):
+        resp = request("POST", TOKEN_URL, session, data=payload, headers=headers)
 
     if resp.status_code != 200:
         raise RuntimeError(f"Token request failed: {resp.text}")
@@ -54,7 +62,9 @@ def get_access_token() -> str:
 # =========================================================
 
 
-def search_by_gtin(token: str, gtin: str) -> list[dict]:
+def search_by_gtin(
+    token: str, gtin: str, session: Optional[requests.Session] = None
+) -> list[dict]:
     url = f"{BASE_URL}/TradeItemInformation/search"
     headers = {
         "Authorization": f"Bearer {token}",
@@ -63,23 +73,27 @@ def search_by_gtin(token: str, gtin: str) -> list[dict]:
     }
 
     payload = {"gtins": [gtin], "itemStatus": ["published"]}
-    resp = requests.post(url, headers=headers, json=payload)
+    with metrics.stage("search") as st:
+        resp = request("POST", url, session, headers=headers, json=payload)
+        st.add_bytes(len(resp.content))
 
-    if resp.status_code != 200:
-        raise RuntimeError(f"Search failed: {resp.text}")
+    check(resp, "Search failed: ")
 
     return resp.json().get("results", [])
 
 
-def get_item_by_id(token: str, item_id: int) -> dict:
+def get_item_by_id(
+    token: str, item_id: int, session: Optional[requests.Session] = None
+) -> dict:
     url = f"{BASE_URL}/TradeItemInformation/getItemById"
     headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
     params = {"id": item_id, "dataType": "Product", "allowInvalid": True}
 
-    resp = requests.get(url, headers=headers, params=params)
+    with metrics.stage("get_item_by_id") as st:
+        resp = request("GET", url, session, headers=headers, params=params)
+        st.add_bytes(len(resp.content))
 
-    if resp.status_code != 200:
-        raise RuntimeError(f"GetItemById failed: {resp.text}")
+    check(resp, "GetItemById failed: ")
 
     return resp.json()[0]
 
@@ -92,7 +106,10 @@ def get_item_by_id(token: str, item_id: int) -> dict:
 def decode_cin(cin_b64: Optional[str]) -> Optional[str]:
     if not cin_b64:
         return None
-    return base64.b64decode(cin_b64).decode("utf-8")
+    with metrics.stage("decode", len(cin_b64)):
+        data = base64.b64decode(cin_b64)
+        metrics.observe("document_bytes", len(data), BYTES_BUCKETS)
+        return data.decode("utf-8")
 
 
 # =========================================================
@@ -111,8 +128,13 @@ def _text(root, path):
 
 
 def extract_cin_signals(cin_xml: str) -> dict:
-    root = ET.fromstring(cin_xml)
+    with metrics.stage("parse", len(cin_xml)):
+        root = ET.fromstring(cin_xml)
+    with metrics.stage("extract"):
+        return _extract_signals(root)
 
+
+def _extract_signals(root) -> dict:
     signals = {
         # Identity
         "gtin": _text(root, ".//gtin"),
@@ -167,49 +189,97 @@ def extract_cin_signals(cin_xml: str) -> dict:
 # =========================================================
 
 
+def fetch_signals(gtin: str, token: str, session: requests.Session) -> dict:
+    item_id = select_item_id(search_by_gtin(token, gtin, session), gtin)
+    if item_id is None:
+        metrics.count("gtin_not_found")
+        return {"gtin": gtin, "error": "GTIN not found"}
+
+    cin_xml = decode_cin(get_item_by_id(token, item_id, session).get("cin"))
+    if not cin_xml:
+        metrics.count("no_cin")
+        return {"gtin": gtin, "item_id": item_id, "error": "No CIN available"}
+
+    return {"gtin": gtin, "item_id": item_id, "signals": extract_cin_signals(cin_xml)}
+
+
+def main_ndjson(profiler=None):
+    """GTINs from stdin (or arguments), one JSON object per line."""
+    metrics.configure()
+    session = requests.Session()
+    token = [get_access_token(session)]
+
+    def fetch(gtin: str) -> dict:
+        try:
+            return fetch_signals(gtin, token[0], session)
+        except AuthError:
+            # long streams outlive the token: renew once and retry
+            token[0] = get_access_token(session)
+            return fetch_signals(gtin, token[0], session)
+
+    def handle(gtin: str) -> dict:
+        with profiler.document(gtin) if profiler else nullcontext():
+            return fetch(gtin)
+
+    sys.exit(1 if run_ndjson(sys.argv, handle, key="gtin") else 0)
+
+
 def main():
+    profiler = profiler_from_argv(sys.argv)
+    if "--ndjson" in sys.argv:
+        main_ndjson(profiler)
+
     if len(sys.argv) != 2:
-        print("Usage: python3 fetch_cin_signals.py <GTIN>")
+        print("Usage: python3 fetch_cin_signals.py [--profile-memory] <GTIN>")
+        print(
+            "       python3 fetch_cin_signals.py --ndjson [--profile-memory] "
+            "[--out=<file[.gz]>] [<GTIN>...]"
+        )
         sys.exit(1)
 
     gtin = sys.argv[1]
 
     print(f"🔎 Fetching GTIN {gtin}")
+    metrics.configure()
+    if profiler:
+        profiler.begin_document(gtin)
     token = get_access_token()
 
     results = search_by_gtin(token, gtin)
-    matches = [r for r in results if r.get("gtin") == gtin]
+    item_id = select_item_id(results, gtin)
 
-    if not matches:
+    if item_id is None:
+        metrics.count("gtin_not_found")
         print("❌ GTIN not found")
         sys.exit(1)
 
-    consumer_units = [r for r in matches if r.get("isTradeItemAConsumerUnit") is True]
-
-    item_id = (
-        consumer_units[0]["itemId"]
-        if len(consumer_units) == 1
-        else matches[0]["itemId"]
-    )
-
     item = get_item_by_id(token, item_id)
 
-    with open("trade_item_raw.json", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open(
+        "trade_item_raw.json", "w", encoding="utf-8"
+    ) as f:
         json.dump(item, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
 
     cin_xml = decode_cin(item.get("cin"))
 
     if not cin_xml:
+        metrics.count("no_cin")
         print("⚠️ No CIN available")
         sys.exit(0)
 
-    with open("cin.xml", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open("cin.xml", "w", encoding="utf-8") as f:
         f.write(cin_xml)
+        st.add_bytes(f.tell())
 
     signals = extract_cin_signals(cin_xml)
 
-    with open("cin_signals.json", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open(
+        "cin_signals.json", "w", encoding="utf-8"
+    ) as f:
         json.dump(signals, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
+    metrics.count("items")
 
     print("✅ Done")
     print("📁 trade_item_raw.json")
@@ -0,0 +1,641 @@
+import os
+import re
+import heapq
+import pickle
+import json
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# =========================================================
+# Config
+# =========================================================
+
+BASE_DIR = Path(__file__).resolve().parent
+GPC_FILE = Path(os.getenv("GPC_CODES_FILE", BASE_DIR / "gpc_codes.json"))
+CACHE_FILE = GPC_FILE.with_name("gpc_index.pickle")
+# flat, mmap-able copy of the index for worker pools (see share_index)
+SHARED_FILE = GPC_FILE.with_name("gpc_index.tables")
+# other source files get their own <stem>_index.* next to them (index_file)
+
+# language of gpc_codes.json; translations sit next to it as
+# gpc_codes.<lang>.json with the same tree
+GPC_LANG = os.getenv("GPC_LANG", "sv")
+
+# bump when the cached structure changes
+CACHE_VERSION = 6
+
+WORD_RE = re.compile(r"\w+")
+
+# segment, family, class, brick
+LEVELS = 4
+
+# type-ahead ranks at most this many matching rows per query, so one-letter
+# prefixes cost the same as long ones
+AUTOCOMPLETE_LIMIT = 500
+
+_index: Optional["Taxonomy"] = None
+
+# =========================================================
+# Taxonomy
+# =========================================================
+
+
+class Taxonomy:
+    """
+    Array-backed GPC taxonomy. Nodes are rows in document (pre-)order held
+    in parallel arrays; titles are interned once in `strings`. Paths are
+    derived from parent pointers on demand and memoized per row.
+
+    Because rows are in pre-order, the subtree of row r is exactly the rows
+    r .. ends[r] - 1, so ancestor checks are two integer comparisons and
+    descendant sets are contiguous ranges.
+    """
+
+    def __init__(self):
+        self.codes = array("q")
+        self.levels = array("b")
+        self.parents = array("i")
+        self.ends = array("i")
+        self.title_ids = array("i")
+        self.active = array("b")  # 1 / 0, -1 when not given
+        self.strings: List[str] = []
+        self.lang = GPC_LANG
+        # translated title ids per row, by language
+        self.lang_title_ids: Dict[str, array] = {}
+        # type-ahead: per language, (row, offset) of every word start in the
+        # normalized titles, sorted by the text from that offset on
+        self.norm_strings: List[str] = []
+        self.prefix_rows: Dict[str, array] = {}
+        self.prefix_offsets: Dict[str, array] = {}
+        # positions in prefix_rows of the title starts (offset 0), in order
+        self.prefix_starts: Dict[str, array] = {}
+        self.code_keys: List[str] = []
+        self.code_key_rows = array("i")
+        # code -> row lookup: codes sorted, with the row for each
+        self.sorted_codes = array("q")
+        self.sorted_rows = array("i")
+        self._paths: Dict[int, Tuple[str, ...]] = {}
+        self._level_rows = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_paths={}, _level_rows=None)
+        return state
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def row(self, code: Union[int, str]) -> Optional[int]:
+        code = int(code)
+        i = bisect_left(self.sorted_codes, code)
+        if i < len(self.sorted_codes) and self.sorted_codes[i] == code:
+            return self.sorted_rows[i]
+        return None
+
+    def languages(self) -> List[str]:
+        return [self.lang, *self.lang_title_ids]
+
+    def titles_for(self, lang: Optional[str] = None) -> array:
+        if lang is None or lang == self.lang:
+            return self.title_ids
+        return self.lang_title_ids[lang]
+
+    def title(self, row: int, lang: Optional[str] = None) -> str:
+        return self.strings[self.titles_for(lang)[row]]
+
+    def path(self, row: int, lang: Optional[str] = None) -> Tuple[str, ...]:
+        key = row if lang is None or lang == self.lang else (lang, row)
+        cached = self._paths.get(key)
+        if cached is None:
+            parent = self.parents[row]
+            prefix = self.path(parent, lang) if parent >= 0 else ()
+            cached = self._paths[key] = prefix + (self.title(row, lang),)
+        return cached
+
+    def is_descendant(self, row: int, ancestor: int, or_self: bool = False) -> bool:
+        if or_self and row == ancestor:
+            return True
+        return ancestor < row < self.ends[ancestor]
+
+    def ancestors(self, row: int) -> List[int]:
+        """Ancestor rows, root first."""
+        out = []
+        row = self.parents[row]
+        while row >= 0:
+            out.append(row)
+            row = self.parents[row]
+        out.reverse()
+        return out
+
+    def rows_many(self, codes):
+        """NumPy array of rows for many codes at once, -1 where unknown."""
+        import numpy as np
+
+        codes = np.asarray(codes, dtype=np.int64)
+        sorted_codes = np.frombuffer(self.sorted_codes, dtype=np.int64)
+        sorted_rows = np.frombuffer(self.sorted_rows, dtype=np.int32)
+        if not len(sorted_codes):
+            return np.full(codes.shape, -1, dtype=np.int32)
+        pos = np.minimum(np.searchsorted(sorted_codes, codes), len(sorted_codes) - 1)
+        return np.where(sorted_codes[pos] == codes, sorted_rows[pos], -1)
+
+    def level_rows(self):
+        """
+        NumPy (rows x LEVELS) array: for every row, the row of its
+        ancestor-or-self at GPC levels 1..LEVELS, -1 where there is none.
+        Built once, one vectorized step per level.
+        """
+        if self._level_rows is None:
+            import numpy as np
+
+            levels = np.frombuffer(self.levels, dtype=np.int8)
+            parents = np.frombuffer(self.parents, dtype=np.int32)
+            out = np.full((len(self), LEVELS), -1, dtype=np.int32)
+            # parents always sit at a lower level than their children
+            for level in np.unique(levels):
+                rows = np.flatnonzero(levels == level)
+                linked = rows[parents[rows] >= 0]
+                out[linked] = out[parents[linked]]
+                if 1 <= level <= LEVELS:
+                    out[rows, level - 1] = rows
+            self._level_rows = out
+        return self._level_rows
+
+    def names(self, rows):
+        """
+        Titles of `rows` (NumPy ints, -1 for none) as an object array, None
+        at -1. Only the distinct rows are decoded, so a mapped index (see
+        attach_shared) never materializes the full title list.
+        """
+        import numpy as np
+
+        rows = np.asarray(rows)
+        used = np.unique(rows[rows >= 0])
+        lookup = np.empty(len(used) + 1, dtype=object)
+        lookup[:-1] = [self.title(int(r)) for r in used]
+        # -1 picks the trailing None
+        pos = np.where(rows >= 0, np.searchsorted(used, rows), len(used))
+        return lookup[pos]
+
+    def item(self, row: int) -> Dict[str, Any]:
+        """The node as the dict shape gpc_flat.json has always used."""
+        parent = self.parents[row]
+        active = self.active[row]
+        return {
+            "level": self.levels[row],
+            "code": self.codes[row],
+            "title": self.title(row),
+            "parent_code": self.codes[parent] if parent >= 0 else None,
+            "path": list(self.path(row)),
+            "active": None if active < 0 else bool(active),
+        }
+
+
+def build_index(gpc_file: Path = GPC_FILE) -> Taxonomy:
+    with gpc_file.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    tax = Taxonomy()
+    title_ids: Dict[str, int] = {}
+    row_of: Dict[int, int] = {}
+
+    # explicit stack of (node, parent row), children pushed in reverse so
+    # rows come out in document order
+    stack = [(node, -1) for node in reversed(data["Schema"])]
+    while stack:
+        node, parent = stack.pop()
+        row = len(tax.codes)
+
+        title = node.get("Title")
+        tid = title_ids.get(title)
+        if tid is None:
+            tid = title_ids[title] = len(tax.strings)
+            tax.strings.append(title)
+
+        active = node.get("Active")
+        tax.codes.append(node.get("Code"))
+        tax.levels.append(node.get("Level") or 0)
+        tax.parents.append(parent)
+        tax.title_ids.append(tid)
+        tax.active.append(-1 if active is None else int(bool(active)))
+        row_of[node.get("Code")] = row
+
+        for child in reversed(node.get("Childs") or []):
+            stack.append((child, row))
+
+    # subtree ends: children come after their parent, so walking rows
+    # backwards has every child's end ready before its parent needs it
+    tax.ends = array("i", range(1, len(tax.codes) + 1))
+    for row in range(len(tax.codes) - 1, -1, -1):
+        parent = tax.parents[row]
+        if parent >= 0 and tax.ends[row] > tax.ends[parent]:
+            tax.ends[parent] = tax.ends[row]
+
+    for code in sorted(row_of):
+        tax.sorted_codes.append(code)
+        tax.sorted_rows.append(row_of[code])
+
+    for lang, path in language_files(gpc_file).items():
+        tax.lang_title_ids[lang] = _translated_titles(tax, path, title_ids)
+
+    build_prefix_index(tax)
+    return tax
+
+
+def language_files(gpc_file: Path = GPC_FILE) -> Dict[str, Path]:
+    return {
+        path.name[len(gpc_file.stem) + 1 : -len(".json")]: path
+        for path in sorted(gpc_file.parent.glob(f"{gpc_file.stem}.*.json"))
+    }
+
+
+def _translated_titles(tax: Taxonomy, path: Path, title_ids: Dict[str, int]) -> array:
+    """Title ids per row from a translated tree; untranslated rows keep the default."""
+    with path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    out = array("i", tax.title_ids)
+    stack = list(data["Schema"])
+    while stack:
+        node = stack.pop()
+        stack.extend(node.get("Childs") or [])
+        row, title = tax.row(node.get("Code")), node.get("Title")
+        if row is None or not title:
+            continue
+        tid = title_ids.get(title)
+        if tid is None:
+            tid = title_ids[title] = len(tax.strings)
+            tax.strings.append(title)
+        out[row] = tid
+    return out
+
+
+# =========================================================
+# Prefix index
+# =========================================================
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def build_prefix_index(tax: Taxonomy) -> None:
+    tax.norm_strings = [normalize(t or "") for t in tax.strings]
+
+    for lang in tax.languages():
+        titles = tax.titles_for(lang)
+        entries = []
+        for row in range(len(tax)):
+            norm = tax.norm_strings[titles[row]]
+            for m in WORD_RE.finditer(norm):
+                entries.append((norm[m.start() :], row, m.start()))
+        entries.sort()
+        tax.prefix_rows[lang] = array("i", (e[1] for e in entries))
+        tax.prefix_offsets[lang] = array("i", (e[2] for e in entries))
+        tax.prefix_starts[lang] = array(
+            "i", (i for i, e in enumerate(entries) if e[2] == 0)
+        )
+
+    pairs = sorted((str(code), row) for row, code in enumerate(tax.codes))
+    tax.code_keys = [key for key, _ in pairs]
+    tax.code_key_rows = array("i", (row for _, row in pairs))
+
+
+# =========================================================
+# Cache
+# =========================================================
+
+
+def _source_stamp(gpc_file: Path) -> List[Any]:
+    stamp = []
+    for path in [gpc_file, *language_files(gpc_file).values()]:
+        st = path.stat()
+        stamp.append([path.name, st.st_mtime_ns, st.st_size])
+    return stamp
+
+
+def index_file(gpc_file: Path, default: Path) -> Path:
+    """
+    Where a derived file (CACHE_FILE, SHARED_FILE) of `gpc_file` lives:
+    the default for GPC_FILE, <stem>_index<suffix> beside any other source,
+    so indexes of different files never overwrite each other.
+    """
+    if gpc_file == GPC_FILE:
+        return default
+    return gpc_file.with_name(f"{gpc_file.stem}_index{default.suffix}")
+
+
+def load_index(
+    gpc_file: Path = GPC_FILE, cache_file: Optional[Path] = None
+) -> Taxonomy:
+    """
+    Load the taxonomy index from the cache file, rebuilding it from
+    gpc_codes.json when the cache is missing, stale or from another version.
+    """
+    cache_file = cache_file or index_file(gpc_file, CACHE_FILE)
+    stamp = _source_stamp(gpc_file)
+
+    try:
+        with cache_file.open("rb") as f:
+            cached = pickle.load(f)
+        if cached["version"] == CACHE_VERSION and cached["source"] == stamp:
+            return cached["index"]
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+        pass
+
+    index = build_index(gpc_file)
+    tmp = cache_file.with_suffix(".tmp")
+    with tmp.open("wb") as f:
+        pickle.dump(
+            {"version": CACHE_VERSION, "source": stamp, "index": index},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    tmp.replace(cache_file)
+    return index
+
+
+def index() -> Taxonomy:
+    """The process-wide taxonomy index, loaded on first use."""
+    global _index
+    if _index is None:
+        _index = load_index()
+    return _index
+
+
+# =========================================================
+# Shared index for worker pools
+# =========================================================
+#
+# Every process calling index() unpickles its own copy. For process pools,
+# build once in the parent and let workers map the same pages instead:
+#
+#     path = gpc.share_index()
+#     ProcessPoolExecutor(initializer=gpc.attach_shared, initargs=(path,))
+
+_ARRAYS = [
+    "codes",
+    "levels",
+    "parents",
+    "ends",
+    "title_ids",
+    "active",
+    "sorted_codes",
+    "sorted_rows",
+    "code_key_rows",
+]
+_STRINGS = ["strings", "norm_strings", "code_keys"]
+_PER_LANG = ["lang_title_ids", "prefix_rows", "prefix_offsets", "prefix_starts"]
+
+
+def share_index(gpc_file: Path = GPC_FILE, shared_file: Optional[Path] = None) -> Path:
+    """
+    Write the index as a shared table file (skipped when it is already
+    current for gpc_file) and return its path for attach_shared().
+    """
+    from cin_shared import read_meta, write_tables
+
+    shared_file = shared_file or index_file(gpc_file, SHARED_FILE)
+    stamp = _source_stamp(gpc_file)
+    try:
+        meta = read_meta(shared_file)
+        if meta.get("version") == CACHE_VERSION and meta.get("source") == stamp:
+            return shared_file
+    except (OSError, ValueError):
+        pass
+
+    tax = index() if gpc_file == GPC_FILE else load_index(gpc_file)
+    tables: Dict[str, Any] = {name: getattr(tax, name) for name in _ARRAYS}
+    tables.update((name, getattr(tax, name)) for name in _STRINGS)
+    for name in _PER_LANG:
+        for lang, arr in getattr(tax, name).items():
+            tables[f"{name}/{lang}"] = arr
+    # derived once here instead of once per worker
+    tables["level_rows"] = array("i", tax.level_rows().tobytes())
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": stamp,
+        "lang": tax.lang,
+        "languages": tax.languages(),
+    }
+    return write_tables(shared_file, tables, meta)
+
+
+def attach_shared(shared_file: Path = SHARED_FILE) -> Taxonomy:
+    """
+    Map a share_index() file and make it this process's index(). Tables
+    are zero-copy views into the page cache, so attaching is O(1) and
+    workers hold no private copy of the tables.
+    """
+    import numpy as np
+
+    from cin_shared import SharedTables
+
+    global _index
+    tables = SharedTables(Path(shared_file))
+    tax = Taxonomy()
+    for name in _ARRAYS + _STRINGS:
+        setattr(tax, name, tables[name])
+    tax.lang = tables.meta["lang"]
+    for name in _PER_LANG:
+        setattr(
+            tax,
+            name,
+            {
+                lang: tables[f"{name}/{lang}"]
+                for lang in tables.meta["languages"]
+                if f"{name}/{lang}" in tables
+            },
+        )
+    level_rows = np.frombuffer(tables["level_rows"], dtype=np.int32)
+    tax._level_rows = level_rows.reshape(-1, LEVELS)
+    _index = tax
+    return tax
+
+
+# =========================================================
+# Lookups
+# =========================================================
+
+
+def get(code: Union[int, str]) -> Optional[Dict[str, Any]]:
+    tax = index()
+    row = tax.row(code)
+    return tax.item(row) if row is not None else None
+
+
+def flat() -> List[Dict[str, Any]]:
+    tax = index()
+    return [tax.item(row) for row in range(len(tax))]
+
+
+def get_level_names(code: Union[int, str]) -> Optional[Dict[str, str]]:
+    tax = index()
+    row = tax.row(code)
+    if row is None:
+        return None
+
+    return {f"level_{i+1}": name for i, name in enumerate(tax.path(row))}
+
+
+def is_descendant(
+    code: Union[int, str], ancestor_code: Union[int, str], or_self: bool = False
+) -> bool:
+    """Is `code` somewhere below `ancestor_code` (e.g. a brick under a family)?"""
+    tax = index()
+    row, ancestor = tax.row(code), tax.row(ancestor_code)
+    if row is None or ancestor is None:
+        return False
+    return tax.is_descendant(row, ancestor, or_self)
+
+
+def descendants(code: Union[int, str], level: Optional[int] = None) -> List[int]:
+    """Codes below `code`, in taxonomy order; only those at `level` if given."""
+    tax = index()
+    row = tax.row(code)
+    if row is None:
+        return []
+    rows = range(row + 1, tax.ends[row])
+    if level is not None:
+        return [tax.codes[r] for r in rows if tax.levels[r] == level]
+    return list(tax.codes[row + 1 : tax.ends[row]])
+
+
+def ancestors(code: Union[int, str]) -> List[int]:
+    """Codes above `code`, segment first."""
+    tax = index()
+    row = tax.row(code)
+    if row is None:
+        return []
+    return [tax.codes[r] for r in tax.ancestors(row)]
+
+
+def is_descendant_many(codes, ancestor_code: Union[int, str], or_self: bool = False):
+    """
+    Vectorized is_descendant over an array of product GPC codes.
+    Returns a NumPy bool array; unknown codes are False.
+    """
+    import numpy as np
+
+    tax = index()
+    rows = tax.rows_many(codes)
+    ancestor = tax.row(ancestor_code)
+    if ancestor is None:
+        return np.zeros(rows.shape, dtype=bool)
+    low = ancestor if or_self else ancestor + 1
+    return (rows >= low) & (rows < tax.ends[ancestor])
+
+
+def _code_array(codes):
+    import numpy as np
+
+    try:
+        return np.asarray(codes, dtype=np.int64)
+    except (TypeError, ValueError):
+        return np.array(
+            [int(c) if c is not None and str(c).isdigit() else -1 for c in codes],
+            dtype=np.int64,
+        )
+
+
+def enrich_levels(codes) -> Dict[str, List[Any]]:
+    """
+    Batch GPC enrichment: level_1..level_4 code and name columns for many
+    product GPC codes in one pass (None where a code or level is unknown).
+    """
+    import numpy as np
+
+    tax = index()
+    rows = tax.rows_many(_code_array(codes))
+    level_rows = tax.level_rows()
+    codes_by_row = np.append(np.frombuffer(tax.codes, dtype=np.int64), -1)
+
+    # -1 rows pick the trailing sentinel of codes_by_row
+    anc = np.where(rows[:, None] >= 0, level_rows[rows], -1)
+    names = tax.names(anc)
+
+    columns: Dict[str, List[Any]] = {}
+    for i in range(LEVELS):
+        col = anc[:, i]
+        level_codes = codes_by_row[col].astype(object)
+        level_codes[col < 0] = None
+        columns[f"level_{i+1}_code"] = level_codes.tolist()
+        columns[f"level_{i+1}_name"] = names[:, i].tolist()
+    return columns
+
+
+def autocomplete(
+    prefix: str,
+    lang: Optional[str] = None,
+    k: int = 10,
+    limit: int = AUTOCOMPLETE_LIMIT,
+) -> List[Dict[str, Any]]:
+    """
+    Top-k type-ahead matches for a title prefix (any word start, in `lang`)
+    or, for digits, a code prefix. Title matches at the start of the title
+    rank first, then shorter titles, among the first `limit` matching rows
+    in prefix order. Each code is returned once. Raises ValueError for a
+    language the index has no titles for.
+    """
+    tax = index()
+    lang = lang or tax.lang
+    if lang not in tax.prefix_rows:
+        raise ValueError(
+            f"Unknown GPC language: {lang} (use {', '.join(tax.languages())})"
+        )
+    query = normalize(prefix)
+    if not query:
+        return []
+
+    if query.isdigit():
+        keys = tax.code_keys
+        i = bisect_left(keys, query)
+        rows = []
+        # repeated codes (e.g. shared attribute values) list only the first row
+        seen = set()
+        while i < len(keys) and len(rows) < k and keys[i].startswith(query):
+            if keys[i] not in seen:
+                seen.add(keys[i])
+                rows.append(tax.code_key_rows[i])
+            i += 1
+    else:
+        titles = tax.titles_for(lang)
+        p_rows, p_offsets = tax.prefix_rows[lang], tax.prefix_offsets[lang]
+        norm = tax.norm_strings
+
+        def key(i: int) -> str:
+            return norm[titles[p_rows[i]]][p_offsets[i] :]
+
+        best: Dict[int, Tuple[int, int, int]] = {}
+
+        def scan(positions) -> None:
+            """Rank matches among `positions` (prefix entries in key order)."""
+            j = bisect_left(positions, query, key=key)
+            while j < len(positions) and len(best) < limit:
+                i = positions[j]
+                if not key(i).startswith(query):
+                    break
+                row = p_rows[i]
+                if row not in best:
+                    best[row] = (p_offsets[i] > 0, len(norm[titles[row]]), row)
+                j += 1
+
+        # title starts outrank every other word start, so the full word
+        # index is only needed when they give fewer than k rows
+        scan(tax.prefix_starts[lang])
+        if len(best) < k:
+            scan(range(len(p_rows)))
+        rows = [rank[2] for rank in heapq.nsmallest(k, best.values())]
+
+    return [
+        {
+            "code": tax.codes[row],
+            "level": tax.levels[row],
+            "title": tax.title(row, lang),
+            "path": list(tax.path(row, lang)),
+        }
+        for row in rows
+    ]
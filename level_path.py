@@ -1,13 +1,4 @@
-by_code = {item["code"]: item for item in flat}
+from gpc import get_level_names
 
-def get_level_names(code):
-    item = by_code.get(code)
-    if not item:
-        return None
-
-    return {
-        f"level_{i+1}": name
-        for i, name in enumerate(item["path"])
-    }
-
-print(get_level_names(30010066))
+if __name__ == "__main__":
+    print(get_level_names(30010066))
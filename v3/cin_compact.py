@@ -1,15 +1,39 @@
 #!/usr/bin/env python3
+import os
+import sys
 import json
 from pathlib import Path
 
+from cin_snapshot import load_snapshot
+
+# cin_units.py lives in the repository root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from cin_units import LENGTH_MM, MASS_G, normalize, quantity, to_float  # noqa: E402
+
 SNAPSHOT_PATH = Path("cin_snapshot.json")
 OUT_PATH = Path("cin_compact.json")
 
 
+def parse_languages(value):
+    """Parse "sv,en" into ("sv", "en") with interned codes; None keeps all."""
+    langs = tuple(sys.intern(v.strip()) for v in (value or "").split(",") if v.strip())
+    return langs or None
+
+
+# languages kept in multilingual fields (CIN_LANGUAGES=sv,en); all when unset
+LANGUAGES = parse_languages(os.getenv("CIN_LANGUAGES"))
+
+
 # helpers
 def find_all(node, tag_endswith):
     if not node:
         return []
+    if hasattr(node, "find_all"):
+        # binary snapshot nodes scan their flat node table instead
+        return node.find_all(tag_endswith)
     hits = []
     if node.get("tag", "").endswith(tag_endswith):
         hits.append(node)
@@ -31,199 +55,199 @@ def attr(node, key):
     return node.get("attributes", {}).get(key) if node else None
 
 
-with SNAPSHOT_PATH.open() as f:
-    root = json.load(f)
-
-
-colour_node = find_first(root, "colour")
-size_node = find_first(root, "descriptiveSizeDimension")
-
-
-compact = {
-    "identity": {
-        "gtin": text(find_first(root, "gtin")),
-        "brand": text(find_first(root, "brandName")),
-        "supplier_assigned_id": text(
-            find_first(root, "additionalTradeItemIdentification")
-        ),
-        "trade_channel": text(find_first(root, "tradeItemTradeChannelCode")),
-        "information_provider": {
-            "gln": text(find_first(root, "informationProviderOfTradeItem/gln")),
-            "name": text(find_first(root, "informationProviderOfTradeItem/partyName")),
-            "address": text(
-                find_first(root, "informationProviderOfTradeItem/partyAddress")
+def measure(node, table):
+    """Float in the canonical unit of `table`, from the measurementUnitCode."""
+    return normalize(text(node), attr(node, "measurementUnitCode"), table)
+
+
+def multilingual(root, tag_endswith, languages=None):
+    """
+    [{"lang", "text"}] for every node, in document order. Nodes outside
+    `languages` are skipped before their text is read, so unwanted
+    translations never reach the record.
+    """
+    out = []
+    for n in find_all(root, tag_endswith):
+        lang = attr(n, "languageCode")
+        if languages is not None and lang not in languages:
+            continue
+        out.append({"lang": sys.intern(lang) if lang else lang, "text": text(n)})
+    return out
+
+
+def texts_by_language(items):
+    """{lang: text} for a multilingual field; the first text per language wins."""
+    out = {}
+    for i in items:
+        lang = i.get("lang")
+        if lang and lang not in out:
+            out[lang] = i.get("text")
+    return out
+
+
+def compact_snapshot(root, languages=None):
+    """
+    Compact record (cin_compact.json shape) from a snapshot root node.
+    `languages` limits the multilingual fields to those language codes.
+    """
+    colour_node = find_first(root, "colour")
+    size_node = find_first(root, "descriptiveSizeDimension")
+    net_content_node = find_first(root, "netContent")
+
+    return {
+        "identity": {
+            "gtin": text(find_first(root, "gtin")),
+            "brand": text(find_first(root, "brandName")),
+            "supplier_assigned_id": text(
+                find_first(root, "additionalTradeItemIdentification")
             ),
+            "trade_channel": text(find_first(root, "tradeItemTradeChannelCode")),
+            "information_provider": {
+                "gln": text(find_first(root, "informationProviderOfTradeItem/gln")),
+                "name": text(
+                    find_first(root, "informationProviderOfTradeItem/partyName")
+                ),
+                "address": text(
+                    find_first(root, "informationProviderOfTradeItem/partyAddress")
+                ),
+            },
+            "manufacturer": {
+                "gln": text(find_first(root, "manufacturerOfTradeItem/gln")),
+                "name": text(find_first(root, "manufacturerOfTradeItem/partyName")),
+            },
         },
-        "manufacturer": {
-            "gln": text(find_first(root, "manufacturerOfTradeItem/gln")),
-            "name": text(find_first(root, "manufacturerOfTradeItem/partyName")),
-        },
-    },
-    "classification": {
-        "gpc_code": text(find_first(root, "gpcCategoryCode")),
-        "gpc_name": text(find_first(root, "gpcCategoryName")),
-    },
-    "market": {
-        "target_country_code": text(find_first(root, "targetMarketCountryCode")),
-        "country_of_origin": text(find_first(root, "countryCode")),
-    },
-    "variant": {
-        "supplier_assigned_id": text(
-            find_first(root, "additionalTradeItemIdentification")
-        ),
-        "color": (
-            {
-                "code": text(find_first(colour_node, "colourCode")),
-                "name": text(find_first(colour_node, "colourDescription")),
-            }
-            if colour_node
-            else None
-        ),
-        "size": text(size_node),
-        "net_content": text(find_first(root, "netContent")),
-    },
-    "naming": {
-        "description_short": [
-            {
-                "lang": attr(n, "languageCode"),
-                "text": text(n),
-            }
-            for n in find_all(root, "descriptionShort")
-        ],
-        "functional_name": [
-            {
-                "lang": attr(n, "languageCode"),
-                "text": text(n),
-            }
-            for n in find_all(root, "functionalName")
-        ],
-        "regulated_product_name": [
-            {
-                "lang": attr(n, "languageCode"),
-                "text": text(n),
-            }
-            for n in find_all(root, "regulatedProductName")
-        ],
-    },
-    "vat": {
-        "type": text(find_first(root, "dutyFeeTaxTypeCode")),
-        "rate": text(find_first(root, "dutyFeeTaxRate")),
-    },
-    "trade_unit": {
-        "is_consumer_unit": text(find_first(root, "isTradeItemAConsumerUnit"))
-        == "true",
-        "is_base_unit": text(find_first(root, "isTradeItemABaseUnit")) == "true",
-        "is_variable_unit": text(find_first(root, "isTradeItemAVariableUnit"))
-        == "true",
-        "is_orderable_unit": text(find_first(root, "isTradeItemAnOrderableUnit"))
-        == "true",
-        "is_invoice_unit": text(find_first(root, "isTradeItemAnInvoiceUnit")) == "true",
-    },
-    "size": {
-        "descriptive": text(find_first(root, "descriptiveSizeDimension")),
-        "net_content": text(find_first(root, "netContent")),
-    },
-    "measurements": {
-        "width_mm": text(find_first(root, "width")),
-        "height_mm": text(find_first(root, "height")),
-        "depth_mm": text(find_first(root, "depth")),
-        "gross_weight_g": text(find_first(root, "grossWeight")),
-        "net_weight_g": text(find_first(root, "netWeight")),
-    },
-    "alcohol": {
-        "abv_percent": text(find_first(root, "percentageOfAlcoholByVolume")),
-    },
-    "healthcare": {
-        "prescription_type": text(find_first(root, "prescriptionTypeCode")),
-        "is_otc": text(find_first(root, "prescriptionTypeCode"))
-        == "NO_PRESCRIPTION_REQUIRED",
-    },
-    "consumer_guidance": {
-        "minimum_age": next(
-            (
-                text(n)
-                for n in find_all(root, "targetConsumerMinimumUsage")
-                if attr(n, "measurementUnitCode") == "ANN"
+        "classification": {
+            "gpc_code": text(find_first(root, "gpcCategoryCode")),
+            "gpc_name": text(find_first(root, "gpcCategoryName")),
+        },
+        "market": {
+            "target_country_code": text(find_first(root, "targetMarketCountryCode")),
+            "country_of_origin": text(find_first(root, "countryCode")),
+        },
+        "variant": {
+            "supplier_assigned_id": text(
+                find_first(root, "additionalTradeItemIdentification")
+            ),
+            "color": (
+                {
+                    "code": text(find_first(colour_node, "colourCode")),
+                    "name": text(find_first(colour_node, "colourDescription")),
+                }
+                if colour_node
+                else None
+            ),
+            "size": text(size_node),
+            "net_content": text(find_first(root, "netContent")),
+        },
+        "naming": {
+            "description_short": multilingual(root, "descriptionShort", languages),
+            "functional_name": multilingual(root, "functionalName", languages),
+            "regulated_product_name": multilingual(
+                root, "regulatedProductName", languages
             ),
-            None,
-        )
-    },
-    "allergens": [
-        {
-            "type": text(find_first(a, "allergenTypeCode")),
-            "containment": text(find_first(a, "levelOfContainmentCode")),
-        }
-        for a in find_all(root, "allergen")
-    ],
-    "ingredients": {
-        "food": [
+        },
+        "vat": {
+            "type": text(find_first(root, "dutyFeeTaxTypeCode")),
+            "rate": text(find_first(root, "dutyFeeTaxRate")),
+        },
+        "trade_unit": {
+            "is_consumer_unit": text(find_first(root, "isTradeItemAConsumerUnit"))
+            == "true",
+            "is_base_unit": text(find_first(root, "isTradeItemABaseUnit")) == "true",
+            "is_variable_unit": text(find_first(root, "isTradeItemAVariableUnit"))
+            == "true",
+            "is_orderable_unit": text(find_first(root, "isTradeItemAnOrderableUnit"))
+            == "true",
+            "is_invoice_unit": text(find_first(root, "isTradeItemAnInvoiceUnit"))
+            == "true",
+        },
+        "size": {
+            "descriptive": text(find_first(root, "descriptiveSizeDimension")),
+            "net_content": text(find_first(root, "netContent")),
+        },
+        "measurements": {
+            "width_mm": measure(find_first(root, "width"), LENGTH_MM),
+            "height_mm": measure(find_first(root, "height"), LENGTH_MM),
+            "depth_mm": measure(find_first(root, "depth"), LENGTH_MM),
+            "gross_weight_g": measure(find_first(root, "grossWeight"), MASS_G),
+            "net_weight_g": measure(find_first(root, "netWeight"), MASS_G),
+            "net_content": quantity(
+                text(net_content_node), attr(net_content_node, "measurementUnitCode")
+            ),
+        },
+        "alcohol": {
+            "abv_percent": to_float(
+                text(find_first(root, "percentageOfAlcoholByVolume"))
+            ),
+        },
+        "healthcare": {
+            "prescription_type": text(find_first(root, "prescriptionTypeCode")),
+            "is_otc": text(find_first(root, "prescriptionTypeCode"))
+            == "NO_PRESCRIPTION_REQUIRED",
+        },
+        "consumer_guidance": {
+            "minimum_age": next(
+                (
+                    text(n)
+                    for n in find_all(root, "targetConsumerMinimumUsage")
+                    if attr(n, "measurementUnitCode") == "ANN"
+                ),
+                None,
+            )
+        },
+        "allergens": [
             {
-                "lang": attr(n, "languageCode"),
-                "text": text(n),
+                "type": text(find_first(a, "allergenTypeCode")),
+                "containment": text(find_first(a, "levelOfContainmentCode")),
             }
-            for n in find_all(root, "ingredientStatement")
+            for a in find_all(root, "allergen")
         ],
-        "non_food": [
+        "ingredients": {
+            "food": multilingual(root, "ingredientStatement", languages),
+            "non_food": multilingual(root, "nonfoodIngredientStatement", languages),
+        },
+        "consumer_instructions": {
+            "usage": multilingual(root, "consumerUsageInstructions", languages),
+            "storage": multilingual(root, "consumerStorageInstructions", languages),
+            "recycling": multilingual(root, "consumerRecyclingInstructions", languages),
+        },
+        "marketing": {
+            "long": multilingual(root, "tradeItemMarketingMessage", languages),
+            "short": multilingual(root, "shortTradeItemMarketingMessage", languages),
+            "keywords": multilingual(root, "tradeItemKeyWords", languages),
+        },
+        "packaging": {
+            "type": text(find_first(root, "packagingTypeCode")),
+            "is_returnable": text(find_first(root, "isPackagingMarkedReturnable"))
+            == "true",
+            "deposit_id": text(
+                find_first(root, "returnablePackageDepositIdentification")
+            ),
+        },
+        "safety": {
+            "is_dangerous_substance": text(find_first(root, "isDangerousSubstance"))
+            == "TRUE",
+        },
+        "sales_restrictions": {
+            "condition_code": text(find_first(root, "consumerSalesConditionCode")),
+            "restricted": bool(find_first(root, "consumerSalesConditionCode")),
+        },
+        "media": [
             {
-                "lang": attr(n, "languageCode"),
-                "text": text(n),
+                "type": text(find_first(f, "referencedFileTypeCode")),
+                "uri": text(find_first(f, "uniformResourceIdentifier")),
+                "primary": text(find_first(f, "isPrimaryFile")) == "TRUE",
             }
-            for n in find_all(root, "nonfoodIngredientStatement")
-        ],
-    },
-    "consumer_instructions": {
-        "usage": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "consumerUsageInstructions")
-        ],
-        "storage": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "consumerStorageInstructions")
-        ],
-        "recycling": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "consumerRecyclingInstructions")
-        ],
-    },
-    "marketing": {
-        "long": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "tradeItemMarketingMessage")
+            for f in find_all(root, "referencedFileHeader")
         ],
-        "short": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "shortTradeItemMarketingMessage")
-        ],
-        "keywords": [
-            {"lang": attr(n, "languageCode"), "text": text(n)}
-            for n in find_all(root, "tradeItemKeyWords")
-        ],
-    },
-    "packaging": {
-        "type": text(find_first(root, "packagingTypeCode")),
-        "is_returnable": text(find_first(root, "isPackagingMarkedReturnable"))
-        == "true",
-        "deposit_id": text(find_first(root, "returnablePackageDepositIdentification")),
-    },
-    "safety": {
-        "is_dangerous_substance": text(find_first(root, "isDangerousSubstance"))
-        == "TRUE",
-    },
-    "sales_restrictions": {
-        "condition_code": text(find_first(root, "consumerSalesConditionCode")),
-        "restricted": bool(find_first(root, "consumerSalesConditionCode")),
-    },
-    "media": [
-        {
-            "type": text(find_first(f, "referencedFileTypeCode")),
-            "uri": text(find_first(f, "uniformResourceIdentifier")),
-            "primary": text(find_first(f, "isPrimaryFile")) == "TRUE",
-        }
-        for f in find_all(root, "referencedFileHeader")
-    ],
-}
-
-with OUT_PATH.open("w", encoding="utf-8") as f:
-    json.dump(compact, f, ensure_ascii=False, indent=2)
-
-print("✅ cin_compact.json written")
+    }
+
+
+if __name__ == "__main__":
+    with SNAPSHOT_PATH.open(encoding="utf-8") as f:
+        compact = compact_snapshot(load_snapshot(f), LANGUAGES)
+
+    with OUT_PATH.open("w", encoding="utf-8") as f:
+        json.dump(compact, f, ensure_ascii=False, indent=2)
+
+    print("✅ cin_compact.json written")
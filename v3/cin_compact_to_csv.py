@@ -1,83 +1,170 @@
 #!/usr/bin/env python3
+import os
+import sys
 import json
 import csv
 from pathlib import Path
 
+# gpc.py lives in the repository root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import gpc  # noqa: E402
+from cin_compact import parse_languages, texts_by_language  # noqa: E402
+
 IN_PATH = Path("cin_compact.json")
 OUT_PATH = Path("cin_compact_wide.csv")
 
+# one <field>_<lang> column per language (CIN_EXPORT_LANGUAGES=sv,en,fi)
+EXPORT_LANGUAGES = parse_languages(os.getenv("CIN_EXPORT_LANGUAGES")) or ("sv",)
+
+
+def lang_columns(name, items, languages):
+    """{name_sv: ..., name_en: ...} from one pass over a multilingual field."""
+    texts = texts_by_language(items)
+    return {f"{name}_{lang}": texts.get(lang) for lang in languages}
+
+
+def compact_to_row(d, languages=EXPORT_LANGUAGES):
+    """One wide CSV row for a cin_compact.json record."""
+    naming, marketing = d["naming"], d["marketing"]
+    return {
+        # -------------------------------------------------
+        # Identity
+        # -------------------------------------------------
+        "gtin": d["identity"]["gtin"],
+        "brand": d["identity"]["brand"],
+        "supplier_assigned_id": d["identity"]["supplier_assigned_id"],
+        "gpc_code": d["classification"]["gpc_code"],
+        "gpc_name": d["classification"]["gpc_name"],
+        "target_country": d["market"]["target_country_code"],
+        "country_of_origin": d["market"]["country_of_origin"],
+        # -------------------------------------------------
+        # Naming (per export language)
+        # -------------------------------------------------
+        **lang_columns("description_short", naming["description_short"], languages),
+        **lang_columns("functional_name", naming["functional_name"], languages),
+        **lang_columns(
+            "regulated_product_name", naming["regulated_product_name"], languages
+        ),
+        # -------------------------------------------------
+        # Size & measurements
+        # -------------------------------------------------
+        "size_descriptive": d["size"]["descriptive"],
+        "net_content": d["size"]["net_content"],
+        "width_mm": d["measurements"]["width_mm"],
+        "height_mm": d["measurements"]["height_mm"],
+        "depth_mm": d["measurements"]["depth_mm"],
+        "gross_weight_g": d["measurements"]["gross_weight_g"],
+        # -------------------------------------------------
+        # Commercial
+        # -------------------------------------------------
+        "vat_rate": d["vat"]["rate"],
+        # -------------------------------------------------
+        # Legal / regulatory (RAW)
+        # -------------------------------------------------
+        "sales_condition_code": d["sales_restrictions"]["condition_code"],
+        "minimum_age": d["consumer_guidance"]["minimum_age"],
+        "is_otc": d["healthcare"]["is_otc"],
+        "alcohol_abv": d["alcohol"]["abv_percent"],
+        # -------------------------------------------------
+        # Ingredients & allergens
+        # -------------------------------------------------
+        **lang_columns("ingredients", d["ingredients"]["food"], languages),
+        "allergens": " | ".join(
+            f"{a['type']}({a['containment']})" for a in d["allergens"]
+        ),
+        # -------------------------------------------------
+        # Marketing
+        # -------------------------------------------------
+        **lang_columns("marketing_text", marketing["long"], languages),
+        **lang_columns("keywords", marketing["keywords"], languages),
+        # -------------------------------------------------
+        # Media
+        # -------------------------------------------------
+        "primary_image": next((m["uri"] for m in d["media"] if m["primary"]), None),
+        "all_image_urls": " | ".join(
+            m["uri"] for m in d["media"] if m["type"] == "PRODUCT_IMAGE"
+        ),
+    }
+
+
+GPC_COLUMNS = [
+    f"level_{i}_{kind}" for i in range(1, gpc.LEVELS + 1) for kind in ("code", "name")
+]
+
+
+def add_gpc_levels(rows):
+    """
+    Attach level_1..level_4 GPC code/name columns to wide rows in one batch
+    (left empty when no gpc_codes.json is available).
+    """
+    if not rows:
+        return rows
+    if gpc.GPC_FILE.exists():
+        columns = gpc.enrich_levels([r["gpc_code"] for r in rows])
+    else:
+        columns = {name: [None] * len(rows) for name in GPC_COLUMNS}
+    for name in GPC_COLUMNS:
+        for row, value in zip(rows, columns[name]):
+            row[name] = value
+    return rows
+
+
+LONG_FIELDS = ["gtin", "section", "field", "lang", "index", "value"]
+
+
+def compact_to_long_rows(d):
+    """
+    Long-format rows (gtin, section, field, lang, index, value) for a
+    cin_compact.json record. Nested dicts become dotted field names,
+    lists get an index and multilingual texts keep their language.
+    """
+    gtin = d["identity"]["gtin"]
+    rows = []
+
+    def emit(section, field, value, lang="", index=""):
+        rows.append(
+            {
+                "gtin": gtin,
+                "section": section,
+                "field": field,
+                "lang": lang,
+                "index": index,
+                "value": value,
+            }
+        )
+
+    def walk(section, prefix, value):
+        for key, v in value.items():
+            field = f"{prefix}{key}"
+            if isinstance(v, dict):
+                walk(section, f"{field}.", v)
+            elif isinstance(v, list):
+                for i, item in enumerate(v):
+                    emit(section, field, item.get("text"), item.get("lang") or "", i)
+            else:
+                emit(section, field, v)
+
+    for section, value in d.items():
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                for key, v in item.items():
+                    emit(section, key, v, "", i)
+        elif isinstance(value, dict):
+            walk(section, "", value)
+
+    return rows
+
+
+if __name__ == "__main__":
+    with IN_PATH.open(encoding="utf-8") as f:
+        row = add_gpc_levels([compact_to_row(json.load(f))])[0]
+
+    with OUT_PATH.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=row.keys())
+        writer.writeheader()
+        writer.writerow(row)
 
-def first_text(items, lang="sv"):
-    for i in items:
-        if i.get("lang") == lang:
-            return i.get("text")
-    return None
-
-
-with IN_PATH.open(encoding="utf-8") as f:
-    d = json.load(f)
-
-
-row = {
-    # -------------------------------------------------
-    # Identity
-    # -------------------------------------------------
-    "gtin": d["identity"]["gtin"],
-    "brand": d["identity"]["brand"],
-    "supplier_assigned_id": d["identity"]["supplier_assigned_id"],
-    "gpc_code": d["classification"]["gpc_code"],
-    "gpc_name": d["classification"]["gpc_name"],
-    "target_country": d["market"]["target_country_code"],
-    "country_of_origin": d["market"]["country_of_origin"],
-    # -------------------------------------------------
-    # Naming (SV)
-    # -------------------------------------------------
-    "description_short_sv": first_text(d["naming"]["description_short"]),
-    "functional_name_sv": first_text(d["naming"]["functional_name"]),
-    "regulated_product_name_sv": first_text(d["naming"]["regulated_product_name"]),
-    # -------------------------------------------------
-    # Size & measurements
-    # -------------------------------------------------
-    "size_descriptive": d["size"]["descriptive"],
-    "net_content": d["size"]["net_content"],
-    "width_mm": d["measurements"]["width_mm"],
-    "height_mm": d["measurements"]["height_mm"],
-    "depth_mm": d["measurements"]["depth_mm"],
-    "gross_weight_g": d["measurements"]["gross_weight_g"],
-    # -------------------------------------------------
-    # Commercial
-    # -------------------------------------------------
-    "vat_rate": d["vat"]["rate"],
-    # -------------------------------------------------
-    # Legal / regulatory (RAW)
-    # -------------------------------------------------
-    "sales_condition_code": d["sales_restrictions"]["condition_code"],
-    "minimum_age": d["consumer_guidance"]["minimum_age"],
-    "is_otc": d["healthcare"]["is_otc"],
-    "alcohol_abv": d["alcohol"]["abv_percent"],
-    # -------------------------------------------------
-    # Ingredients & allergens
-    # -------------------------------------------------
-    "ingredients_sv": first_text(d["ingredients"]["food"]),
-    "allergens": " | ".join(f"{a['type']}({a['containment']})" for a in d["allergens"]),
-    # -------------------------------------------------
-    # Marketing
-    # -------------------------------------------------
-    "marketing_text_sv": first_text(d["marketing"]["long"]),
-    "keywords_sv": first_text(d["marketing"]["keywords"]),
-    # -------------------------------------------------
-    # Media
-    # -------------------------------------------------
-    "primary_image": next((m["uri"] for m in d["media"] if m["primary"]), None),
-    "all_image_urls": " | ".join(
-        m["uri"] for m in d["media"] if m["type"] == "PRODUCT_IMAGE"
-    ),
-}
-
-
-with OUT_PATH.open("w", encoding="utf-8", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=row.keys())
-    writer.writeheader()
-    writer.writerow(row)
-
-print("✅ cin_compact_wide.csv written")
+    print("✅ cin_compact_wide.csv written")
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+import os
+import sys
+import csv
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from cin_compact_to_csv import (
+    GPC_COLUMNS,
+    LONG_FIELDS,
+    add_gpc_levels,
+    compact_to_long_rows,
+    compact_to_row,
+)
+
+# -------------------------------------------------
+# Config
+# -------------------------------------------------
+
+OUT_DIR = Path("export")
+MANIFEST_NAME = "manifest.json"
+PARTITIONS = 64
+
+WIDE_PATH = Path("cin_compact_wide.csv")
+LONG_PATH = Path("cin_compact.csv")
+
+
+# -------------------------------------------------
+# Hashing & partitioning
+# -------------------------------------------------
+
+
+def compact_hash(d: Dict[str, Any]) -> str:
+    payload = json.dumps(d, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def partition_of(gtin: str, partitions: int = PARTITIONS) -> int:
+    digest = hashlib.blake2b(gtin.encode("ascii"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % partitions
+
+
+def part_path(out_dir: Path, kind: str, part: int) -> Path:
+    return out_dir / kind / f"part-{part:03d}.csv"
+
+
+# -------------------------------------------------
+# Manifest
+# -------------------------------------------------
+
+
+def load_manifest(out_dir: Path) -> Dict[str, Any]:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"partitions": PARTITIONS, "wide_fields": None, "products": {}}
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir: Path, manifest: Dict[str, Any]) -> None:
+    tmp = out_dir / f"{MANIFEST_NAME}.tmp"
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+
+
+# -------------------------------------------------
+# Partition files
+# -------------------------------------------------
+
+
+def read_part(path: Path) -> List[Dict[str, str]]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def write_part(path: Path, fields: List[str], rows: List[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def rewrite_part(
+    out_dir: Path,
+    kind: str,
+    part: int,
+    fields: List[str],
+    drop: Set[str],
+    add: List[Dict[str, Any]],
+) -> None:
+    """Replace the rows of `drop` GTINs in one partition with `add`."""
+    path = part_path(out_dir, kind, part)
+    rows = [r for r in read_part(path) if r["gtin"] not in drop] + add
+    rows.sort(key=lambda r: r["gtin"])
+    if rows:
+        write_part(path, fields, rows)
+    elif path.exists():
+        path.unlink()
+
+
+def merge_parts(out_dir: Path, kind: str, out_path: Path, partitions: int) -> None:
+    """Concatenate partition files into one CSV (single header)."""
+    with out_path.open("w", encoding="utf-8", newline="") as out:
+        header_written = False
+        for part in range(partitions):
+            path = part_path(out_dir, kind, part)
+            if not path.exists():
+                continue
+            with path.open(encoding="utf-8", newline="") as f:
+                header = f.readline()
+                if not header_written:
+                    out.write(header)
+                    header_written = True
+                shutil.copyfileobj(f, out)
+
+
+# -------------------------------------------------
+# Incremental export
+# -------------------------------------------------
+
+
+def wide_fields(compact: Dict[str, Any]) -> List[str]:
+    """Wide header for the current configuration (export languages, GPC)."""
+    return [*compact_to_row(compact), *GPC_COLUMNS]
+
+
+def export_incremental(compact_dir: Path, out_dir: Path = OUT_DIR) -> Dict[str, int]:
+    """
+    Bring the partitioned wide/long CSVs in `out_dir` up to date with the
+    <name>.json compact records in `compact_dir`.
+
+    Files whose mtime/size match the manifest are not read at all; the rest
+    are hashed and only GTINs whose compact hash changed (or that were
+    added/removed) have their partitions rewritten. When the wide header
+    no longer matches the configuration (e.g. CIN_EXPORT_LANGUAGES), every
+    partition is rewritten.
+    """
+    manifest = load_manifest(out_dir)
+    paths = sorted(compact_dir.glob("*.json"))
+
+    # new wide columns invalidate every partition: start over
+    if paths and manifest["wide_fields"] is not None:
+        with paths[0].open(encoding="utf-8") as f:
+            fields = wide_fields(json.load(f))
+        if fields != manifest["wide_fields"]:
+            for kind in ("wide", "long"):
+                shutil.rmtree(out_dir / kind, ignore_errors=True)
+            (out_dir / MANIFEST_NAME).unlink()
+            return export_incremental(compact_dir, out_dir)
+
+    products: Dict[str, Dict[str, Any]] = manifest["products"]
+    partitions: int = manifest["partitions"]
+    by_source = {entry["source"]: gtin for gtin, entry in products.items()}
+
+    changed: Dict[str, Dict[str, Any]] = {}
+    seen: Set[str] = set()
+
+    for path in paths:
+        st = path.stat()
+        stamp = [st.st_mtime_ns, st.st_size]
+        gtin = by_source.get(path.name)
+        if gtin and products[gtin]["stamp"] == stamp:
+            seen.add(gtin)
+            continue
+
+        with path.open(encoding="utf-8") as f:
+            compact = json.load(f)
+        gtin = compact["identity"]["gtin"]
+        seen.add(gtin)
+
+        digest = compact_hash(compact)
+        old = products.get(gtin)
+        products[gtin] = {
+            "source": path.name,
+            "stamp": stamp,
+            "compact": digest,
+            "partition": partition_of(gtin, partitions),
+        }
+        if not old or old["compact"] != digest:
+            changed[gtin] = compact
+
+    removed = set(products) - seen
+
+    # one batch for the GPC enrichment of every changed row
+    wide_rows = add_gpc_levels([compact_to_row(d) for d in changed.values()])
+    wide_by_gtin = {row["gtin"]: row for row in wide_rows}
+
+    if wide_rows and manifest["wide_fields"] is None:
+        manifest["wide_fields"] = list(wide_rows[0].keys())
+
+    touched: Dict[int, Set[str]] = {}
+    for gtin in changed.keys() | removed:
+        touched.setdefault(products[gtin]["partition"], set()).add(gtin)
+
+    for part, gtins in sorted(touched.items()):
+        updates = [g for g in sorted(gtins) if g in changed]
+        part_wide = [wide_by_gtin[g] for g in updates]
+        part_long = [r for g in updates for r in compact_to_long_rows(changed[g])]
+        rewrite_part(out_dir, "wide", part, manifest["wide_fields"], gtins, part_wide)
+        rewrite_part(out_dir, "long", part, LONG_FIELDS, gtins, part_long)
+
+    for gtin in removed:
+        del products[gtin]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    save_manifest(out_dir, manifest)
+
+    return {
+        "changed": len(changed),
+        "removed": len(removed),
+        "partitions_rewritten": len(touched),
+    }
+
+
+# -------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python3 cin_export_incremental.py <compact_dir> [out_dir]")
+        sys.exit(1)
+
+    compact_dir = Path(sys.argv[1])
+    out_dir = Path(sys.argv[2]) if len(sys.argv) == 3 else OUT_DIR
+
+    stats = export_incremental(compact_dir, out_dir)
+    partitions = load_manifest(out_dir)["partitions"]
+    if stats["partitions_rewritten"] or not (out_dir / WIDE_PATH).exists():
+        merge_parts(out_dir, "wide", out_dir / WIDE_PATH, partitions)
+        merge_parts(out_dir, "long", out_dir / LONG_PATH, partitions)
+
+    print(
+        f"✅ {stats['changed']} changed, {stats['removed']} removed, "
+        f"{stats['partitions_rewritten']} partitions rewritten"
+    )
+    print(f"📁 {out_dir / WIDE_PATH}")
+    print(f"📁 {out_dir / LONG_PATH}")
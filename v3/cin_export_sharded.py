@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+import os
+import sys
+import csv
+import heapq
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cin_compact import LANGUAGES, compact_snapshot
+from cin_compact_to_csv import (
+    LONG_FIELDS,
+    add_gpc_levels,
+    compact_to_long_rows,
+    compact_to_row,
+)
+from cin_export_incremental import (
+    LONG_PATH,
+    WIDE_PATH,
+    load_manifest,
+    partition_of,
+    save_manifest,
+    write_part,
+)
+from cin_snapshot import COMPACT_FORMAT, decode_compact
+
+# gpc.py and cin_ndjson.py live in the repository root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+import gpc  # noqa: E402
+from cin_ndjson import read_documents  # noqa: E402
+
+# -------------------------------------------------
+# Config
+# -------------------------------------------------
+
+OUT_DIR = Path("export_sharded")
+SHARDS = 64
+WORKERS = os.cpu_count() or 1
+
+# shard key -> function(wide row, shards) -> shard name
+SHARD_KEYS = {
+    "gtin": lambda row, shards: f"part-{partition_of(row['gtin'], shards):03d}",
+    "gpc": lambda row, shards: f"seg-{row.get('level_1_code') or 'none'}",
+}
+
+
+# -------------------------------------------------
+# Input
+# -------------------------------------------------
+
+
+def compact_record(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The compact record in one input document: a cin_compact.json record,
+    or a v3 fetch_cin.py --ndjson line ({"gtin", "snapshot"}), compacted
+    here. Raises ValueError for anything else (e.g. signals records).
+    """
+    if "snapshot" in doc:
+        snapshot = doc["snapshot"]
+        if snapshot.get("format") == COMPACT_FORMAT:
+            snapshot = decode_compact(snapshot)
+        doc = compact_snapshot(snapshot, LANGUAGES)
+    elif "signals" in doc:
+        raise ValueError("signals record, not a compact record or snapshot")
+
+    gtin = (doc.get("identity") or {}).get("gtin")
+    if not gtin:
+        raise ValueError("record has no identity.gtin")
+    return doc
+
+
+def read_records(
+    paths: List[Path],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    (records, rejected) for a list of input files. A document that is not a
+    usable compact record, or a file that cannot be read, is rejected with
+    its source ("<file>" or "<file>:<n>", n counting documents from 1)
+    instead of failing the chunk; records read before a broken line are kept.
+    """
+    records: List[Dict[str, Any]] = []
+    rejected: List[Dict[str, Any]] = []
+
+    def reject(source: str, e: Exception) -> None:
+        rejected.append({"source": source, "error": f"{type(e).__name__}: {e}"[:500]})
+
+    for path in paths:
+        n = 0
+        try:
+            for n, doc in enumerate(read_documents(path), 1):
+                try:
+                    records.append(compact_record(doc))
+                except Exception as e:
+                    reject(f"{path.name}:{n}", e)
+        except Exception as e:
+            # unreadable file or broken NDJSON line: the rest of the file is lost
+            reject(f"{path.name}:{n + 1}" if n else path.name, e)
+    return records, rejected
+
+
+# -------------------------------------------------
+# Worker
+# -------------------------------------------------
+
+
+def _shard_file(out_dir: Path, kind: str, shard: str, worker: int) -> Path:
+    return out_dir / kind / shard / f"w{worker:03d}.csv"
+
+
+def export_chunk(
+    worker: int, paths: List[Path], out_dir: Path, by: str, shards: int
+) -> Dict[str, Any]:
+    """
+    Convert one chunk of compact records and write this worker's file for
+    every shard it has rows for, each sorted by GTIN. Returns the manifest
+    entries for those files and the documents rejected on the way.
+    """
+    loaded, rejected = read_records(paths)
+
+    # a record the converters choke on is rejected, not the whole chunk
+    records, wide_rows, long_rows = [], [], []
+    for d in loaded:
+        try:
+            row, long = compact_to_row(d), compact_to_long_rows(d)
+        except Exception as e:
+            rejected.append(
+                {
+                    "source": f"gtin {d['identity']['gtin']}",
+                    "error": f"{type(e).__name__}: {e}"[:500],
+                }
+            )
+            continue
+        records.append(d)
+        wide_rows.append(row)
+        long_rows.append(long)
+    wide_rows = add_gpc_levels(wide_rows)
+
+    groups: Dict[str, List[int]] = {}
+    shard_of = SHARD_KEYS[by]
+    for i, row in enumerate(wide_rows):
+        groups.setdefault(shard_of(row, shards), []).append(i)
+
+    fields = list(wide_rows[0].keys()) if wide_rows else None
+    files: List[Dict[str, Any]] = []
+    for shard, idx in sorted(groups.items()):
+        # stable: records sharing a GTIN keep their input order
+        idx.sort(key=lambda i: wide_rows[i]["gtin"])
+        wide = [wide_rows[i] for i in idx]
+        long = [r for i in idx for r in long_rows[i]]
+
+        for kind, kind_fields, rows in (
+            ("wide", fields, wide),
+            ("long", LONG_FIELDS, long),
+        ):
+            path = _shard_file(out_dir, kind, shard, worker)
+            write_part(path, kind_fields, rows)
+            files.append(
+                {
+                    "kind": kind,
+                    "shard": shard,
+                    "worker": worker,
+                    "path": str(path.relative_to(out_dir)),
+                    "rows": len(rows),
+                    "first_gtin": wide[0]["gtin"],
+                    "last_gtin": wide[-1]["gtin"],
+                }
+            )
+
+    return {
+        "records": len(records),
+        "rejected": rejected,
+        "wide_fields": fields,
+        "files": files,
+    }
+
+
+def _chunks(paths: List[Path], n: int) -> List[List[Path]]:
+    """n contiguous chunks of near-equal size (deterministic for a given list)."""
+    size, extra = divmod(len(paths), n)
+    out, start = [], 0
+    for i in range(n):
+        end = start + size + (i < extra)
+        out.append(paths[start:end])
+        start = end
+    return [c for c in out if c]
+
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+
+
+def export_sharded(
+    compact_dir: Path,
+    out_dir: Path = OUT_DIR,
+    by: str = "gtin",
+    shards: int = SHARDS,
+    workers: int = WORKERS,
+) -> Dict[str, Any]:
+    """
+    Full export of the records in `compact_dir` as sharded wide/long CSVs:
+    cin_compact.json records (*.json), or snapshot NDJSON from v3
+    fetch_cin.py --ndjson (*.ndjson[.gz]), compacted on the way. Documents
+    that are not usable records are listed under "rejected" in the manifest.
+
+    Input files are split into contiguous chunks, one per worker process.
+    Each worker writes <kind>/<shard>/w<worker>.csv for the shards it has
+    rows for, so no two processes ever write the same file. A shard is the
+    set of its worker files, each sorted by GTIN; the manifest lists them
+    with row counts and GTIN ranges for readers that consume shards
+    directly. merge() produces the single sorted file.
+    """
+    if by not in SHARD_KEYS:
+        raise ValueError(f"Unknown shard key: {by} (use {', '.join(SHARD_KEYS)})")
+
+    paths = sorted(
+        p
+        for pattern in ("*.json", "*.ndjson", "*.ndjson.gz")
+        for p in compact_dir.glob(pattern)
+    )
+    for kind in ("wide", "long"):
+        shutil.rmtree(out_dir / kind, ignore_errors=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    chunks = _chunks(paths, max(1, workers))
+    pool_args: Dict[str, Any] = {}
+    if gpc.GPC_FILE.exists():
+        # built once here, mapped by every worker
+        pool_args = {
+            "initializer": gpc.attach_shared,
+            "initargs": (gpc.share_index(),),
+        }
+
+    with ProcessPoolExecutor(max_workers=max(1, len(chunks)), **pool_args) as pool:
+        results = list(
+            pool.map(
+                export_chunk,
+                range(len(chunks)),
+                chunks,
+                [out_dir] * len(chunks),
+                [by] * len(chunks),
+                [shards] * len(chunks),
+            )
+        )
+
+    fields = next((r["wide_fields"] for r in results if r["wide_fields"]), None)
+    if any(r["wide_fields"] not in (None, fields) for r in results):
+        raise RuntimeError("Workers produced different wide columns")
+
+    manifest = {
+        "layout": "sharded",
+        "by": by,
+        "shards": shards if by == "gtin" else None,
+        "workers": len(chunks),
+        "wide_fields": fields,
+        "long_fields": LONG_FIELDS,
+        "records": sum(r["records"] for r in results),
+        "rejected": [e for r in results for e in r["rejected"]],
+        "files": sorted(
+            (f for r in results for f in r["files"]),
+            key=lambda f: (f["kind"], f["shard"], f["worker"]),
+        ),
+    }
+    save_manifest(out_dir, manifest)
+    return manifest
+
+
+# -------------------------------------------------
+# Merge
+# -------------------------------------------------
+
+
+def shard_files(
+    manifest: Dict[str, Any], kind: str, shards: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """Manifest entries of one kind, optionally limited to some shards."""
+    return [
+        f
+        for f in manifest["files"]
+        if f["kind"] == kind and (shards is None or f["shard"] in shards)
+    ]
+
+
+def merge(
+    out_dir: Path, kind: str, out_path: Path, shards: Optional[List[str]] = None
+) -> int:
+    """
+    k-way merge of shard files into one CSV sorted by GTIN (single header).
+    Ties keep manifest order, so the output is the same for any worker
+    timing. Returns the row count.
+    """
+    manifest = load_manifest(out_dir)
+    fields = manifest["wide_fields"] if kind == "wide" else manifest["long_fields"]
+    files = shard_files(manifest, kind, shards)
+
+    rows = 0
+    with ExitStack() as stack:
+        readers = []
+        for f in files:
+            fh = stack.enter_context(
+                (out_dir / f["path"]).open(encoding="utf-8", newline="")
+            )
+            reader = csv.reader(fh)
+            next(reader)
+            readers.append(reader)
+
+        tmp = out_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8", newline="") as out:
+            writer = csv.writer(out)
+            writer.writerow(fields or [])
+            # gtin is the first column of both layouts
+            for row in heapq.merge(*readers, key=lambda r: r[0]):
+                writer.writerow(row)
+                rows += 1
+        os.replace(tmp, out_path)
+    return rows
+
+
+# -------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------
+
+USAGE = f"""Usage:
+  python3 cin_export_sharded.py <compact_dir> [out_dir]
+      [--by=gtin|gpc] [--shards={SHARDS}] [--workers=N] [--merge]
+
+compact_dir: cin_compact.json records (*.json) and/or snapshot NDJSON from
+v3 fetch_cin.py --ndjson (*.ndjson, *.ndjson.gz);
+--by=gpc shards by GPC segment (level 1) instead of GTIN hash;
+--merge also writes the single {WIDE_PATH} / {LONG_PATH}, sorted by GTIN"""
+
+
+def _parse_args(argv: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    args = [a for a in argv if not a.startswith("--")]
+    opts = dict(a[2:].partition("=")[::2] for a in argv if a.startswith("--"))
+    return args, opts
+
+
+if __name__ == "__main__":
+    args, opts = _parse_args(sys.argv[1:])
+    if len(args) not in (1, 2) or opts.keys() - {"by", "shards", "workers", "merge"}:
+        print(USAGE)
+        sys.exit(1)
+
+    compact_dir = Path(args[0])
+    out_dir = Path(args[1]) if len(args) == 2 else OUT_DIR
+
+    manifest = export_sharded(
+        compact_dir,
+        out_dir,
+        by=opts.get("by", "gtin"),
+        shards=int(opts.get("shards", SHARDS)),
+        workers=int(opts.get("workers", WORKERS)),
+    )
+    shard_names = {f["shard"] for f in manifest["files"]}
+    print(
+        f"✅ {manifest['records']} records, {len(shard_names)} shards, "
+        f"{manifest['workers']} workers"
+    )
+    if manifest["rejected"]:
+        print(f"⚠️ {len(manifest['rejected'])} document(s) rejected (see manifest)")
+    print(f"📁 {out_dir / 'manifest.json'}")
+
+    if "merge" in opts:
+        for kind, name in (("wide", WIDE_PATH), ("long", LONG_PATH)):
+            rows = merge(out_dir, kind, out_dir / name)
+            print(f"📁 {out_dir / name} ({rows} rows)")
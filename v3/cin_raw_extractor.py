@@ -1,10 +1,9 @@
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, Union
+from typing import IO, Any, Dict, Union
 import sys
 import json
 import re
 
-
 # -------------------------------------------------
 # Utils
 # -------------------------------------------------
@@ -23,6 +22,11 @@ def is_url(text: str) -> bool:
     return bool(URL_RE.search(text))
 
 
+def _is_url_fast(text: str) -> bool:
+    # cheap substring test first; the regex only runs on likely URLs
+    return "://" in text and is_url(text)
+
+
 # -------------------------------------------------
 # Core XML → dict conversion
 # -------------------------------------------------
@@ -80,17 +84,141 @@ def extract_cin_raw(cin_xml: str) -> Dict[str, Any]:
     return {strip_namespace(root.tag): element_to_dict(root)}
 
 
+class NonAdjacentRepeat(ValueError):
+    """A tag reappeared after a sibling with another tag; see stream_cin_raw."""
+
+
+def stream_cin_raw(source, out: IO[bytes]) -> None:
+    """
+    Streaming variant of extract_cin_raw: parses `source` (path or binary
+    file) with iterparse and writes the same JSON structure (compact, not
+    indented) to the seekable binary file `out` as elements close.
+
+    No recursion and no document tree: each element is cleared once written,
+    so memory is bounded by nesting depth. Repeated tags are promoted to a
+    list in place by patching the byte reserved after their key. Only
+    adjacent repeats can be merged this way (GS1 schemas use sequences, so
+    that is the norm). A non-adjacent repeat would need an earlier key
+    reopened, so it raises NonAdjacentRepeat instead of writing a duplicate
+    key; `out` is incomplete then and callers fall back to extract_cin_raw.
+    """
+
+    pos = 0
+
+    def write(s: str) -> None:
+        nonlocal pos
+        data = s.encode("utf-8")
+        out.write(data)
+        pos += len(data)
+
+    def patch(at: int, s: str) -> None:
+        out.seek(at)
+        out.write(s.encode("utf-8"))
+        out.seek(pos)
+
+    dumps = json.dumps
+    # frame: [element, attributes, opened, last_tag, list slot, in_list, keys,
+    #         tags written]
+    stack = []
+    write("{")
+
+    for event, el in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            tag = strip_namespace(el.tag)
+            if not stack:
+                write(dumps(tag, ensure_ascii=False) + ":")
+            else:
+                parent = stack[-1]
+                if not parent[2]:
+                    write("{")
+                    if parent[1]:
+                        write('"@attributes":' + dumps(parent[1], ensure_ascii=False))
+                        parent[6] = 1
+                    parent[2] = True
+
+                if tag == parent[3]:
+                    if not parent[5]:
+                        patch(parent[4], "[")
+                        parent[5] = True
+                    write(",")
+                else:
+                    if tag in parent[7]:
+                        raise NonAdjacentRepeat(
+                            f"<{tag}> repeats non-adjacently under "
+                            f"<{strip_namespace(parent[0].tag)}>"
+                        )
+                    if parent[5]:
+                        write("]")
+                        parent[5] = False
+                    if parent[6]:
+                        write(",")
+                    write(dumps(tag, ensure_ascii=False) + ":")
+                    parent[3], parent[4] = tag, pos
+                    parent[7].add(tag)
+                    parent[6] += 1
+                    write(" ")
+
+            stack.append([el, dict(el.attrib), False, None, 0, False, 0, set()])
+
+        else:
+            frame = stack.pop()
+            if frame[2]:
+                write("]}" if frame[5] else "}")
+            else:
+                # Leaf node: text or null, URLs stripped but key kept
+                text = el.text.strip() if el.text else ""
+                if text and not _is_url_fast(text):
+                    write(dumps(text, ensure_ascii=False))
+                else:
+                    write("null")
+
+            el.clear()
+            if stack:
+                stack[-1][0].remove(el)
+
+    write("}")
+
+
 # -------------------------------------------------
 # CLI entrypoint
 # -------------------------------------------------
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python3 cin_raw_extractor.py <cin.xml> <out.json>")
+    if "--ndjson" in sys.argv:
+        # cin_ndjson.py lives in the repository root
+        from pathlib import Path
+
+        sys.path.append(str(Path(__file__).resolve().parent.parent))
+        from cin_ndjson import run_ndjson
+
+        def handle(path: str) -> Dict[str, Any]:
+            with open(path, "r", encoding="utf-8") as f:
+                return {"path": path, "raw": extract_cin_raw(f.read())}
+
+        sys.exit(1 if run_ndjson(sys.argv, handle, key="path") else 0)
+
+    stream = "--stream" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--stream"]
+    if len(args) != 2:
+        print("Usage: python3 cin_raw_extractor.py [--stream] <cin.xml> <out.json>")
+        print(
+            "       python3 cin_raw_extractor.py --ndjson [--out=<file[.gz]>] [<cin.xml>...]"
+        )
         sys.exit(1)
 
-    xml_path = sys.argv[1]
-    out_path = sys.argv[2]
+    xml_path = args[0]
+    out_path = args[1]
+
+    if stream:
+        with open(out_path, "wb") as f:
+            try:
+                stream_cin_raw(xml_path, f)
+                print(f"✅ CIN snapshot written to {out_path}")
+                sys.exit(0)
+            except NonAdjacentRepeat as e:
+                print(f"⚠️ {e}; falling back to the in-memory extractor")
+                f.seek(0)
+                f.truncate()
 
     with open(xml_path, "r", encoding="utf-8") as f:
         cin_xml = f.read()
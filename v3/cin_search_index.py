@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+import sys
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DB_PATH = Path("cin_search.db")
+
+# column name -> (section, field) in cin_compact.json
+FIELDS = {
+    "description_short": ("naming", "description_short"),
+    "functional_name": ("naming", "functional_name"),
+    "marketing": ("marketing", "long"),
+    "keywords": ("marketing", "keywords"),
+    "ingredients": ("ingredients", "food"),
+}
+
+# bm25 weights, same order as FIELDS
+WEIGHTS = (3.0, 2.0, 1.0, 1.5, 0.5)
+
+# unicode61 with remove_diacritics 0 keeps å/ä/ö distinct from a/o,
+# prefix indexes make compound-word prefixes ("drick*") cheap
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS doc (
+    id INTEGER PRIMARY KEY,
+    gtin TEXT NOT NULL,
+    lang TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doc_gtin ON doc (gtin);
+CREATE TABLE IF NOT EXISTS product (
+    gtin TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS doc_text USING fts5(
+    {", ".join(FIELDS)},
+    tokenize = "unicode61 remove_diacritics 0",
+    prefix = '2 3 4'
+);
+"""
+
+
+# -------------------------------------------------
+# Helpers
+# -------------------------------------------------
+
+
+def open_index(path: Path = DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def texts_by_lang(compact: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """Collect indexed texts per language: {lang: {column: text}}."""
+    out: Dict[str, Dict[str, str]] = {}
+    for column, (section, field) in FIELDS.items():
+        for item in (compact.get(section) or {}).get(field) or []:
+            lang, text = item.get("lang"), item.get("text")
+            if not lang or not text:
+                continue
+            cols = out.setdefault(lang, {})
+            cols[column] = f"{cols[column]} {text}" if column in cols else text
+    return out
+
+
+def content_hash(texts: Dict[str, Dict[str, str]]) -> str:
+    payload = json.dumps(texts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = "".join(c if c.isalnum() else " " for c in query).split()
+    return " ".join(f'"{w}"*' for w in words)
+
+
+# -------------------------------------------------
+# Index maintenance
+# -------------------------------------------------
+
+
+def remove_product(conn: sqlite3.Connection, gtin: str) -> None:
+    conn.execute(
+        "DELETE FROM doc_text WHERE rowid IN (SELECT id FROM doc WHERE gtin = ?)",
+        (gtin,),
+    )
+    conn.execute("DELETE FROM doc WHERE gtin = ?", (gtin,))
+    conn.execute("DELETE FROM product WHERE gtin = ?", (gtin,))
+
+
+def index_product(conn: sqlite3.Connection, compact: Dict[str, Any]) -> bool:
+    """
+    Index one compact record. Returns False when the product's texts are
+    unchanged since it was last indexed, so re-extraction runs stay cheap.
+    """
+    gtin = compact["identity"]["gtin"]
+    texts = texts_by_lang(compact)
+    digest = content_hash(texts)
+
+    row = conn.execute(
+        "SELECT content_hash FROM product WHERE gtin = ?", (gtin,)
+    ).fetchone()
+    if row and row[0] == digest:
+        return False
+
+    remove_product(conn, gtin)
+    for lang, cols in texts.items():
+        cur = conn.execute("INSERT INTO doc (gtin, lang) VALUES (?, ?)", (gtin, lang))
+        conn.execute(
+            f"INSERT INTO doc_text (rowid, {', '.join(FIELDS)}) "
+            f"VALUES (?, {', '.join('?' for _ in FIELDS)})",
+            (cur.lastrowid, *(cols.get(c) for c in FIELDS)),
+        )
+    conn.execute(
+        "INSERT INTO product (gtin, content_hash) VALUES (?, ?)", (gtin, digest)
+    )
+    return True
+
+
+# -------------------------------------------------
+# Search
+# -------------------------------------------------
+
+
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    lang: Optional[str] = "sv",
+    limit: int = 20,
+) -> List[Tuple[str, float]]:
+    """Return (gtin, score) pairs, best match first (lower bm25 is better)."""
+    match = to_match_query(query)
+    if not match:
+        return []
+
+    rank = f"bm25(doc_text, {', '.join(str(w) for w in WEIGHTS)})"
+    sql = (
+        f"SELECT doc.gtin, {rank} AS score "
+        "FROM doc_text JOIN doc ON doc.id = doc_text.rowid "
+        "WHERE doc_text MATCH ?"
+    )
+    params: List[Any] = [match]
+    if lang:
+        sql += " AND doc.lang = ?"
+        params.append(lang)
+    sql += " ORDER BY score"
+
+    # one row per (gtin, lang): keep each GTIN's best-ranked language
+    hits: Dict[str, float] = {}
+    for gtin, score in conn.execute(sql, params):
+        if gtin not in hits:
+            hits[gtin] = score
+            if len(hits) == limit:
+                break
+    return list(hits.items())
+
+
+# -------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------
+
+USAGE = """Usage:
+  python3 cin_search_index.py add <cin_compact.json>...
+  python3 cin_search_index.py remove <GTIN>...
+  python3 cin_search_index.py search <query> [lang|all]"""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(USAGE)
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    conn = open_index()
+
+    if command == "add":
+        changed = 0
+        with conn:
+            for path in args:
+                with open(path, encoding="utf-8") as f:
+                    changed += index_product(conn, json.load(f))
+        print(f"✅ Indexed {changed} changed / {len(args)} products")
+
+    elif command == "remove":
+        with conn:
+            for gtin in args:
+                remove_product(conn, gtin)
+        print(f"✅ Removed {len(args)} products")
+
+    elif command == "search":
+        lang = args[1] if len(args) > 1 else "sv"
+        for gtin, score in search(conn, args[0], None if lang == "all" else lang):
+            print(f"{gtin}\t{score:.3f}")
+
+    else:
+        print(USAGE)
+        sys.exit(1)
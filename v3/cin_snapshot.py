@@ -1,9 +1,37 @@
 # cin_snapshot.py
+import json
+import hashlib
 import xml.etree.ElementTree as ET
-from typing import Any, Dict, List, Union
+from typing import IO, Any, Dict, List, Union
 
+COMPACT_FORMAT = "cin-snapshot/2"
 
-def xml_to_dict(el: ET.Element) -> Dict[str, Any]:
+
+def node_hash(node: Dict[str, Any]) -> str:
+    """
+    Merkle hash of a snapshot node: tag, attributes, text and the hashes of
+    its children, in order. Children must already carry their "hash".
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(node["tag"].encode("utf-8"))
+    for key, value in sorted((node.get("attributes") or {}).items()):
+        h.update(f"\0{key}={value}".encode("utf-8"))
+    h.update(b"\1" + (node.get("text") or "").encode("utf-8"))
+    for child in node.get("children") or []:
+        h.update(b"\2" + child["hash"].encode("ascii"))
+    return h.hexdigest()
+
+
+def ensure_hashes(node: Dict[str, Any]) -> str:
+    """Fill in missing subtree hashes (e.g. for snapshots written without them)."""
+    if "hash" not in node:
+        for child in node.get("children") or []:
+            ensure_hashes(child)
+        node["hash"] = node_hash(node)
+    return node["hash"]
+
+
+def xml_to_dict(el: ET.Element, with_hashes: bool = False) -> Dict[str, Any]:
     """
     Convert an XML element into a JSON-serializable dict.
     Preserves:
@@ -11,6 +39,7 @@ def xml_to_dict(el: ET.Element) -> Dict[str, Any]:
     - attributes
     - children
     - text
+    With with_hashes, every node also carries a "hash" of its subtree.
     """
 
     node: Dict[str, Any] = {
@@ -22,15 +51,112 @@ def xml_to_dict(el: ET.Element) -> Dict[str, Any]:
 
     children = list(el)
     if children:
-        node["children"] = [xml_to_dict(child) for child in children]
+        node["children"] = [xml_to_dict(child, with_hashes) for child in children]
 
     text = (el.text or "").strip()
     if text:
         node["text"] = text
 
+    if with_hashes:
+        node["hash"] = node_hash(node)
+
     return node
 
 
-def snapshot_cin(cin_xml: str) -> Dict[str, Any]:
+def snapshot_cin(cin_xml: str, with_hashes: bool = True) -> Dict[str, Any]:
     root = ET.fromstring(cin_xml)
-    return xml_to_dict(root)
+    return xml_to_dict(root, with_hashes)
+
+
+# -------------------------------------------------
+# Compact encoding
+# -------------------------------------------------
+#
+# {"format": "cin-snapshot/2",
+#  "ns": [namespace uri, ...],
+#  "names": [[ns index or -1, local name], ...],   # tags and attribute names
+#  "root": [name id, attrs, text, children]}
+#
+# attrs is a flat [name id, value, ...] list; trailing empty slots of a node
+# are dropped. Hashes are not stored: ensure_hashes() recomputes them.
+
+
+def encode_compact(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    ns_ids: Dict[str, int] = {}
+    name_ids: Dict[str, int] = {}
+    names: List[List[Any]] = []
+
+    def name_id(qname: str) -> int:
+        nid = name_ids.get(qname)
+        if nid is None:
+            ns, local = -1, qname
+            if qname.startswith("{"):
+                uri, local = qname[1:].split("}", 1)
+                ns = ns_ids.setdefault(uri, len(ns_ids))
+            nid = name_ids[qname] = len(names)
+            names.append([ns, local])
+        return nid
+
+    def encode(node: Dict[str, Any]) -> List[Any]:
+        attrs = node.get("attributes")
+        children = node.get("children")
+        out = [
+            name_id(node["tag"]),
+            [x for k, v in attrs.items() for x in (name_id(k), v)] if attrs else None,
+            node.get("text"),
+            [encode(c) for c in children] if children else None,
+        ]
+        while out[-1] is None:
+            out.pop()
+        return out
+
+    root = encode(snapshot)
+    return {
+        "format": COMPACT_FORMAT,
+        "ns": list(ns_ids),
+        "names": names,
+        "root": root,
+    }
+
+
+def decode_compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore the snapshot_cin dict shape from encode_compact output."""
+    ns = data["ns"]
+    names = [
+        f"{{{ns[ns_id]}}}{local}" if ns_id >= 0 else local
+        for ns_id, local in data["names"]
+    ]
+
+    def decode(packed: List[Any]) -> Dict[str, Any]:
+        node: Dict[str, Any] = {"tag": names[packed[0]]}
+        size = len(packed)
+        if size > 1 and packed[1]:
+            attrs = packed[1]
+            node["attributes"] = {
+                names[attrs[i]]: attrs[i + 1] for i in range(0, len(attrs), 2)
+            }
+        if size > 3 and packed[3]:
+            node["children"] = [decode(c) for c in packed[3]]
+        if size > 2 and packed[2] is not None:
+            node["text"] = packed[2]
+        return node
+
+    return decode(data["root"])
+
+
+def dump_snapshot(snapshot: Dict[str, Any], f: IO[str], pretty: bool = False) -> None:
+    """Write a snapshot: compact encoding by default, legacy indented dict if pretty."""
+    if pretty:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(
+            encode_compact(snapshot), f, ensure_ascii=False, separators=(",", ":")
+        )
+
+
+def load_snapshot(f: IO[str]) -> Dict[str, Any]:
+    """Read either snapshot format and return the snapshot_cin dict shape."""
+    data = json.load(f)
+    if data.get("format") == COMPACT_FORMAT:
+        return decode_compact(data)
+    return data
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+import sys
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cin_compact import LANGUAGES, compact_snapshot
+from cin_snapshot import load_snapshot
+
+# -------------------------------------------------
+# Layout (little-endian)
+# -------------------------------------------------
+#
+# header  : magic "CINB", u16 version, u16 reserved,
+#           u32 node count, u32 attribute count, u32 name count, u32 heap size
+# names   : name count  x (u32 heap offset, u32 length)    qualified "{ns}local"
+# nodes   : node count  x (u32 name, i32 parent, u32 subtree end,
+#                          u32 first attribute, u32 attribute count,
+#                          u32 text offset, u32 text length)
+# attrs   : attr count  x (u32 name, u32 value offset, u32 value length)
+# heap    : UTF-8 strings, deduplicated
+#
+# Nodes are stored in document (pre-)order, so the descendants of node i are
+# exactly nodes i+1 .. end-1 and node 0 is the root. A text offset of
+# NO_TEXT means the node has no text.
+
+MAGIC = b"CINB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII")
+NAME = struct.Struct("<II")
+NODE = struct.Struct("<IiIIIII")
+ATTR = struct.Struct("<III")
+NO_TEXT = 0xFFFFFFFF
+
+
+# -------------------------------------------------
+# Writer
+# -------------------------------------------------
+
+
+def encode_binary(snapshot: Dict[str, Any]) -> bytes:
+    """Encode a snapshot_cin dict into the binary layout."""
+    heap = bytearray()
+    heap_ids: Dict[str, tuple] = {}
+    name_ids: Dict[str, int] = {}
+    names: List[tuple] = []
+    nodes: List[list] = []
+    attrs: List[tuple] = []
+
+    def string(value: str) -> tuple:
+        ref = heap_ids.get(value)
+        if ref is None:
+            data = value.encode("utf-8")
+            ref = heap_ids[value] = (len(heap), len(data))
+            heap.extend(data)
+        return ref
+
+    def name_id(qname: str) -> int:
+        nid = name_ids.get(qname)
+        if nid is None:
+            nid = name_ids[qname] = len(names)
+            names.append(string(qname))
+        return nid
+
+    # explicit stack: (node, parent index); subtree ends are patched on exit
+    stack: List[tuple] = [(snapshot, -1)]
+    open_nodes: List[int] = []
+    while stack:
+        node, parent = stack.pop()
+        if node is None:
+            index = open_nodes.pop()
+            nodes[index][2] = len(nodes)
+            continue
+
+        index = len(nodes)
+        node_attrs = node.get("attributes") or {}
+        first_attr = len(attrs)
+        for key, value in node_attrs.items():
+            attrs.append((name_id(key), *string(value)))
+
+        text = node.get("text")
+        text_off, text_len = string(text) if text is not None else (NO_TEXT, 0)
+        nodes.append(
+            [
+                name_id(node["tag"]),
+                parent,
+                0,
+                first_attr,
+                len(node_attrs),
+                text_off,
+                text_len,
+            ]
+        )
+
+        open_nodes.append(index)
+        stack.append((None, None))
+        for child in reversed(node.get("children") or []):
+            stack.append((child, index))
+
+    out = bytearray(
+        HEADER.pack(MAGIC, VERSION, 0, len(nodes), len(attrs), len(names), len(heap))
+    )
+    for ref in names:
+        out += NAME.pack(*ref)
+    for fields in nodes:
+        out += NODE.pack(*fields)
+    for fields in attrs:
+        out += ATTR.pack(*fields)
+    out += heap
+    return bytes(out)
+
+
+# -------------------------------------------------
+# Reader
+# -------------------------------------------------
+
+
+class BinarySnapshot:
+    """
+    Read-only view over a binary snapshot (bytes or an mmap'ed file).
+    Nothing is deserialized up front: nodes are decoded field by field
+    with struct.unpack_from on the underlying memoryview.
+
+    Use as a context manager (or call close()) to unmap a file opened with
+    open(); nodes must not be used after that.
+    """
+
+    def __init__(self, buf):
+        # set by open(): the mapping close() has to release
+        self.map: Optional[mmap.mmap] = None
+        self.buf = memoryview(buf)
+        magic, version, _, n_nodes, n_attrs, n_names, heap_size = HEADER.unpack_from(
+            self.buf, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a binary CIN snapshot")
+
+        self.node_count = n_nodes
+        self.names_at = HEADER.size
+        self.nodes_at = self.names_at + n_names * NAME.size
+        self.attrs_at = self.nodes_at + n_nodes * NODE.size
+        self.heap_at = self.attrs_at + n_attrs * ATTR.size
+        self.names = [
+            self._str(*NAME.unpack_from(self.buf, self.names_at + i * NAME.size))
+            for i in range(n_names)
+        ]
+        self._suffix_ids: Dict[str, frozenset] = {}
+        # flat u32 view of the node table: field f of node i is at i * 7 + f
+        self.node_words = (
+            self.buf[self.nodes_at : self.attrs_at].cast("I")
+            if sys.byteorder == "little"
+            else None
+        )
+
+    @classmethod
+    def open(cls, path: Path) -> "BinarySnapshot":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snap = cls(mm)
+        except Exception:
+            mm.close()
+            raise
+        snap.map = mm
+        return snap
+
+    def close(self) -> None:
+        # views into the map must go first, or mmap.close() raises BufferError
+        if self.node_words is not None:
+            self.node_words.release()
+        self.buf.release()
+        if self.map is not None:
+            self.map.close()
+
+    def __enter__(self) -> "BinarySnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _str(self, offset: int, length: int) -> str:
+        start = self.heap_at + offset
+        return str(self.buf[start : start + length], "utf-8")
+
+    def _node(self, index: int) -> tuple:
+        return NODE.unpack_from(self.buf, self.nodes_at + index * NODE.size)
+
+    @property
+    def root(self) -> "BinaryNode":
+        return BinaryNode(self, 0)
+
+    def name_ids_ending_with(self, suffix: str) -> frozenset:
+        ids = self._suffix_ids.get(suffix)
+        if ids is None:
+            ids = self._suffix_ids[suffix] = frozenset(
+                i for i, name in enumerate(self.names) if name.endswith(suffix)
+            )
+        return ids
+
+    def to_dict(self, index: int = 0) -> Dict[str, Any]:
+        """Materialize a subtree in the snapshot_cin dict shape."""
+        node = BinaryNode(self, index)
+        out: Dict[str, Any] = {"tag": node.tag}
+        if node.attributes:
+            out["attributes"] = node.attributes
+        children = node.children
+        if children:
+            out["children"] = [self.to_dict(c.index) for c in children]
+        if node.text is not None:
+            out["text"] = node.text
+        return out
+
+
+class BinaryNode:
+    """
+    Navigation handle for one node. Supports node.get("tag" | "attributes" |
+    "children" | "text") so code written against snapshot dicts (see
+    cin_compact.py) runs on it unchanged.
+    """
+
+    __slots__ = ("snap", "index")
+
+    def __init__(self, snap: BinarySnapshot, index: int):
+        self.snap = snap
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f"<BinaryNode {self.index} {self.tag}>"
+
+    @property
+    def tag(self) -> str:
+        name, *_ = self.snap._node(self.index)
+        return self.snap.names[name]
+
+    @property
+    def text(self) -> Optional[str]:
+        *_, text_off, text_len = self.snap._node(self.index)
+        return None if text_off == NO_TEXT else self.snap._str(text_off, text_len)
+
+    @property
+    def attributes(self) -> Dict[str, str]:
+        _, _, _, first, count, _, _ = self.snap._node(self.index)
+        snap, out = self.snap, {}
+        for i in range(first, first + count):
+            name, off, length = ATTR.unpack_from(
+                snap.buf, snap.attrs_at + i * ATTR.size
+            )
+            out[snap.names[name]] = snap._str(off, length)
+        return out
+
+    @property
+    def parent(self) -> Optional["BinaryNode"]:
+        _, parent, *_ = self.snap._node(self.index)
+        return BinaryNode(self.snap, parent) if parent >= 0 else None
+
+    @property
+    def children(self) -> List["BinaryNode"]:
+        _, _, end, *_ = self.snap._node(self.index)
+        out, child = [], self.index + 1
+        while child < end:
+            out.append(BinaryNode(self.snap, child))
+            child = self.snap._node(child)[2]
+        return out
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "tag":
+            return self.tag
+        if key == "text":
+            return self.text
+        if key == "attributes":
+            return self.attributes or default
+        if key == "children":
+            return self.children or default
+        return default
+
+    def find_all(self, tag_endswith: str) -> List["BinaryNode"]:
+        """Nodes in this subtree (self included) whose tag ends with the suffix."""
+        ids = self.snap.name_ids_ending_with(tag_endswith)
+        if not ids:
+            return []
+        snap = self.snap
+        end = snap._node(self.index)[2]
+        if snap.node_words is not None:
+            width = NODE.size // 4
+            tags = snap.node_words[self.index * width : end * width : width]
+            return [
+                BinaryNode(snap, self.index + i)
+                for i, name in enumerate(tags)
+                if name in ids
+            ]
+        return [
+            BinaryNode(snap, i)
+            for i in range(self.index, end)
+            if snap._node(i)[0] in ids
+        ]
+
+
+# -------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------
+
+USAGE = """Usage:
+  python3 cin_snapshot_binary.py encode <cin_snapshot.json> <out.cinb>
+  python3 cin_snapshot_binary.py compact <in.cinb> <cin_compact.json>"""
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print(USAGE)
+        sys.exit(1)
+
+    command, src, dst = sys.argv[1:]
+
+    if command == "encode":
+        with open(src, encoding="utf-8") as f:
+            data = encode_binary(load_snapshot(f))
+        Path(dst).write_bytes(data)
+        print(f"✅ {dst} written ({len(data)} bytes)")
+
+    elif command == "compact":
+        with BinarySnapshot.open(Path(src)) as snap:
+            compact = compact_snapshot(snap.root, LANGUAGES)
+        with open(dst, "w", encoding="utf-8") as f:
+            json.dump(compact, f, ensure_ascii=False, indent=2)
+        print(f"✅ {dst} written")
+
+    else:
+        print(USAGE)
+        sys.exit(1)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import sys
+import json
+from typing import Any, Dict, List, Optional
+
+from cin_snapshot import ensure_hashes, load_snapshot
+
+# -------------------------------------------------
+# Helpers
+# -------------------------------------------------
+
+
+def local_name(tag: str) -> str:
+    return tag.split("}", 1)[1] if "}" in tag else tag
+
+
+def strip_hashes(node: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: v for k, v in node.items() if k not in ("hash", "children")}
+    if node.get("children"):
+        out["children"] = [strip_hashes(c) for c in node["children"]]
+    return out
+
+
+def group_children(node: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for child in node.get("children") or []:
+        groups.setdefault(local_name(child["tag"]), []).append(child)
+    return groups
+
+
+# -------------------------------------------------
+# Diff
+# -------------------------------------------------
+
+
+def _diff(
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+    path: str,
+    changes: List[Dict[str, Any]],
+) -> None:
+    if old is None or new is None:
+        changes.append(
+            {
+                "path": path,
+                "old": strip_hashes(old) if old else None,
+                "new": strip_hashes(new) if new else None,
+            }
+        )
+        return
+
+    # identical subtree: nothing below can differ
+    if old["hash"] == new["hash"]:
+        return
+
+    # pairing is by local name, so a namespace change shows up only here
+    if old["tag"] != new["tag"]:
+        changes.append({"path": f"{path}/#tag", "old": old["tag"], "new": new["tag"]})
+
+    if old.get("text") != new.get("text"):
+        changes.append({"path": path, "old": old.get("text"), "new": new.get("text")})
+
+    old_attrs = old.get("attributes") or {}
+    new_attrs = new.get("attributes") or {}
+    for key in old_attrs.keys() | new_attrs.keys():
+        if old_attrs.get(key) != new_attrs.get(key):
+            changes.append(
+                {
+                    "path": f"{path}/@{local_name(key)}",
+                    "old": old_attrs.get(key),
+                    "new": new_attrs.get(key),
+                }
+            )
+
+    old_groups, new_groups = group_children(old), group_children(new)
+    for name in dict.fromkeys([*old_groups, *new_groups]):
+        olds, news = old_groups.get(name, []), new_groups.get(name, [])
+        for i in range(max(len(olds), len(news))):
+            _diff(
+                olds[i] if i < len(olds) else None,
+                news[i] if i < len(news) else None,
+                f"{path}/{name}[{i}]",
+                changes,
+            )
+
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compare two snapshot_cin trees and return the changes as
+    {"path", "old", "new"} entries.
+
+    Paths use local tag names with the index among same-named siblings,
+    e.g. "/catalogueItemNotificationMessage[0]/transaction[0]/...", and
+    "/@name" for attributes. "/#tag" marks an element whose namespace-
+    qualified tag changed under the same local name. Added or removed
+    elements carry the whole subtree as new/old. Subtrees with equal Merkle
+    hashes are skipped.
+    """
+    ensure_hashes(old)
+    ensure_hashes(new)
+    changes: List[Dict[str, Any]] = []
+    root = local_name(new["tag"])
+    if local_name(old["tag"]) != root:
+        return [{"path": "", "old": strip_hashes(old), "new": strip_hashes(new)}]
+    _diff(old, new, f"/{root}[0]", changes)
+    return changes
+
+
+# -------------------------------------------------
+# CLI entrypoint
+# -------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(
+            "Usage: python3 cin_snapshot_diff.py <old_snapshot.json> <new_snapshot.json>"
+        )
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as f:
+        old = load_snapshot(f)
+    with open(sys.argv[2], encoding="utf-8") as f:
+        new = load_snapshot(f)
+
+    json.dump(diff_snapshots(old, new), sys.stdout, indent=2, ensure_ascii=False)
+    print()
@@ -4,19 +4,32 @@ import sys
 import json
 import base64
 import requests
+from contextlib import nullcontext
+from pathlib import Path
 from dotenv import load_dotenv
 
-from cin_snapshot import snapshot_cin
+from cin_snapshot import dump_snapshot, encode_compact, snapshot_cin
+
+# cin_metrics.py lives in the repository root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from cin_client import AuthError, check, request, select_item_id  # noqa: E402
+from cin_memprofile import profiler_from_argv  # noqa: E402
+from cin_metrics import BYTES_BUCKETS, metrics  # noqa: E402
+from cin_ndjson import run_ndjson  # noqa: E402
 
 # =========================================================
 # CONFIG
 # =========================================================
 
-BASE_URL = "https://services.validoo.se/tradeitem.api"
-TOKEN_URL = "https://identity.validoo.se/connect/token"
-
 load_dotenv()
 
+# overridable to point at a mock or recording proxy (see validoo_mock.py)
+BASE_URL = os.getenv("VALI_BASE_URL", "https://services.validoo.se/tradeitem.api")
+TOKEN_URL = os.getenv("VALI_TOKEN_URL", "https://identity.validoo.se/connect/token")
+
 CLIENT_ID = os.getenv("VALI_CLIENT_ID")
 CLIENT_SECRET = os.getenv("VALI_CLIENT_SECRET")
 USERNAME = os.getenv("VALI_USERNAME")
@@ -32,7 +45,7 @@ if not all([CLIENT_ID, CLIENT_SECRET, USERNAME, PASSWORD]):
 # =========================================================
 
 
-def get_access_token() -> str:
+def get_access_token(session: requests.Session | None = None) -> str:
     payload = {
         "grant_type": "password",
         "client_id": CLIENT_ID,
@@ -42,11 +55,14 @@ def get_access_token() -> str:
         "scope": "tradeitem.api",
     }
 
-    resp = requests.post(
-        TOKEN_URL,
-        data=payload,
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-    )
+    with metrics.stage("token"):
+        resp = request(
+            "POST",
+            TOKEN_URL,
+            session,
+            data=payload,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
 
     if resp.status_code != 200:
         raise RuntimeError(resp.text)
@@ -59,33 +75,43 @@ def get_access_token() -> str:
 # =========================================================
 
 
-def search_by_gtin(token: str, gtin: str) -> list[dict]:
+def search_by_gtin(
+    token: str, gtin: str, session: requests.Session | None = None
+) -> list[dict]:
     url = f"{BASE_URL}/TradeItemInformation/search"
-    resp = requests.post(
-        url,
-        headers={
-            "Authorization": f"Bearer {token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-        },
-        json={"gtins": [gtin], "itemStatus": ["published"]},
-    )
-
-    if resp.status_code != 200:
-        raise RuntimeError(resp.text)
+    with metrics.stage("search") as st:
+        resp = request(
+            "POST",
+            url,
+            session,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+            json={"gtins": [gtin], "itemStatus": ["published"]},
+        )
+        st.add_bytes(len(resp.content))
+
+    check(resp)
 
     return resp.json().get("results", [])
 
 
-def get_item_by_id(token: str, item_id: int) -> dict:
-    resp = requests.get(
-        f"{BASE_URL}/TradeItemInformation/getItemById",
-        headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
-        params={"id": item_id, "dataType": "Product", "allowInvalid": True},
-    )
+def get_item_by_id(
+    token: str, item_id: int, session: requests.Session | None = None
+) -> dict:
+    with metrics.stage("get_item_by_id") as st:
+        resp = request(
+            "GET",
+            f"{BASE_URL}/TradeItemInformation/getItemById",
+            session,
+            headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+            params={"id": item_id, "dataType": "Product", "allowInvalid": True},
+        )
+        st.add_bytes(len(resp.content))
 
-    if resp.status_code != 200:
-        raise RuntimeError(resp.text)
+    check(resp)
 
     return resp.json()[0]
 
@@ -93,50 +119,113 @@ def get_item_by_id(token: str, item_id: int) -> dict:
 def decode_cin(cin_b64: str | None) -> str | None:
     if not cin_b64:
         return None
-    return base64.b64decode(cin_b64).decode("utf-8")
+    with metrics.stage("decode", len(cin_b64)):
+        data = base64.b64decode(cin_b64)
+        metrics.observe("document_bytes", len(data), BYTES_BUCKETS)
+        return data.decode("utf-8")
+
+
+def fetch_snapshot(gtin: str, token: str, session: requests.Session) -> dict:
+    """One NDJSON record: the snapshot in the compact encoding (cin-snapshot/2)."""
+    item_id = select_item_id(search_by_gtin(token, gtin, session), gtin)
+    if item_id is None:
+        metrics.count("gtin_not_found")
+        return {"gtin": gtin, "error": "GTIN not found"}
+
+    cin_xml = decode_cin(get_item_by_id(token, item_id, session).get("cin"))
+    if not cin_xml:
+        metrics.count("no_cin")
+        return {"gtin": gtin, "item_id": item_id, "error": "No CIN returned"}
+
+    with metrics.stage("snapshot", len(cin_xml)):
+        snapshot = encode_compact(snapshot_cin(cin_xml, with_hashes=False))
+    return {"gtin": gtin, "item_id": item_id, "snapshot": snapshot}
 
 
 # =========================================================
 # MAIN
 # =========================================================
 
+USAGE = """Usage:
+  python3 fetch_cin.py [--pretty] [--profile-memory] <GTIN>
+  python3 fetch_cin.py --ndjson [--profile-memory] [--out=<snapshots.ndjson[.gz]>] [<GTIN>...]
+      (GTINs from stdin when none are given; one JSON object per line)"""
+
+
+def main_ndjson(profiler=None):
+    metrics.configure()
+    session = requests.Session()
+    token = [get_access_token(session)]
+
+    def fetch(gtin: str) -> dict:
+        try:
+            return fetch_snapshot(gtin, token[0], session)
+        except AuthError:
+            # long streams outlive the token: renew once and retry
+            token[0] = get_access_token(session)
+            return fetch_snapshot(gtin, token[0], session)
+
+    def handle(gtin: str) -> dict:
+        with profiler.document(gtin) if profiler else nullcontext():
+            return fetch(gtin)
+
+    sys.exit(1 if run_ndjson(sys.argv, handle, key="gtin") else 0)
+
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 fetch_cin.py <GTIN>")
+    profiler = profiler_from_argv(sys.argv)
+    if "--ndjson" in sys.argv:
+        main_ndjson(profiler)
+
+    pretty = "--pretty" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--pretty"]
+    if len(args) != 1:
+        print(USAGE)
         sys.exit(1)
 
-    gtin = sys.argv[1]
+    gtin = args[0]
     print(f"🔎 Fetching {gtin}")
+    metrics.configure()
+    if profiler:
+        profiler.begin_document(gtin)
 
     token = get_access_token()
     results = search_by_gtin(token, gtin)
 
-    matches = [r for r in results if r.get("gtin") == gtin]
-    if not matches:
+    item_id = select_item_id(results, gtin)
+    if item_id is None:
+        metrics.count("gtin_not_found")
         print("❌ GTIN not found")
         sys.exit(1)
 
-    consumer_units = [r for r in matches if r.get("isTradeItemAConsumerUnit")]
-    item_id = consumer_units[0]["itemId"] if consumer_units else matches[0]["itemId"]
-
     item = get_item_by_id(token, item_id)
 
-    with open("trade_item_raw.json", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open(
+        "trade_item_raw.json", "w", encoding="utf-8"
+    ) as f:
         json.dump(item, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
 
     cin_xml = decode_cin(item.get("cin"))
     if not cin_xml:
+        metrics.count("no_cin")
         print("⚠️ No CIN returned")
         sys.exit(0)
 
-    with open("cin.xml", "w", encoding="utf-8") as f:
+    with metrics.stage("write") as st, open("cin.xml", "w", encoding="utf-8") as f:
         f.write(cin_xml)
-
-    snapshot = snapshot_cin(cin_xml)
-
-    with open("cin_snapshot.json", "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        st.add_bytes(f.tell())
+
+    with metrics.stage("snapshot", len(cin_xml)):
+        # hashes only survive the --pretty dict; the compact dump drops them
+        snapshot = snapshot_cin(cin_xml, with_hashes=pretty)
+
+    with metrics.stage("write") as st, open(
+        "cin_snapshot.json", "w", encoding="utf-8"
+    ) as f:
+        dump_snapshot(snapshot, f, pretty=pretty)
+        st.add_bytes(f.tell())
+    metrics.count("items")
 
     print("✅ Done")
     print("📁 trade_item_raw.json")
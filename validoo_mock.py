@@ -0,0 +1,332 @@
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# =========================================================
+# Config
+# =========================================================
+#
+# The mock mirrors the real URL layout on one host, so pointing the fetch
+# scripts at it only takes two overrides (in .env or the environment):
+#
+#   VALI_BASE_URL=http://127.0.0.1:8765/tradeitem.api
+#   VALI_TOKEN_URL=http://127.0.0.1:8765/connect/token
+
+UPSTREAMS = {
+    "/connect/": "https://identity.validoo.se",
+    "/tradeitem.api/": "https://services.validoo.se",
+}
+DEFAULT_PORT = 8765
+CASSETTE_DIR = Path("validoo_cassette")
+
+# tokens are never written to disk; replay hands out this one
+MOCK_TOKEN = {"access_token": "mock-token", "expires_in": 3600, "token_type": "Bearer"}
+
+
+# =========================================================
+# Cassette
+# =========================================================
+
+
+def request_key(method: str, path: str, query: str, body: bytes) -> str:
+    """
+    Stable key for a request: method, path, sorted query and, for JSON
+    bodies, the canonical JSON. Token requests are keyed by path alone so
+    credentials never influence (or end up in) the cassette.
+    """
+    parts = [method.upper(), path]
+    if not path.startswith("/connect/"):
+        parts.append("&".join(f"{k}={v}" for k, v in sorted(parse_qsl(query))))
+        if body:
+            try:
+                parts.append(json.dumps(json.loads(body), sort_keys=True))
+            except ValueError:
+                parts.append(hashlib.sha256(body).hexdigest())
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """One JSON file per recorded interaction, named by request_key."""
+
+    def __init__(self, root: Path = CASSETTE_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        tmp = self._path(key).with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(entry, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        tmp.replace(self._path(key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.root.glob("*.json"))
+
+
+# =========================================================
+# Fault injection
+# =========================================================
+
+
+class Faults:
+    """
+    Latency, error and throttling injected in front of every replayed
+    response:
+
+    - latency / jitter: sleep latency + uniform(0, jitter) seconds
+    - error_rate: fraction of requests answered 503
+    - throttle_rate: fraction answered 429 with Retry-After
+    - max_rps: requests per second above which 429 is returned
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        max_rps: float = 0.0,
+        retry_after: int = 1,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def _over_rate(self) -> bool:
+        if not self.max_rps:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start, self.window_count = now, 0
+            self.window_count += 1
+            return self.window_count > self.max_rps
+
+    def apply(self) -> Optional[int]:
+        """Sleep, then return a status to fail with, or None to serve normally."""
+        with self.lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            roll = self.rng.random()
+        if delay:
+            time.sleep(delay)
+        if self._over_rate() or roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+
+# =========================================================
+# Server
+# =========================================================
+
+
+def make_handler(cassette: Cassette, mode: str, faults: Faults):
+    """mode is "replay" (serve the cassette) or "record" (proxy and save)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str, extra=()) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in extra:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, data: Any, extra=()) -> None:
+            self._send(
+                status, json.dumps(data).encode("utf-8"), "application/json", extra
+            )
+
+        def _handle(self) -> None:
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            key = request_key(self.command, url.path, url.query, body)
+
+            if mode == "record":
+                status, data, content_type = self._forward(url, body)
+                if status == 200:
+                    cassette.put(
+                        key,
+                        {
+                            "method": self.command,
+                            "path": url.path,
+                            "query": url.query,
+                            "status": status,
+                            "content_type": content_type,
+                            "body": _redact(url.path, data).decode("utf-8"),
+                        },
+                    )
+                self._send(status, data, content_type)
+                return
+
+            fault = faults.apply()
+            if fault == 429:
+                self._send_json(
+                    429,
+                    {"error": "Too Many Requests"},
+                    [("Retry-After", str(faults.retry_after))],
+                )
+                return
+            if fault is not None:
+                self._send_json(fault, {"error": "Injected failure"})
+                return
+
+            if url.path.startswith("/connect/"):
+                self._send_json(200, MOCK_TOKEN)
+                return
+
+            entry = cassette.get(key)
+            if entry is None:
+                self._send_json(404, {"error": "Not recorded", "path": url.path})
+                return
+            self._send(
+                entry["status"], entry["body"].encode("utf-8"), entry["content_type"]
+            )
+
+        def _forward(self, url, body: bytes) -> Tuple[int, bytes, str]:
+            import requests
+
+            upstream = next(
+                (
+                    host
+                    for prefix, host in UPSTREAMS.items()
+                    if url.path.startswith(prefix)
+                ),
+                None,
+            )
+            if upstream is None:
+                return 404, b'{"error": "Unknown upstream"}', "application/json"
+
+            headers = {
+                k: v
+                for k, v in self.headers.items()
+                if k.lower() in ("authorization", "accept", "content-type")
+            }
+            resp = requests.request(
+                self.command,
+                f"{upstream}{url.path}",
+                params=parse_qsl(url.query),
+                data=body or None,
+                headers=headers,
+            )
+            return (
+                resp.status_code,
+                resp.content,
+                resp.headers.get("Content-Type", "application/json"),
+            )
+
+        do_GET = _handle
+        do_POST = _handle
+
+    return Handler
+
+
+def _redact(path: str, data: bytes) -> bytes:
+    if path.startswith("/connect/"):
+        return json.dumps(MOCK_TOKEN).encode("utf-8")
+    return data
+
+
+def serve(
+    cassette: Cassette,
+    mode: str = "replay",
+    faults: Optional[Faults] = None,
+    port: int = DEFAULT_PORT,
+    host: str = "127.0.0.1",
+) -> ThreadingHTTPServer:
+    """Start the server on a background thread and return it (call .shutdown())."""
+    server = ThreadingHTTPServer(
+        (host, port), make_handler(cassette, mode, faults or Faults())
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+USAGE = f"""Usage:
+  python3 validoo_mock.py record [--dir={CASSETTE_DIR}] [--port={DEFAULT_PORT}]
+  python3 validoo_mock.py replay [--dir={CASSETTE_DIR}] [--port={DEFAULT_PORT}]
+                                 [--latency=0.05] [--jitter=0.02]
+                                 [--error-rate=0.01] [--throttle-rate=0.05]
+                                 [--max-rps=20] [--seed=1]
+
+Point the fetch scripts at it with
+  VALI_BASE_URL=http://127.0.0.1:<port>/tradeitem.api
+  VALI_TOKEN_URL=http://127.0.0.1:<port>/connect/token"""
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("record", "replay"):
+        print(USAGE)
+        sys.exit(1)
+
+    mode = sys.argv[1]
+    opts: Dict[str, str] = {}
+    for arg in sys.argv[2:]:
+        if not arg.startswith("--"):
+            print(USAGE)
+            sys.exit(1)
+        key, _, value = arg[2:].partition("=")
+        opts[key] = value
+
+    cassette = Cassette(Path(opts.get("dir", CASSETTE_DIR)))
+    faults = Faults(
+        latency=float(opts.get("latency", 0)),
+        jitter=float(opts.get("jitter", 0)),
+        error_rate=float(opts.get("error-rate", 0)),
+        throttle_rate=float(opts.get("throttle-rate", 0)),
+        max_rps=float(opts.get("max-rps", 0)),
+        seed=int(opts["seed"]) if "seed" in opts else None,
+    )
+    port = int(opts.get("port", DEFAULT_PORT))
+
+    server = serve(cassette, mode, faults, port)
+    print(f"🛰️  {mode} on http://127.0.0.1:{port} ({len(cassette)} recorded)")
+    print(f"   VALI_BASE_URL=http://127.0.0.1:{port}/tradeitem.api")
+    print(f"   VALI_TOKEN_URL=http://127.0.0.1:{port}/connect/token")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print("\n✅ Stopped")
+
+
+if __name__ == "__main__":
+    main()